@@ -0,0 +1,174 @@
+"""Compare throughput and tail latency of the WSGI and ASGI entry points.
+
+Starts gunicorn (WSGI) and uvicorn (ASGI) in turn on a local port with the
+same number of workers. For each scenario it logs in through the login form,
+fires a fixed number of requests with httpx at high concurrency, and prints
+requests/sec and latency percentiles per server. The default scenarios are
+the natively async views: the movie page, and the bookmark and rating POSTs,
+which carry the session cookie and CSRF token like the browser does.
+
+Run from ``src/`` against a database seeded with ``manage.py seed_synthetic``
+(whose users all share the password "synthetic")::
+
+    python benchmarks/asgi_vs_wsgi.py --requests 5000 --concurrency 200
+    python benchmarks/asgi_vs_wsgi.py movie_list --username alice --password secret
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+
+SERVERS = {
+    "wsgi": lambda port, workers: [
+        "gunicorn", "movie_db.wsgi:application",
+        "--bind", f"127.0.0.1:{port}", "--workers", str(workers),
+    ],
+    "asgi": lambda port, workers: [
+        "uvicorn", "movie_db.asgi:application",
+        "--port", str(port), "--workers", str(workers), "--no-access-log",
+    ],
+}
+
+
+SCENARIOS = {
+    "movie_info": lambda client, movie_id: client.get(f"/movies/movie/{movie_id}/"),
+    "toggle_bookmark": lambda client, movie_id: client.post(
+        "/movies/toggle-bookmark/",
+        data={"movie_id": movie_id, "action": random.choice(("add", "remove"))},
+    ),
+    "submit_movie_rating": lambda client, movie_id: client.post(
+        "/movies/submit_movie_rating",
+        data={"movie_id": movie_id, "rating": random.randint(1, 5)},
+    ),
+    # A sync view, for reference.
+    "movie_list": lambda client, movie_id: client.get("/movies/"),
+}
+DEFAULT_SCENARIOS = ("movie_info", "toggle_bookmark", "submit_movie_rating")
+
+
+async def login(client, username, password):
+    """Log ``client`` in through the login form; later POSTs send its CSRF token."""
+    await client.get("/user/login")
+    response = await client.post(
+        "/user/login",
+        data={
+            "username": username,
+            "password": password,
+            "csrfmiddlewaretoken": client.cookies.get("csrftoken"),
+        },
+    )
+    # Success redirects home, failure back to the form.
+    if response.status_code != 302 or response.headers["location"] != "/":
+        raise RuntimeError(f"Could not log in as {username!r}.")
+    # login() rotated the token.
+    client.headers["X-CSRFToken"] = client.cookies.get("csrftoken")
+
+
+def start_server(command, port):
+    process = subprocess.Popen(
+        command,
+        cwd=SRC_DIR,
+        env={**os.environ, "DJANGO_SETTINGS_MODULE": "movie_db.settings"},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{command[0]} did not start on port {port}")
+
+
+async def run_load(base_url, scenario, credentials, movies, total, concurrency):
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        await login(client, *credentials)
+        request = SCENARIOS[scenario]
+
+        async def one(i):
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await request(client, random.randint(1, movies))
+                    # A redirect here is the login page: the session was lost.
+                    if response.status_code >= 300:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+def report(name, latencies, errors, elapsed):
+    cuts = statistics.quantiles(latencies, n=100)
+    print(
+        f"{name:<26} {len(latencies) / elapsed:8.1f} req/s  "
+        f"p50 {cuts[49] * 1000:7.1f} ms  p99 {cuts[98] * 1000:7.1f} ms  "
+        f"errors {errors}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    # Checked below: argparse tests an empty "*" positional against its
+    # choices as a whole list, which fails with no scenario given.
+    parser.add_argument("scenarios", nargs="*", help=", ".join(SCENARIOS))
+    parser.add_argument("--username", default="synthetic1")
+    parser.add_argument("--password", default="synthetic")
+    parser.add_argument(
+        "--movies", type=int, default=1000, help="Movie ids are drawn from 1..N."
+    )
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--servers", nargs="+", choices=SERVERS, default=list(SERVERS))
+    args = parser.parse_args()
+    credentials = (args.username, args.password)
+    scenarios = args.scenarios or DEFAULT_SCENARIOS
+    for scenario in scenarios:
+        if scenario not in SCENARIOS:
+            parser.error(f"unknown scenario {scenario!r}")
+
+    for name in args.servers:
+        process = start_server(SERVERS[name](args.port, args.workers), args.port)
+        try:
+            base_url = f"http://127.0.0.1:{args.port}"
+            for scenario in scenarios:
+                load = (base_url, scenario, credentials, args.movies)
+                # Warm up connections, caches and lazy imports in every worker.
+                asyncio.run(run_load(*load, args.workers * 20, args.workers))
+                report(
+                    f"{name} {scenario}",
+                    *asyncio.run(run_load(*load, args.requests, args.concurrency)),
+                )
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
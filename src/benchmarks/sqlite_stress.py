@@ -0,0 +1,152 @@
+"""Concurrent rating and bookmark writes against the default and production SQLite setups.
+
+For each profile a fresh database is migrated and seeded in a child process,
+then ``--threads`` threads, each on its own connection, run ``--writes``
+rating upserts and bookmark toggles as fast as they can. The default profile
+runs the writes bare, as the views did before; the production profile
+(``MOVIE_DB_PROFILE=production``) wraps them in ``retry_on_busy``. Prints
+per profile, as JSON, how many writes committed and failed with a lock
+error, and both the committed and the attempted writes per second: a
+profile that fails writes quickly can attempt more per second while
+committing fewer. ``movies.tests.SQLiteStressTest`` runs the production
+half and asserts it loses no write.
+
+Run from ``src/``::
+
+    python benchmarks/sqlite_stress.py --threads 8 --writes 50
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+PROFILES = ("default", "production")
+
+
+def stress(threads, writes, movies):
+    sys.path.insert(0, str(SRC_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "movie_db.settings")
+    import django
+
+    django.setup()
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import OperationalError, connection
+
+    from movies.db import is_busy, retry_on_busy
+    from movies.models import Movie
+    from user.models import Bookmark, Rating
+
+    call_command("migrate", verbosity=0)
+    users = User.objects.bulk_create(User(username=f"stress{i}") for i in range(threads))
+    movie_ids = [
+        movie.pk
+        for movie in Movie.objects.bulk_create(
+            Movie(title=f"Stress {i}", genre="DRAMA", release_year=2000) for i in range(movies)
+        )
+    ]
+    connection.close()
+
+    def rate(user, movie_id, value):
+        Rating.objects.update_or_create(user=user, movie_id=movie_id, defaults={"rating": value})
+
+    def toggle(user, movie_id):
+        bookmark, created = Bookmark.objects.get_or_create(user=user, movie_id=movie_id)
+        if not created:
+            bookmark.delete()
+
+    if os.environ.get("MOVIE_DB_PROFILE") == "production":
+        rate, toggle = retry_on_busy(rate), retry_on_busy(toggle)
+
+    done, errors, lock = [0], [0], threading.Lock()
+
+    def worker(index):
+        rng = random.Random(index)
+        user = users[index]
+        succeeded = failed = 0
+        for _ in range(writes):
+            movie_id = rng.choice(movie_ids)
+            try:
+                if rng.random() < 0.7:
+                    rate(user, movie_id, rng.randint(1, 5))
+                else:
+                    toggle(user, movie_id)
+                succeeded += 1
+            except OperationalError as error:
+                if not is_busy(error):
+                    raise
+                failed += 1
+        connection.close()
+        with lock:
+            done[0] += succeeded
+            errors[0] += failed
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {
+        "threads": threads,
+        "attempted": threads * writes,
+        "committed": done[0],
+        "lock_errors": errors[0],
+        "seconds": round(elapsed, 3),
+        "committed_per_second": round(done[0] / elapsed, 1),
+        "attempted_per_second": round(threads * writes / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=50, help="Writes per thread.")
+    parser.add_argument("--movies", type=int, default=50)
+    parser.add_argument("--stress", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.stress:
+        json.dump(stress(args.threads, args.writes, args.movies), sys.stdout)
+        return 0
+
+    report = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for profile in PROFILES:
+            env = {**os.environ, "MOVIE_DB_NAME": os.path.join(tmpdir, f"{profile}.sqlite3")}
+            env.pop("MOVIE_DB_PROFILE", None)
+            if profile == "production":
+                env["MOVIE_DB_PROFILE"] = profile
+            child = subprocess.run(
+                [
+                    sys.executable,
+                    __file__,
+                    "--stress",
+                    "--threads",
+                    str(args.threads),
+                    "--writes",
+                    str(args.writes),
+                    "--movies",
+                    str(args.movies),
+                ],
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            report[profile] = json.loads(child.stdout)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
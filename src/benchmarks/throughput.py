@@ -0,0 +1,208 @@
+"""Latency, query counts and throughput of every view on synthetic catalogs.
+
+For each scale (number of movies) a database is seeded once with
+``manage.py seed_synthetic`` and kept under ``benchmarks/data/``. A child
+process pointed at it through ``MOVIE_DB_NAME`` then replays every scenario
+in-process with the Django test client, logged in as a synthetic user, and
+records per-request latency and SQL statement counts. The report is JSON so
+runs on different commits can be diffed or compared by a script.
+
+Run from ``src/``::
+
+    python benchmarks/throughput.py --scales 1000 100000 --requests 300 --output before.json
+
+The 1M-movie database takes a few minutes to seed the first time.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = Path(__file__).resolve().parent / "data"
+DEFAULT_SCALES = (1_000, 100_000, 1_000_000)
+
+GENRES = ("ACTION", "COMEDY", "DRAMA", "HORROR", "THRILLER", "DOCUMENTARY")
+TITLE_WORDS = ("river", "shadow", "golden", "empire", "storm", "midnight")
+DIRECTORS = ("Novak", "Costa", "Fischer", "Moreau", "Okafor")
+
+
+def scenarios(rng, movie_count):
+    """``name -> callable(client) -> response`` for every benchmarked view."""
+
+    def movie_id():
+        return rng.randint(1, movie_count)
+
+    def toggle(client):
+        action = rng.choice(("add", "remove"))
+        return client.post("/movies/toggle-bookmark/", {"movie_id": movie_id(), "action": action})
+
+    return {
+        "home": lambda client: client.get("/"),
+        "movie_list": lambda client: client.get("/movies/"),
+        "movie_list_title": lambda client: client.get(
+            "/movies/", {"title": rng.choice(TITLE_WORDS)}
+        ),
+        "movie_list_genre": lambda client: client.get("/movies/", {"genre": rng.choice(GENRES)}),
+        "movie_list_director": lambda client: client.get(
+            "/movies/", {"director": rng.choice(DIRECTORS)}
+        ),
+        "movie_list_year": lambda client: client.get("/movies/", {"year": rng.randint(1990, 2024)}),
+        "movie_list_rating": lambda client: client.get(
+            "/movies/", {"rating": rng.choice((3, 3.5, 4, 4.5))}
+        ),
+        "movie_info": lambda client: client.get(f"/movies/movie/{movie_id()}/"),
+        "profile": lambda client: client.get("/user/profile"),
+        "toggle_bookmark": toggle,
+        "submit_movie_rating": lambda client: client.post(
+            "/movies/submit_movie_rating",
+            {"movie_id": movie_id(), "rating": rng.choice((1, 2, 3, 4, 5))},
+        ),
+    }
+
+
+def percentile(cuts, p):
+    return round(cuts[p - 1] * 1000, 3)
+
+
+def measure(requests, warmup, seed):
+    """Run every scenario against the configured database; returns the results."""
+    sys.path.insert(0, str(SRC_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "movie_db.settings")
+    import django
+
+    django.setup()
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.db.models import Count
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    from movies.models import Movie
+
+    rng = random.Random(seed)
+    # The most active user has the heaviest profile page.
+    user = User.objects.annotate(activity=Count("rates")).order_by("-activity").first()
+    client = Client(SERVER_NAME="localhost")
+    client.force_login(user)
+
+    results = {}
+    for name, run in scenarios(rng, Movie.objects.count()).items():
+        for _ in range(warmup):
+            run(client)
+        latencies, queries, errors = [], [], 0
+        started = time.perf_counter()
+        for _ in range(requests):
+            with CaptureQueriesContext(connection) as captured:
+                request_started = time.perf_counter()
+                response = run(client)
+                latencies.append(time.perf_counter() - request_started)
+            queries.append(len(captured))
+            errors += response.status_code >= 400
+        elapsed = time.perf_counter() - started
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        results[name] = {
+            "requests": requests,
+            "errors": errors,
+            "p50_ms": percentile(cuts, 50),
+            "p95_ms": percentile(cuts, 95),
+            "p99_ms": percentile(cuts, 99),
+            "mean_queries": round(statistics.fmean(queries), 2),
+            "max_queries": max(queries),
+            "throughput_rps": round(requests / elapsed, 1),
+        }
+    return results
+
+
+def seed(scale, reseed):
+    """Path of a database seeded with ``scale`` movies, creating it if needed."""
+    DATA_DIR.mkdir(exist_ok=True)
+    path = DATA_DIR / f"movies-{scale}.sqlite3"
+    if path.exists() and not reseed:
+        return path
+    path.unlink(missing_ok=True)
+    # Progress goes to stderr; stdout carries only the report.
+    run = {"cwd": SRC_DIR, "env": {**os.environ, "MOVIE_DB_NAME": str(path)}, "stdout": sys.stderr}
+    manage = [sys.executable, "manage.py"]
+    subprocess.run([*manage, "migrate", "--verbosity", "0"], check=True, **run)
+    subprocess.run(
+        [*manage, "seed_synthetic", "--movies", str(scale), "--users", str(max(100, scale // 10))],
+        check=True,
+        **run,
+    )
+    return path
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=SRC_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=list(DEFAULT_SCALES))
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per view.")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reseed", action="store_true", help="Rebuild the seeded databases.")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        json.dump(measure(args.requests, args.warmup, args.seed), sys.stdout)
+        return 0
+
+    report = {
+        "commit": commit(),
+        "python": platform.python_version(),
+        "requests_per_view": args.requests,
+        "scales": {},
+    }
+    for scale in args.scales:
+        path = seed(scale, args.reseed)
+        child = subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                "--measure",
+                "--requests",
+                str(args.requests),
+                "--warmup",
+                str(args.warmup),
+                "--seed",
+                str(args.seed),
+            ],
+            env={**os.environ, "MOVIE_DB_NAME": str(path)},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        report["scales"][str(scale)] = json.loads(child.stdout)
+        print(f"measured {scale} movies", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""Cached "Trending Movies" list for the home page.
+
+The list is the head of the precomputed overall ranking and is read from
+the cache on every hit. It is invalidated (after commit) when the ranking
+changes within its first TOP_MOVIES_COUNT positions or a listed movie is
+edited.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from movies import rankings
+from movies.models import Movie
+from movies.signals import rankings_changed
+
+TOP_MOVIES_KEY = "home:top_movies"
+TOP_MOVIES_COUNT = 5
+
+
+def get_top_movies():
+    top_movies = cache.get(TOP_MOVIES_KEY)
+    if top_movies is None:
+        top_movies = [ranking.movie for ranking in rankings.top(rankings.ALL, TOP_MOVIES_COUNT)]
+        cache.set(TOP_MOVIES_KEY, top_movies, settings.HOME_TOP_MOVIES_TIMEOUT)
+    return top_movies
+
+
+def invalidate_top_movies():
+    transaction.on_commit(lambda: cache.delete(TOP_MOVIES_KEY))
+
+
+@receiver(rankings_changed)
+def refresh_on_ranking_change(sender, changes, **kwargs):
+    if changes.get(rankings.ALL, TOP_MOVIES_COUNT + 1) <= TOP_MOVIES_COUNT:
+        invalidate_top_movies()
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def refresh_on_movie_change(sender, instance, **kwargs):
+    top_movies = cache.get(TOP_MOVIES_KEY)
+    if top_movies is not None and instance.pk in {movie.pk for movie in top_movies}:
+        invalidate_top_movies()
@@ -1,12 +1,15 @@
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse, resolve
 from movies.models import Movie
 from user.models import Rating
 from django.contrib.auth.models import User
 from .views import home
+from .cache import TOP_MOVIES_KEY
 
 class HomeViewTest(TestCase):
     def setUp(self):
+        cache.clear()
         self.user1 = User.objects.create_user(username="user1", password="testpass123")
         self.user2 = User.objects.create_user(username="user2", password="testpass123")
 
@@ -17,18 +20,20 @@ class HomeViewTest(TestCase):
         self.movie5 = Movie.objects.create(title="Movie 5", genre="Horror", duration=95, director="Director 5", release_year=2018)
         self.movie6 = Movie.objects.create(title="Movie 6", genre="Sci-Fi", duration=100, director="Director 6", release_year=2022)
 
-        Rating.objects.create(user=self.user1, movie=self.movie1, rating=5)
-        Rating.objects.create(user=self.user2, movie=self.movie1, rating=4)
-        Rating.objects.create(user=self.user1, movie=self.movie2, rating=3)
-        Rating.objects.create(user=self.user2, movie=self.movie2, rating=2)
-        Rating.objects.create(user=self.user1, movie=self.movie3, rating=4.5)
-        Rating.objects.create(user=self.user2, movie=self.movie3, rating=5)
-        Rating.objects.create(user=self.user1, movie=self.movie4, rating=1)
-        Rating.objects.create(user=self.user2, movie=self.movie4, rating=1.5)
-        Rating.objects.create(user=self.user1, movie=self.movie5, rating=3)
-        Rating.objects.create(user=self.user2, movie=self.movie5, rating=4)
-        Rating.objects.create(user=self.user1, movie=self.movie6, rating=2)
-        Rating.objects.create(user=self.user2, movie=self.movie6, rating=3.5)
+        # The rankings the page reads are refreshed after commit.
+        with self.captureOnCommitCallbacks(execute=True):
+            Rating.objects.create(user=self.user1, movie=self.movie1, rating=5)
+            Rating.objects.create(user=self.user2, movie=self.movie1, rating=4)
+            Rating.objects.create(user=self.user1, movie=self.movie2, rating=3)
+            Rating.objects.create(user=self.user2, movie=self.movie2, rating=2)
+            Rating.objects.create(user=self.user1, movie=self.movie3, rating=4.5)
+            Rating.objects.create(user=self.user2, movie=self.movie3, rating=5)
+            Rating.objects.create(user=self.user1, movie=self.movie4, rating=1)
+            Rating.objects.create(user=self.user2, movie=self.movie4, rating=1.5)
+            Rating.objects.create(user=self.user1, movie=self.movie5, rating=3)
+            Rating.objects.create(user=self.user2, movie=self.movie5, rating=4)
+            Rating.objects.create(user=self.user1, movie=self.movie6, rating=2)
+            Rating.objects.create(user=self.user2, movie=self.movie6, rating=3.5)
 
     def test_home_view(self):
         '''Test the top movies panel'''
@@ -44,6 +49,44 @@ class HomeViewTest(TestCase):
         self.assertEqual(top_movie_titles[0], "Movie 3")
         self.assertIn("Movie 1", top_movie_titles)
         self.assertNotIn("Movie 4", top_movie_titles)
+
+    def test_home_view_is_cached(self):
+        '''Test that a warm home page runs no queries'''
+        self.client.get(reverse("home"))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("home"))
+        self.assertEqual(response.context["top_movies"][0].title, "Movie 3")
+
+    def test_rating_inside_top_movies_invalidates(self):
+        '''Test that a rating change on a listed movie refreshes the list'''
+        self.client.get(reverse("home"))
+        with self.captureOnCommitCallbacks(execute=True):
+            Rating.objects.get(user=self.user2, movie=self.movie1).delete()
+        self.assertIsNone(cache.get(TOP_MOVIES_KEY))
+        response = self.client.get(reverse("home"))
+        # A single 5-star vote no longer outranks two votes averaging 4.75.
+        top_movies = response.context["top_movies"]
+        self.assertEqual([movie.title for movie in top_movies[:2]], ["Movie 3", "Movie 1"])
+        self.assertEqual(top_movies[1].average_rating, 5.0)
+
+    def test_rating_below_boundary_keeps_cache(self):
+        '''Test that a change that cannot reach the top movies keeps the cache'''
+        self.client.get(reverse("home"))
+        with self.captureOnCommitCallbacks(execute=True):
+            Rating.objects.get(user=self.user1, movie=self.movie4).delete()
+        self.assertIsNotNone(cache.get(TOP_MOVIES_KEY))
+        with self.assertNumQueries(0):
+            self.client.get(reverse("home"))
+
+    def test_rating_crossing_boundary_invalidates(self):
+        '''Test that a movie rising above the last listed movie refreshes the list'''
+        self.client.get(reverse("home"))
+        user3 = User.objects.create_user(username="user3", password="testpass123")
+        with self.captureOnCommitCallbacks(execute=True):
+            Rating.objects.create(user=user3, movie=self.movie4, rating=5)
+            Rating.objects.filter(movie=self.movie4).exclude(user=user3).delete()
+        response = self.client.get(reverse("home"))
+        self.assertIn("Movie 4", [movie.title for movie in response.context["top_movies"]])
         
 class URLTests(TestCase):
 
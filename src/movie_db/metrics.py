@@ -0,0 +1,189 @@
+"""Per-request performance metrics exported in the Prometheus format.
+
+``MetricsMiddleware`` times each request and labels everything with the
+route name (``movies``, ``movie_info``, ``profile``, ...), so label values
+stay bounded no matter which URLs clients try. While a request runs its
+counters live in a context variable, which ``sync_to_async`` copies into
+the worker threads of async views. The SQL wrapper installed on every new
+connection and the template backend below report into it.
+
+With several worker processes set ``PROMETHEUS_MULTIPROC_DIR`` as described
+in the prometheus_client documentation; ``/metrics`` then aggregates all
+workers.
+"""
+
+import os
+import time
+from collections import Counter as Occurrences
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.template.backends.django import DjangoTemplates
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+UNRESOLVED = "<unresolved>"
+# A statement run this many times in one request is reported as an N+1.
+N_PLUS_ONE_THRESHOLD = 5
+
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+SIZE_BUCKETS = (1_000, 5_000, 20_000, 50_000, 100_000, 500_000, 1_000_000)
+
+REQUESTS = Counter(
+    "django_http_requests", "Requests by route name, method and status.", ["view", "method", "status"]
+)
+LATENCY = Histogram(
+    "django_http_request_duration_seconds", "Time spent handling a request.", ["view", "method"]
+)
+RESPONSE_SIZE = Histogram(
+    "django_http_response_size_bytes",
+    "Size of non-streaming response bodies.",
+    ["view"],
+    buckets=SIZE_BUCKETS,
+)
+QUERIES = Histogram(
+    "django_db_queries_per_request", "SQL statements run per request.", ["view"], buckets=QUERY_BUCKETS
+)
+QUERY_TIME = Histogram(
+    "django_db_query_duration_seconds_per_request", "Time spent in SQL per request.", ["view"]
+)
+DUPLICATE_QUERIES = Histogram(
+    "django_db_duplicate_queries_per_request",
+    "SQL statements per request that repeat an earlier one with any parameters.",
+    ["view"],
+    buckets=QUERY_BUCKETS,
+)
+N_PLUS_ONE = Counter(
+    "django_db_n_plus_one_requests",
+    f"Requests running one statement at least {N_PLUS_ONE_THRESHOLD} times.",
+    ["view"],
+)
+TEMPLATE_TIME = Histogram(
+    "django_template_render_duration_seconds", "Time spent rendering templates per request.", ["view"]
+)
+
+
+class RequestStats:
+    def __init__(self):
+        self.statements = Occurrences()
+        self.query_time = 0.0
+        self.template_time = 0.0
+
+
+_current = ContextVar("request_stats", default=None)
+
+
+def _count_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.query_time += time.perf_counter() - start
+        stats.statements[sql] += 1
+
+
+@receiver(connection_created)
+def install_query_counter(sender, connection, **kwargs):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+# Connections this thread opened before the middleware was loaded.
+for _connection in connections.all(initialized_only=True):
+    install_query_counter(None, _connection)
+
+
+class _TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        start = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            if stats is not None:
+                stats.template_time += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing each top-level render."""
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name))
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, start = RequestStats(), time.perf_counter()
+        token = _current.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        stats, start = RequestStats(), time.perf_counter()
+        token = _current.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, stats, duration):
+        match = request.resolver_match
+        view = match.view_name if match else UNRESOLVED
+        REQUESTS.labels(view, request.method, response.status_code).inc()
+        LATENCY.labels(view, request.method).observe(duration)
+        if not response.streaming:
+            RESPONSE_SIZE.labels(view).observe(len(response.content))
+        queries = sum(stats.statements.values())
+        QUERIES.labels(view).observe(queries)
+        QUERY_TIME.labels(view).observe(stats.query_time)
+        DUPLICATE_QUERIES.labels(view).observe(queries - len(stats.statements))
+        if stats.statements and max(stats.statements.values()) >= N_PLUS_ONE_THRESHOLD:
+            N_PLUS_ONE.labels(view).inc()
+        TEMPLATE_TIME.labels(view).observe(stats.template_time)
+
+
+def metrics(request):
+    registry = REGISTRY
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -30,9 +30,44 @@ ALLOWED_HOSTS = []
 
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 EMAIL_FILE_PATH = '/tmp/app-messages' 
+LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
 
+# Seconds a filtered movie list total is cached; None hides the total.
+MOVIE_LIST_TOTAL_TIMEOUT = 300
+
+# Seconds a movie list page is cached under the catalog version; 0 disables
+# the page cache. `manage.py cache_stats` reports its hit ratio.
+MOVIE_LIST_CACHE_TIMEOUT = 300
+
+# The home page top movies are invalidated by rating changes; the timeout
+# only bounds staleness after bulk imports that bypass model signals.
+HOME_TOP_MOVIES_TIMEOUT = 3600
+
+# Per-user bookmarked movie id sets; dropped whenever a bookmark changes.
+# The long timeout relies on the shared cache below; with a per-process
+# cache user.cache keeps them for seconds.
+BOOKMARK_IDS_TIMEOUT = 24 * 3600
+
+# Write-behind rating aggregation: rating writes only queue their movie and
+# `manage.py drain_rating_queue` recomputes the queued movies every
+# RATING_RECOMPUTE_INTERVAL seconds, which bounds how stale averages get.
+# The queue lives in the same database, so each rating still takes the
+# write lock; what shrinks is the transaction holding it.
+RATING_WRITE_BEHIND = False
+RATING_RECOMPUTE_INTERVAL = 5
+
+# Top lists (movies.rankings): the number of votes at the global mean every
+# movie starts with, and how many movies each overall/genre/decade list keeps.
+RANKING_MIN_VOTES = 10
+RANKING_SIZE = 100
+
+# Factor files written by `manage.py train_recommender` and memory-mapped
+# by the profile page, which shows PROFILE_RECOMMENDATIONS of them.
+RECOMMENDER_DIR = BASE_DIR / "recommender"
+PROFILE_RECOMMENDATIONS = 10
+
 
 # Application definition
 
@@ -50,6 +85,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its latency covers the rest of the stack.
+    "movie_db.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -63,7 +100,8 @@ ROOT_URLCONF = "movie_db.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates, timed for movie_db.metrics.
+        "BACKEND": "movie_db.metrics.TimedDjangoTemplates",
         "DIRS": [],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -86,7 +124,56 @@ WSGI_APPLICATION = "movie_db.wsgi.application"
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        # Point MOVIE_DB_NAME elsewhere for synthetic benchmark databases.
+        "NAME": os.environ.get("MOVIE_DB_NAME", BASE_DIR / "db.sqlite3"),
+    }
+}
+
+# MOVIE_DB_PROFILE=production tunes SQLite for concurrent traffic: WAL lets
+# readers run alongside the single writer, IMMEDIATE transactions take the
+# write lock up front so waiting on busy_timeout works (a deferred
+# transaction upgrading to a write fails at once), and connections are
+# kept open between requests. Write views also retry on SQLITE_BUSY
+# (movies.db.retry_on_busy).
+SQLITE_PRODUCTION_PRAGMAS = {
+    "journal_mode": "WAL",
+    # Durable at checkpoints; a power loss can only drop the last commits.
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    # Negative values are KiB: 64 MiB of page cache per connection.
+    "cache_size": -64 * 1024,
+    "busy_timeout": 5000,
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",
+}
+
+if os.environ.get("MOVIE_DB_PROFILE") == "production":
+    DATABASES["default"].update(
+        {
+            "OPTIONS": {
+                "init_command": ";".join(
+                    f"PRAGMA {name}={value}" for name, value in SQLITE_PRODUCTION_PRAGMAS.items()
+                ),
+                "transaction_mode": "IMMEDIATE",
+            },
+            "CONN_MAX_AGE": 600,
+            "CONN_HEALTH_CHECKS": True,
+        }
+    )
+
+# Cache
+# One cache for every worker process and management command, so the version
+# bumps and invalidations of movies.cache and user.cache reach all of them;
+# Django's default per-process LocMemCache would leave the other workers
+# serving retired entries. MOVIE_CACHE_DIR must be a directory all workers
+# share. A Redis or Memcached backend works as well.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get("MOVIE_CACHE_DIR", BASE_DIR / "cache"),
+        # Every write counts the files; past this many it culls a third.
+        "OPTIONS": {"MAX_ENTRIES": 20_000},
     }
 }
 
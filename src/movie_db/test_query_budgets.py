@@ -0,0 +1,183 @@
+"""Query-count budgets: every view must cost the same number of queries at every size.
+
+Each test grows the same dataset through ``SIZES`` (movies, other users,
+their ratings and bookmarks, similar movies) and requests one view at each
+size with a cold cache. A count that changes with the data is an N+1; the
+failure message lists the statements the largest run repeated.
+"""
+
+import json
+import re
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from movies import autocomplete
+from movies.models import Movie, MovieNeighbor
+from user.models import Bookmark, Rating
+
+User = get_user_model()
+
+SIZES = (2, 8, 24)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def repeated_statements(queries):
+    """The statements of ``queries`` that ran more than once, literals masked."""
+    counts = Counter(_LITERALS.sub("?", query["sql"]) for query in queries)
+    repeated = [(count, sql) for sql, count in counts.items() if count > 1]
+    if not repeated:
+        return "No statement repeated; the extra queries are distinct."
+    return "\n".join(f"{count} x {sql}" for count, sql in sorted(repeated, reverse=True))
+
+
+class QueryBudgetTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="viewer")
+        cls.featured = Movie.objects.create(title="Featured", genre="DRAMA", release_year=1999)
+        cls.target = Movie.objects.create(title="Target", genre="COMEDY", release_year=2010)
+
+    def setUp(self):
+        self.size = 0
+        self.client.force_login(self.user)
+
+    def grow(self, size):
+        """Add rows until every relation the views walk has ``size`` entries."""
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(self.size, size):
+                movie = Movie.objects.create(
+                    title=f"Movie {i:03d}", genre="DRAMA", release_year=1980 + i
+                )
+                other = User.objects.create_user(username=f"member{i}")
+                Rating.objects.create(user=other, movie=self.featured, rating=i % 5 + 1)
+                Rating.objects.create(user=other, movie=movie, rating=4)
+                Rating.objects.create(user=self.user, movie=movie, rating=3)
+                Bookmark.objects.create(user=other, movie=self.featured)
+                Bookmark.objects.create(user=self.user, movie=movie)
+                MovieNeighbor.objects.create(
+                    movie=self.featured, neighbor=movie, rank=i + 1, score=1 / (i + 1)
+                )
+        self.size = size
+
+    def assertQueriesConstant(self, request, undo=None):
+        counts, largest = {}, None
+        for size in SIZES:
+            self.grow(size)
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = request()
+                # Streamed bodies run their queries while being consumed.
+                body = response.getvalue()
+            self.assertLess(response.status_code, 400, body[:200])
+            counts[size], largest = len(queries), queries.captured_queries
+            if undo:
+                undo()
+        if len(set(counts.values())) > 1:
+            self.fail(
+                f"Query count grows with the data {counts}; repeated at size "
+                f"{SIZES[-1]}:\n{repeated_statements(largest)}"
+            )
+
+    def test_home(self):
+        self.assertQueriesConstant(lambda: self.client.get(reverse("home")))
+
+    def test_movie_list(self):
+        self.assertQueriesConstant(lambda: self.client.get(reverse("movies")))
+
+    def test_filtered_movie_list(self):
+        self.assertQueriesConstant(
+            lambda: self.client.get(reverse("movies"), {"title": "movie", "genre": "DRAMA"})
+        )
+
+    def test_movie_info(self):
+        self.assertQueriesConstant(
+            lambda: self.client.get(reverse("movie_info", args=[self.featured.pk]))
+        )
+
+    def test_movie_ratings(self):
+        self.assertQueriesConstant(
+            lambda: self.client.get(reverse("movie_ratings", args=[self.featured.pk]))
+        )
+
+    def test_profile(self):
+        self.assertQueriesConstant(lambda: self.client.get(reverse("profile")))
+
+    def test_genre_stats(self):
+        self.assertQueriesConstant(lambda: self.client.get(reverse("genre_stats")))
+
+    def test_top_movies(self):
+        self.assertQueriesConstant(
+            lambda: self.client.get(reverse("top_genre", args=["DRAMA"]))
+        )
+
+    def test_title_autocomplete(self):
+        self.addCleanup(setattr, autocomplete, "index", autocomplete.index)
+
+        def search():
+            # Measure the cold build, which is the part that reads the catalog.
+            autocomplete.index = autocomplete.TitleIndex()
+            return self.client.get(reverse("title_autocomplete"), {"q": "mov"})
+
+        self.assertQueriesConstant(search)
+
+    def test_toggle_bookmark(self):
+        self.assertQueriesConstant(
+            lambda: self.client.post(
+                reverse("toggle_bookmark"), {"movie_id": self.target.pk, "action": "add"}
+            ),
+            undo=lambda: Bookmark.objects.filter(user=self.user, movie=self.target).delete(),
+        )
+
+    def test_submit_movie_rating(self):
+        self.assertQueriesConstant(
+            lambda: self.client.post(
+                reverse("submit_movie_rating"), {"movie_id": self.target.pk, "rating": 4}
+            ),
+            undo=lambda: Rating.objects.filter(user=self.user, movie=self.target).delete(),
+        )
+
+    def test_batch_operations(self):
+        operations = [
+            {"type": "bookmark", "movie_id": self.target.pk, "action": "add"},
+            {"type": "rating", "movie_id": self.target.pk, "rating": 2},
+        ]
+
+        def undo():
+            Bookmark.objects.filter(user=self.user, movie=self.target).delete()
+            Rating.objects.filter(user=self.user, movie=self.target).delete()
+
+        self.assertQueriesConstant(
+            lambda: self.client.post(
+                reverse("batch_operations"), {"operations": json.dumps(operations)}
+            ),
+            undo=undo,
+        )
+
+    def test_api_movie_list(self):
+        self.assertQueriesConstant(lambda: self.client.get(reverse("api_movie_list")))
+
+    def test_api_movie_search(self):
+        self.assertQueriesConstant(
+            lambda: self.client.get(reverse("api_movie_search"), {"q": "movie"})
+        )
+
+    def test_api_movie_detail(self):
+        self.assertQueriesConstant(
+            lambda: self.client.get(reverse("api_movie_detail", args=[self.featured.pk]))
+        )
+
+    def test_api_movie_batch(self):
+        self.assertQueriesConstant(
+            lambda: self.client.get(
+                reverse("api_movie_batch"),
+                {"ids": ",".join(str(pk) for pk in Movie.objects.values_list("pk", flat=True))},
+            )
+        )
@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from prometheus_client import REGISTRY
+
+from movies.models import Movie
+from user.models import Rating
+
+from . import metrics
+
+User = get_user_model()
+
+
+class MetricsMiddlewareTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="viewer", password="testpass")
+        cls.movie = Movie.objects.create(title="Heat", genre="ACTION", release_year=1995)
+        Rating.objects.create(user=cls.user, movie=cls.movie, rating=4)
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username="viewer", password="testpass")
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_records_per_route_metrics(self):
+        """Test that a request is counted under its route name with its SQL and render time."""
+        before = {
+            name: self.sample(name, view="movie_info")
+            for name in (
+                "django_db_queries_per_request_sum",
+                "django_template_render_duration_seconds_count",
+                "django_http_response_size_bytes_sum",
+            )
+        }
+        requests = self.sample(
+            "django_http_requests_total", view="movie_info", method="GET", status="200"
+        )
+        response = self.client.get(reverse("movie_info", args=[self.movie.pk]))
+
+        self.assertEqual(
+            self.sample("django_http_requests_total", view="movie_info", method="GET", status="200"),
+            requests + 1,
+        )
+        self.assertGreater(
+            self.sample("django_db_queries_per_request_sum", view="movie_info"),
+            before["django_db_queries_per_request_sum"],
+        )
+        self.assertEqual(
+            self.sample("django_template_render_duration_seconds_count", view="movie_info"),
+            before["django_template_render_duration_seconds_count"] + 1,
+        )
+        self.assertEqual(
+            self.sample("django_http_response_size_bytes_sum", view="movie_info"),
+            before["django_http_response_size_bytes_sum"] + len(response.content),
+        )
+
+    def test_unknown_urls_share_one_label(self):
+        before = self.sample(
+            "django_http_requests_total", view=metrics.UNRESOLVED, method="GET", status="404"
+        )
+        self.client.get("/no/such/page/")
+        self.client.get("/another/one/")
+        self.assertEqual(
+            self.sample(
+                "django_http_requests_total", view=metrics.UNRESOLVED, method="GET", status="404"
+            ),
+            before + 2,
+        )
+
+    def test_repeated_statements_are_reported(self):
+        """Test that duplicate statements and N+1 patterns are counted per request."""
+        stats = metrics.RequestStats()
+        token = metrics._current.set(stats)
+        try:
+            for movie in Movie.objects.all():
+                for _ in range(metrics.N_PLUS_ONE_THRESHOLD):
+                    Rating.objects.filter(movie=movie).count()
+        finally:
+            metrics._current.reset(token)
+        self.assertEqual(sum(stats.statements.values()), 1 + metrics.N_PLUS_ONE_THRESHOLD)
+        self.assertEqual(len(stats.statements), 2)
+
+        response = self.client.get(reverse("profile"))
+        before = self.sample("django_db_n_plus_one_requests_total", view="profile")
+        metrics.MetricsMiddleware(None).record(response.wsgi_request, response, stats, 0.01)
+        self.assertEqual(
+            self.sample("django_db_n_plus_one_requests_total", view="profile"), before + 1
+        )
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse("home"))
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(
+            response, 'django_http_request_duration_seconds_count{method="GET",view="home"}'
+        )
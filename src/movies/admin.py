@@ -1,4 +1,8 @@
 from django.contrib import admin
 from . import models
 
-admin.site.register(models.Movie)
\ No newline at end of file
+
+@admin.register(models.Movie)
+class MovieAdmin(admin.ModelAdmin):
+    # Shown for reference; the rating and bookmark writes maintain them.
+    readonly_fields = models.Movie.TOTAL_FIELDS
@@ -0,0 +1,122 @@
+"""Read-only JSON catalog API.
+
+Rows are serialized straight from ``values()``; list and batch responses
+are streamed. Every response carries an ETag derived from the catalog
+version and the normalized query, so unchanged data costs a 304.
+"""
+
+import json
+from hashlib import md5
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import condition, require_GET
+
+from . import search
+from .cache import catalog_version
+from .filters import MovieFilter
+from .models import Movie
+from .pagination import KeysetPaginator
+
+API_FIELDS = (
+    "id",
+    "title",
+    "genre",
+    "director",
+    "release_year",
+    "duration",
+    "average_rating",
+    "rating_count",
+)
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def catalog_etag(request, *args, **kwargs):
+    query = sorted((key, value) for key, values in request.GET.lists() for value in values)
+    payload = f"{catalog_version()}:{request.path}:{query}"
+    return md5(payload.encode(), usedforsecurity=False).hexdigest()
+
+
+def _int_param(request, name, default, maximum):
+    try:
+        value = int(request.GET.get(name, default))
+    except ValueError:
+        value = default
+    return max(1, min(value, maximum))
+
+
+def _stream(rows, limit=None, paginator=None):
+    """Yield a ``{"results": [...], "next": ...}`` document row by row."""
+    yield '{"results": ['
+    last = None
+    more = False
+    for index, row in enumerate(rows):
+        if limit is not None and index == limit:
+            more = True
+            break
+        yield ("," if index else "") + json.dumps(row, cls=DjangoJSONEncoder)
+        last = row
+    next_cursor = paginator.encode(paginator.key_of(last)) if more else None
+    yield f'], "next": {json.dumps(next_cursor)}}}'
+
+
+def _streaming_json(chunks):
+    return StreamingHttpResponse(chunks, content_type="application/json")
+
+
+@require_GET
+@condition(etag_func=catalog_etag)
+def movie_list(request):
+    movies = MovieFilter(request.GET, queryset=Movie.objects.all()).qs.values(*API_FIELDS)
+    limit = _int_param(request, "limit", DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    paginator = KeysetPaginator(movies, limit, ordering=("title",))
+    queryset, _, reverse = paginator.page_queryset(request.GET.get("cursor"))
+    if reverse:
+        # The API only hands out forward cursors.
+        queryset, _, _ = paginator.page_queryset()
+    rows = queryset.iterator(chunk_size=500)
+    return _streaming_json(_stream(rows, limit, paginator))
+
+
+@require_GET
+@condition(etag_func=catalog_etag)
+def movie_search(request):
+    """Movies matching ``q`` in title or director, most relevant (BM25) first.
+
+    The other MovieFilter parameters narrow the matches; there is no cursor,
+    relevance order only makes sense for the first ``limit`` hits.
+    """
+    movies = MovieFilter(request.GET, queryset=Movie.objects.all()).qs
+    limit = _int_param(request, "limit", DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    matches = search.ranked(movies, request.GET.get("q", "")).values(*API_FIELDS)[:limit]
+    return _streaming_json(_stream(matches.iterator(chunk_size=500)))
+
+
+@require_GET
+@condition(etag_func=catalog_etag)
+def movie_detail(request, pk):
+    movie = Movie.objects.filter(pk=pk).values(*API_FIELDS).first()
+    if movie is None:
+        raise Http404("Movie not found.")
+    return JsonResponse(movie)
+
+
+@require_GET
+@condition(etag_func=catalog_etag)
+def movie_batch(request):
+    ids = set()
+    for value in request.GET.get("ids", "").split(","):
+        value = value.strip()
+        if not value:
+            continue
+        # isdigit() also accepts "²", which int() then rejects.
+        if not (value.isascii() and value.isdecimal()):
+            return JsonResponse({"error": f"Invalid movie id: {value!r}."}, status=400)
+        ids.add(int(value))
+    if len(ids) > MAX_PAGE_SIZE:
+        return JsonResponse(
+            {"error": f"At most {MAX_PAGE_SIZE} ids per request."}, status=400
+        )
+    rows = Movie.objects.filter(pk__in=ids).order_by("id").values(*API_FIELDS)
+    return _streaming_json(_stream(rows.iterator(chunk_size=500)))
@@ -1,6 +1,22 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_migrate
+
+
+def install_search_index(sender, using, **kwargs):
+    from . import search
+
+    search.install(connections[using])
 
 
 class MoviesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "movies"
+
+    def ready(self):
+        from . import cache  # noqa: F401 -- connects the catalog version receivers
+        from . import stats  # noqa: F401 -- connects the genre/decade stats receivers
+        from . import rankings  # noqa: F401 -- after stats, whose totals it reads
+        from . import autocomplete  # noqa: F401 -- keeps the title index current
+
+        post_migrate.connect(install_search_index, sender=self)
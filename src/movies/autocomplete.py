@@ -0,0 +1,292 @@
+"""Per-process title autocomplete index.
+
+Titles are normalized (accents stripped, case folded, whitespace collapsed)
+into keys kept in one sorted list, so the titles starting with a prefix are
+the slice between two bisects. Lookups return the best rated titles of that
+slice:
+
+* prefixes of up to PRECOMPUTED_LENGTH characters match slices of tens of
+  thousands of titles, so their top MAX_RESULTS are computed when the index
+  is built and kept current on every change;
+* longer prefixes take the best of their slice with heapq; results for
+  slices over SCAN_LIMIT titles are memoized until the next change.
+
+The index is built on the first lookup in each process. Changes committed
+in this process are applied in place. Each change also bumps the
+TitleIndexVersion row in its own transaction; every process checks that
+row about once a second, and when a change made elsewhere moved it,
+rebuilds in a background thread while lookups keep answering from the
+current index (rating changes made elsewhere only reorder results and show
+up with that rebuild).
+
+Memory on 64-bit CPython is about 360 bytes per title: the key and title
+strings (roughly 50 bytes of header each plus the text), the entry list and
+its float, the sorted-list slot and two dict entries. A 1M-title catalog
+takes about 360 MB per process (twice that during a rebuild) and ten
+seconds to build; the precomputed prefix tables add a few MB. Lookups take tens of microseconds, except the
+first lookup of a long prefix matching a huge slice (about 10 ms for
+100k titles), which is then memoized.
+"""
+
+import heapq
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Movie, TitleIndexVersion
+from .signals import ratings_changed
+
+MAX_RESULTS = 10
+PRECOMPUTED_LENGTH = 3
+SCAN_LIMIT = 200
+# Seconds between checks of the shared titles version.
+VERSION_CHECK_INTERVAL = 1.0
+
+# Sorts after every character a key can continue with.
+_LAST = chr(0x10FFFF)
+
+
+def normalize(text):
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(char for char in text if not unicodedata.combining(char))
+    normalized = " ".join(text.casefold().split())
+    # A trailing space typed into the box ends the word: "alien " skips "aliens".
+    if normalized and text[-1].isspace():
+        normalized += " "
+    return normalized
+
+
+def _titles_version():
+    return TitleIndexVersion.objects.values_list("value", flat=True).first() or 0
+
+
+def _bump_titles_version():
+    """Count one title change in the current transaction; returns the new count."""
+    versions = TitleIndexVersion.objects.filter(pk=1)
+    if not versions.update(value=F("value") + 1):
+        TitleIndexVersion.objects.bulk_create([TitleIndexVersion(pk=1)], ignore_conflicts=True)
+        versions.update(value=F("value") + 1)
+    return versions.values_list("value", flat=True).get()
+
+
+class TitleIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._keys = None
+        self._version = None
+        self._checked = 0.0
+        # The background rebuild thread, while one runs.
+        self._rebuild = None
+
+    @property
+    def ready(self):
+        return self._keys is not None
+
+    def build(self):
+        """Load every title into new tables, then swap them in.
+
+        Only the swap takes the lock, so lookups keep answering from the
+        current tables while the titles load.
+        """
+        fresh = TitleIndex()
+        fresh._load()
+        with self._lock:
+            self._entries, self._key_of = fresh._entries, fresh._key_of
+            self._keys, self._top = fresh._keys, fresh._top
+            self._memo = {}
+            self._version = fresh._version
+            self._checked = time.monotonic()
+
+    def _load(self):
+        self._version = _titles_version()
+        self._entries = {}
+        self._key_of = {}
+        for movie_id, title, rating in (
+            Movie.objects.values_list("pk", "title", "average_rating")
+            .order_by()
+            .iterator(chunk_size=10_000)
+        ):
+            self._add(movie_id, title, rating)
+        self._keys = sorted(self._entries)
+        self._top = {}
+        for key in sorted(self._keys, key=self._rank):
+            for length in range(1, PRECOMPUTED_LENGTH + 1):
+                top = self._top.setdefault(key[:length], [])
+                if len(top) < MAX_RESULTS:
+                    top.append(key)
+
+    def search(self, text, limit=MAX_RESULTS):
+        """``(id, title, average_rating)`` of the best rated titles starting with ``text``."""
+        prefix = normalize(text)
+        if not prefix:
+            return []
+        with self._lock:
+            self._ensure_current()
+            if len(prefix) <= PRECOMPUTED_LENGTH:
+                keys = self._top.get(prefix, [])
+            elif prefix in self._memo:
+                keys = self._memo[prefix]
+            else:
+                keys = self._scan(prefix)
+            return [
+                (movie_id, title, rating)
+                for rating, movie_id, title in map(self._entries.__getitem__, keys[:limit])
+            ]
+
+    def upsert(self, movie_id, title, rating):
+        with self._lock:
+            if not self.ready:
+                return
+            key = self._key_of.get(movie_id)
+            if key is not None and self._entries[key][2] == title:
+                self._set_rating(key, rating)
+                return
+            self.remove(movie_id)
+            key = self._add(movie_id, title, rating)
+            insort(self._keys, key)
+            self._changed(key, dropped=False)
+
+    def remove(self, movie_id):
+        with self._lock:
+            if not self.ready or movie_id not in self._key_of:
+                return
+            key = self._key_of.pop(movie_id)
+            del self._keys[bisect_left(self._keys, key)]
+            del self._entries[key]
+            self._changed(key, dropped=True)
+
+    def set_ratings(self, ratings):
+        with self._lock:
+            if not self.ready:
+                return
+            for movie_id, rating in ratings:
+                key = self._key_of.get(movie_id)
+                if key is not None:
+                    self._set_rating(key, rating)
+
+    def mark_current(self, version):
+        """Adopt a version bump that only reflects changes already applied here."""
+        with self._lock:
+            if self._version is not None and version == self._version + 1:
+                self._version = version
+
+    def _add(self, movie_id, title, rating):
+        # The space ends the last word, so "alien " also finds "Alien" itself;
+        # the id keeps keys unique when titles differ only in case or accents.
+        key = f"{normalize(title)} \0{movie_id}"
+        self._entries[key] = [rating, movie_id, title]
+        self._key_of[movie_id] = key
+        return key
+
+    def _rank(self, key):
+        return -self._entries[key][0], key
+
+    def _scan(self, prefix):
+        low = bisect_left(self._keys, prefix)
+        high = bisect_left(self._keys, prefix + _LAST, low)
+        keys = heapq.nsmallest(MAX_RESULTS, self._keys[low:high], key=self._rank)
+        if high - low > SCAN_LIMIT:
+            self._memo[prefix] = keys
+        return keys
+
+    def _set_rating(self, key, rating):
+        entry = self._entries[key]
+        if entry[0] != rating:
+            dropped = rating < entry[0]
+            entry[0] = rating
+            self._changed(key, dropped)
+
+    def _changed(self, key, dropped):
+        """Bring the memoized and precomputed results in line with a change to ``key``.
+
+        Only a listed title that left or dropped can let an unlisted one in, so
+        that is the one case that rescans the (possibly huge) prefix slice.
+        """
+        self._memo.clear()
+        for length in range(1, PRECOMPUTED_LENGTH + 1):
+            prefix = key[:length]
+            top = self._top.setdefault(prefix, [])
+            if key in top:
+                if dropped:
+                    self._top[prefix] = self._scan(prefix)
+                else:
+                    top.sort(key=self._rank)
+            elif key in self._entries and (
+                len(top) < MAX_RESULTS or self._rank(key) < self._rank(top[-1])
+            ):
+                insort(top, key, key=self._rank)
+                del top[MAX_RESULTS:]
+
+    def _ensure_current(self):
+        if not self.ready:
+            # Nothing to answer from yet.
+            self.build()
+            return
+        now = time.monotonic()
+        if now - self._checked < VERSION_CHECK_INTERVAL or self._rebuild is not None:
+            return
+        self._checked = now
+        if _titles_version() != self._version:
+            self._rebuild = threading.Thread(
+                target=self._build_in_background, name="title-index-rebuild", daemon=True
+            )
+            self._rebuild.start()
+
+    def _build_in_background(self):
+        try:
+            self.build()
+        finally:
+            self._rebuild = None
+            # This thread's connection is not closed by any request cycle.
+            connection.close()
+
+
+index = TitleIndex()
+
+
+def invalidate():
+    """Make every process rebuild, e.g. after a bulk import bypassed the signals."""
+    _bump_titles_version()
+
+
+def _apply_after_commit(change):
+    version = _bump_titles_version()
+
+    def apply():
+        change()
+        index.mark_current(version)
+
+    transaction.on_commit(apply)
+
+
+@receiver(post_save, sender=Movie)
+def update_on_movie_save(sender, instance, **kwargs):
+    movie_id, title, rating = instance.pk, instance.title, instance.average_rating
+    _apply_after_commit(lambda: index.upsert(movie_id, title, rating))
+
+
+@receiver(post_delete, sender=Movie)
+def update_on_movie_delete(sender, instance, **kwargs):
+    movie_id = instance.pk
+    _apply_after_commit(lambda: index.remove(movie_id))
+
+
+@receiver(ratings_changed)
+def update_on_ratings_changed(sender, deltas, **kwargs):
+    if not index.ready:
+        return
+    movie_ids = list(deltas)
+
+    def apply():
+        index.set_ratings(
+            Movie.objects.filter(pk__in=movie_ids).values_list("pk", "average_rating")
+        )
+
+    transaction.on_commit(apply)
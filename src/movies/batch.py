@@ -0,0 +1,126 @@
+"""Apply a batch of bookmark and rating operations for one user.
+
+All operations share one transaction and one lookup per table. Whatever
+the number of operations on a movie, its totals are updated once.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+
+from user.cache import invalidate_bookmarks
+from user.models import Bookmark, Rating
+from .models import Movie
+
+MAX_OPERATIONS = 100
+
+
+class BatchError(ValueError):
+    pass
+
+
+def _parse(operation):
+    """Validate one operation; returns a normalized dict or None."""
+    if not isinstance(operation, dict):
+        return None
+    try:
+        movie_id = int(operation.get("movie_id"))
+    except (TypeError, ValueError):
+        return None
+    kind = operation.get("type")
+    if kind == "bookmark" and operation.get("action") in ("add", "remove"):
+        return {"type": kind, "movie_id": movie_id, "action": operation["action"]}
+    if kind == "rating":
+        try:
+            value = float(operation.get("rating"))
+        except (TypeError, ValueError):
+            return None
+        if 0 <= value <= 5:
+            return {"type": kind, "movie_id": movie_id, "rating": value}
+    return None
+
+
+def apply_operations(user, operations):
+    if not isinstance(operations, list):
+        raise BatchError("Operations must be a list.")
+    if len(operations) > MAX_OPERATIONS:
+        raise BatchError(f"At most {MAX_OPERATIONS} operations per batch.")
+    parsed = [_parse(operation) for operation in operations]
+    movie_ids = {operation["movie_id"] for operation in parsed if operation}
+
+    with transaction.atomic():
+        known = set(Movie.objects.filter(pk__in=movie_ids).values_list("pk", flat=True))
+        bookmarked = set(
+            Bookmark.objects.filter(user=user, movie_id__in=known).values_list(
+                "movie_id", flat=True
+            )
+        )
+        old_ratings = dict(
+            Rating.objects.filter(user=user, movie_id__in=known).values_list(
+                "movie_id", "rating"
+            )
+        )
+
+        results = []
+        bookmark_state = {movie_id: movie_id in bookmarked for movie_id in known}
+        new_ratings = {}
+        for operation in parsed:
+            if operation is None:
+                results.append({"status": "invalid", "message": "Invalid operation."})
+            elif operation["movie_id"] not in known:
+                results.append({"status": "error", "message": "Movie not found."})
+            elif operation["type"] == "bookmark":
+                movie_id = operation["movie_id"]
+                if operation["action"] == "remove":
+                    result = {"status": "removed", "message": "Bookmark removed."}
+                elif bookmark_state[movie_id]:
+                    result = {"status": "exists", "message": "Already bookmarked."}
+                else:
+                    result = {"status": "added", "message": "Bookmark added."}
+                bookmark_state[movie_id] = operation["action"] == "add"
+                results.append(result)
+            else:
+                new_ratings[operation["movie_id"]] = operation["rating"]
+                results.append({"status": "rated", "message": "Rating saved."})
+
+        _write_bookmarks(user, bookmarked, bookmark_state)
+        _write_ratings(user, old_ratings, new_ratings)
+    return results
+
+
+def _write_bookmarks(user, bookmarked, bookmark_state):
+    added = [m for m, state in bookmark_state.items() if state and m not in bookmarked]
+    removed = [m for m, state in bookmark_state.items() if not state and m in bookmarked]
+    if added:
+        # bulk_create sends no post_save, so do the receivers' work here.
+        Bookmark.objects.bulk_create(
+            Bookmark(user=user, movie_id=movie_id) for movie_id in added
+        )
+        for movie_id in added:
+            Movie.apply_bookmark_delta(movie_id, 1)
+        invalidate_bookmarks(user.pk)
+    if removed:
+        # Queryset deletes run the post_delete receivers for each bookmark.
+        Bookmark.objects.filter(user=user, movie_id__in=removed).delete()
+
+
+def _write_ratings(user, old_ratings, new_ratings):
+    if not new_ratings:
+        return
+    Rating.objects.bulk_create(
+        [
+            Rating(user=user, movie_id=movie_id, rating=value)
+            for movie_id, value in new_ratings.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["user", "movie"],
+        update_fields=["rating", "updated_at"],
+    )
+    deltas = defaultdict(lambda: [0.0, 0])
+    for movie_id, value in new_ratings.items():
+        previous = old_ratings.get(movie_id)
+        deltas[movie_id][0] += value - (previous or 0)
+        deltas[movie_id][1] += previous is None
+    for movie_id, (sum_delta, count_delta) in deltas.items():
+        if sum_delta or count_delta:
+            Movie.apply_rating_delta(movie_id, sum_delta, count_delta)
@@ -0,0 +1,111 @@
+"""Catalog version used to key caches and ETags of movie data.
+
+Any change to movie rows or their rating totals bumps the version after
+commit, which retires every entry keyed on the previous one at once. The
+movie list keeps its pages and totals here under such versioned keys.
+The cache is shared by all processes (settings.CACHES), so a bump from
+one worker or a management command retires the entries of every worker.
+"""
+
+import json
+import time
+from decimal import Decimal
+from hashlib import md5
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Movie
+from .signals import ratings_changed
+
+CATALOG_VERSION_KEY = "movies:catalog_version"
+LIST_CACHE_COUNTER_KEY = "movies:list_cache:{}"
+
+
+def is_shared():
+    """Whether other processes see this cache, so deleting an entry reaches them."""
+    return not isinstance(caches["default"], LocMemCache)
+
+
+def catalog_version():
+    # Seeded from the clock so a flushed cache never reuses an old version.
+    return cache.get_or_set(CATALOG_VERSION_KEY, lambda: time.time_ns(), None)
+
+
+def _bump():
+    # A fresh value rather than incr(): the file cache reads and rewrites on
+    # incr, and gives the key the default timeout again.
+    cache.set(CATALOG_VERSION_KEY, time.time_ns(), None)
+
+
+def bump_catalog_version():
+    transaction.on_commit(_bump)
+
+
+def _normalized(value):
+    if isinstance(value, str):
+        return " ".join(value.casefold().split())
+    if isinstance(value, Decimal):
+        return str(value.normalize())
+    return value
+
+
+def filter_digest(movie_filter):
+    """Digest of the filters a ``MovieFilter`` actually applies.
+
+    Built from the cleaned form data, so parameter order, unknown or invalid
+    parameters, surrounding whitespace and the case of text searches (which
+    match case-insensitively) all map to the same digest.
+    """
+    form = movie_filter.form
+    form.is_valid()
+    applied = {
+        name: _normalized(value)
+        for name, value in form.cleaned_data.items()
+        if value not in (None, "")
+    }
+    payload = json.dumps(applied, sort_keys=True, default=str)
+    return md5(payload.encode(), usedforsecurity=False).hexdigest()
+
+
+def movie_list_key(movie_filter, cursor):
+    page = md5((cursor or "").encode(), usedforsecurity=False).hexdigest()
+    return f"movies:list:{catalog_version()}:{filter_digest(movie_filter)}:{page}"
+
+
+def movie_list_total_key(digest):
+    return f"movies:total:{catalog_version()}:{digest}"
+
+
+def count_list_lookup(hit):
+    key = LIST_CACHE_COUNTER_KEY.format("hits" if hit else "misses")
+    # Not atomic on the file cache; concurrent lookups can lose a count,
+    # which the hit ratio tolerates.
+    cache.set(key, cache.get(key, 0) + 1, None)
+
+
+def list_cache_stats():
+    """``(hits, misses, hit ratio)`` of the movie list cache."""
+    counters = cache.get_many([LIST_CACHE_COUNTER_KEY.format(name) for name in ("hits", "misses")])
+    hits = counters.get(LIST_CACHE_COUNTER_KEY.format("hits"), 0)
+    misses = counters.get(LIST_CACHE_COUNTER_KEY.format("misses"), 0)
+    lookups = hits + misses
+    return hits, misses, hits / lookups if lookups else None
+
+
+def reset_list_cache_stats():
+    cache.delete_many([LIST_CACHE_COUNTER_KEY.format(name) for name in ("hits", "misses")])
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def bump_on_movie_change(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(ratings_changed)
+def bump_on_rating_change(sender, **kwargs):
+    bump_catalog_version()
@@ -0,0 +1,89 @@
+"""Retrying write transactions that lose the SQLite write lock.
+
+SQLite allows one writer at a time. ``busy_timeout`` already waits for the
+lock inside SQLite; when even that runs out the whole unit of work is
+retried after a randomized, exponentially growing pause ("full jitter"),
+so competing writers do not wake up in lockstep and collide again.
+
+Under ASGI every request runs its ORM calls in a thread of its own, so one
+worker process can field dozens of writers at once where a WSGI worker has
+one; SQLite's busy handler does not queue them fairly and the unlucky ones
+time out. Async units of work therefore take turns within a process.
+"""
+
+import asyncio
+import functools
+import random
+import sqlite3
+import time
+import weakref
+
+from asgiref.sync import iscoroutinefunction
+from django.db import OperationalError, connection
+
+BUSY_CODES = {sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED}
+
+# One lock per event loop; a worker process normally runs just one.
+_write_locks = weakref.WeakKeyDictionary()
+
+
+def is_busy(error):
+    cause = error.__cause__
+    if getattr(cause, "sqlite_errorcode", None) is not None:
+        return cause.sqlite_errorcode & 0xFF in BUSY_CODES
+    message = str(error)
+    return "database is locked" in message or "database is busy" in message
+
+
+def backoff(attempt, base_delay, max_delay):
+    return random.uniform(0, min(max_delay, base_delay * 2**attempt))
+
+
+def _write_lock():
+    loop = asyncio.get_running_loop()
+    lock = _write_locks.get(loop)
+    if lock is None:
+        lock = _write_locks[loop] = asyncio.Lock()
+    return lock
+
+
+def retry_on_busy(func=None, *, attempts=5, base_delay=0.01, max_delay=0.5):
+    """Rerun ``func`` when SQLite reports the database busy or locked.
+
+    Wrap whole units of work that are either one transaction or idempotent
+    (get_or_create, update_or_create, deletes); a retry repeats all of
+    them. Inside an outer ``atomic()`` block the transaction is already
+    broken, so the error is raised at once. Works on sync and async views;
+    async ones run one at a time per event loop, so they must not nest.
+    """
+    if func is None:
+        return functools.partial(
+            retry_on_busy, attempts=attempts, base_delay=base_delay, max_delay=max_delay
+        )
+
+    if iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            for attempt in range(attempts):
+                try:
+                    async with _write_lock():
+                        return await func(*args, **kwargs)
+                except OperationalError as error:
+                    if not is_busy(error) or attempt == attempts - 1:
+                        raise
+                await asyncio.sleep(backoff(attempt, base_delay, max_delay))
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(attempts):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as error:
+                if not is_busy(error) or attempt == attempts - 1 or connection.in_atomic_block:
+                    raise
+            time.sleep(backoff(attempt, base_delay, max_delay))
+
+    return wrapper
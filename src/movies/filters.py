@@ -1,13 +1,21 @@
 from django_filters import CharFilter, FilterSet, ChoiceFilter, NumberFilter
 from django.forms.widgets import TextInput, NumberInput, Select
 from .models import Movie
+from . import search
 
 
 class MovieFilter(FilterSet):
     title = CharFilter(
         field_name="title",
-        lookup_expr="icontains",
-        widget=TextInput(attrs={"class": "form-control", "placeholder": "Title"}),
+        method="filter_text",
+        widget=TextInput(
+            attrs={
+                "class": "form-control",
+                "placeholder": "Title",
+                "list": "title-suggestions",
+                "autocomplete": "off",
+            }
+        ),
     )
 
     genre = ChoiceFilter(
@@ -20,7 +28,7 @@ class MovieFilter(FilterSet):
 
     director = CharFilter(
         field_name="director",
-        lookup_expr="icontains",
+        method="filter_text",
         widget=TextInput(attrs={"class": "form-control", "placeholder": "Director"}),
     )
 
@@ -42,3 +50,6 @@ class MovieFilter(FilterSet):
     class Meta:
         model = Movie
         fields = []
+
+    def filter_text(self, queryset, name, value):
+        return search.filter_queryset(queryset, name, value)
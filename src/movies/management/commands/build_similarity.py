@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from movies.models import PendingSimilarityRefresh, SimilarityRun
+from user.models import Rating
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute each movie's most similar movies (item-item cosine over "
+        "ratings). Refreshes only movies rated, or with a rating deleted, since "
+        "the last run unless --full."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top-k", type=int, default=20)
+        parser.add_argument(
+            "--chunk-size", type=int, default=50_000, help="Ratings read per query."
+        )
+        parser.add_argument(
+            "--block-size", type=int, default=256, help="Movies scored per matrix product."
+        )
+        parser.add_argument("--full", action="store_true", help="Rebuild every movie.")
+
+    def handle(self, *args, **options):
+        try:
+            from movies import similarity
+        except ImportError as error:
+            raise CommandError(f"build_similarity needs numpy and scipy: {error}")
+        for name in ("top_k", "chunk_size", "block_size"):
+            if options[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be positive.")
+
+        # Taken before reading, so ratings written during the run are
+        # picked up again by the next one.
+        started_at = timezone.now()
+        movie_ids = None
+        last = SimilarityRun.objects.order_by("-started_at").first()
+        if last is not None and not options["full"]:
+            movie_ids = set(
+                Rating.objects.filter(updated_at__gte=last.started_at)
+                .values_list("movie_id", flat=True)
+                .distinct()
+            )
+            movie_ids.update(PendingSimilarityRefresh.objects.values_list("movie_id", flat=True))
+
+        clock = time.monotonic()
+        count = 0
+        if movie_ids is None or movie_ids:
+            count = similarity.build(
+                movie_ids,
+                top_k=options["top_k"],
+                chunk_size=options["chunk_size"],
+                block_size=options["block_size"],
+            )
+        # Deletions queued during the run stay for the next one.
+        PendingSimilarityRefresh.objects.filter(queued_at__lt=started_at).delete()
+        SimilarityRun.objects.create(
+            started_at=started_at, full=movie_ids is None, movie_count=count
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Refreshed neighbors of {count} movies in {time.monotonic() - clock:.1f}s."
+            )
+        )
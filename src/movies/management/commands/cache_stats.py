@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from movies.cache import list_cache_stats, reset_list_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Report hits, misses and the hit ratio of the movie list page cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true", help="Zero the counters after reporting them."
+        )
+
+    def handle(self, *args, **options):
+        hits, misses, ratio = list_cache_stats()
+        ratio = "n/a" if ratio is None else f"{ratio:.1%}"
+        self.stdout.write(f"Movie list cache: {hits} hits, {misses} misses, hit ratio {ratio}.")
+        if options["reset"]:
+            reset_list_cache_stats()
@@ -0,0 +1,56 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError
+
+from movies.db import is_busy
+from movies.models import PendingRatingRecompute
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the rating totals of movies queued by write-behind rating "
+        "writes (RATING_WRITE_BEHIND), once per movie per interval."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.RATING_RECOMPUTE_INTERVAL,
+            help="Seconds between passes; the maximum staleness of averages.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--once", action="store_true", help="Drain the queue and exit.")
+
+    def handle(self, *args, **options):
+        interval = options["interval"]
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        try:
+            while True:
+                started = time.monotonic()
+                total = 0
+                try:
+                    while count := PendingRatingRecompute.drain(batch_size):
+                        total += count
+                except OperationalError as error:
+                    if not is_busy(error):
+                        raise
+                    # Still locked after drain()'s own retries; the queue
+                    # keeps the rest for the next pass.
+                    self.stderr.write(f"Database busy, pass cut short: {error}")
+                    if options["once"]:
+                        raise CommandError(
+                            f"Recomputed ratings of {total} movies, queue not drained."
+                        )
+                if total or options["once"]:
+                    self.stdout.write(f"Recomputed ratings of {total} movies.")
+                if options["once"]:
+                    return
+                time.sleep(max(0.0, interval - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,188 @@
+import csv
+import json
+import os
+import re
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from movies import autocomplete, rankings, stats
+from movies.cache import bump_catalog_version
+from movies.forms import MovieForm
+from movies.models import Movie
+
+MOVIELENS_YEAR = re.compile(r"^(?P<title>.*?)\s*\((?P<year>\d{4})\)\s*$")
+MOVIELENS_GENRES = {
+    "Action": "ACTION",
+    "Comedy": "COMEDY",
+    "Drama": "DRAMA",
+    "Fantasy": "FANTASY",
+    "Horror": "HORROR",
+    "Sci-Fi": "SCI_FI",
+    "Romance": "ROMANCE",
+    "Thriller": "THRILLER",
+    "Documentary": "DOCUMENTARY",
+    "Animation": "ANIMATION",
+}
+
+
+def movielens_row(record):
+    """Map a MovieLens ``movieId,title,genres`` row onto Movie fields.
+
+    The "(YYYY)" suffix moves into release_year; ``movielens_title`` keeps
+    the full title for Command.keep_years().
+    """
+    title = (record.get("title") or "").strip()
+    year = None
+    match = MOVIELENS_YEAR.match(title)
+    if match:
+        title, year = match["title"], match["year"]
+    genre = next(
+        (
+            MOVIELENS_GENRES[name]
+            for name in (record.get("genres") or "").split("|")
+            if name in MOVIELENS_GENRES
+        ),
+        "OTHER",
+    )
+    return {
+        "title": title,
+        "genre": genre,
+        "duration": 0,
+        "director": "Unknown",
+        "release_year": year,
+        "movielens_title": (record.get("title") or "").strip(),
+    }
+
+
+def read_records(path, fmt):
+    with open(path, newline="", encoding="utf-8") as handle:
+        if fmt == "jsonl":
+            for line in handle:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        # Rejected by Command.clean() along with the other bad records.
+                        yield None
+            return
+        reader = csv.DictReader(handle)
+        movielens = fmt == "movielens" or (
+            fmt is None and "genres" in (reader.fieldnames or [])
+        )
+        for record in reader:
+            yield movielens_row(record) if movielens else record
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream a movie catalog (CSV, JSONL or MovieLens movies.csv) and upsert "
+        "it on the unique title in batches."
+    )
+    fields = [Movie._meta.get_field(name) for name in MovieForm._meta.fields]
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "jsonl", "movielens"])
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.exists(path):
+            raise CommandError(f"File not found: {path}")
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive.")
+        fmt = options["format"]
+        if fmt is None and path.endswith((".jsonl", ".json")):
+            fmt = "jsonl"
+
+        records = read_records(path, fmt)
+        inserted = updated = rejected = 0
+        line = 0
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            cleaned = []
+            for record in batch:
+                line += 1
+                try:
+                    movie = self.clean(record)
+                except ValidationError as error:
+                    rejected += 1
+                    if options["verbosity"] > 1:
+                        self.stderr.write(f"Record {line} rejected: {'; '.join(error.messages)}")
+                    continue
+                cleaned.append((movie, record.get("movielens_title")))
+            movies = {movie.title: movie for movie in self.keep_years(cleaned)}
+            batch_inserted, batch_updated = self.upsert(list(movies.values()))
+            inserted += batch_inserted
+            updated += batch_updated
+            if options["verbosity"] > 0:
+                self.stdout.write(f"{line} records read")
+
+        if inserted or updated:
+            # The upserts bypass the receivers that keep these in step.
+            stats.rebuild()
+            rankings.rebuild()
+            autocomplete.invalidate()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Inserted {inserted}, updated {updated}, rejected {rejected} movies."
+            )
+        )
+
+    def clean(self, record):
+        """Validate one record with the MovieForm field rules, without a form."""
+        if not isinstance(record, dict):
+            raise ValidationError("Not a JSON object.")
+        values = {}
+        errors = []
+        for field in self.fields:
+            value = record.get(field.name)
+            if isinstance(value, str):
+                value = value.strip()
+            try:
+                values[field.name] = field.clean(value, None)
+            except ValidationError as error:
+                errors.extend(f"{field.name}: {message}" for message in error.messages)
+        if errors:
+            raise ValidationError(errors)
+        return Movie(**values)
+
+    def keep_years(self, cleaned):
+        """Yield the movies, giving a MovieLens title its year back where needed.
+
+        Stripping "(YYYY)" makes remakes such as "Hamlet (1990)" and
+        "Hamlet (1996)" share a title, and the upsert would merge them. The
+        first film keeps the bare title; a film from another year keeps its
+        full MovieLens title, in this batch and in later imports.
+        """
+        titles = [movie.title for movie, full_title in cleaned if full_title]
+        years = dict(
+            Movie.objects.filter(title__in=titles).values_list("title", "release_year")
+        ) if titles else {}
+        for movie, full_title in cleaned:
+            if full_title and years.setdefault(movie.title, movie.release_year) != movie.release_year:
+                movie.title = full_title
+            yield movie
+
+    def upsert(self, movies):
+        if not movies:
+            return 0, 0
+        with transaction.atomic():
+            existing = Movie.objects.filter(
+                title__in=[movie.title for movie in movies]
+            ).count()
+            Movie.objects.bulk_create(
+                movies,
+                update_conflicts=True,
+                unique_fields=["title"],
+                update_fields=[field.name for field in self.fields if field.name != "title"],
+            )
+            # bulk_create sends no post_save, so retire cached catalog data here.
+            bump_catalog_version()
+        return len(movies) - existing, existing
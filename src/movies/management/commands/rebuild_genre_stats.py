@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from movies import stats
+from movies.models import Movie
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the genre/decade statistics table from movies, ratings and "
+        "bookmarks, or with --check only report buckets that drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Compare without writing; exit with an error if anything drifted.",
+        )
+
+    def handle(self, *args, **options):
+        if not options["check"]:
+            stats.rebuild()
+            self.stdout.write("Genre statistics rebuilt.")
+            return
+
+        drifted = stats.drift()
+        labels = dict(Movie.GENRE_CHOICES)
+        for (genre, decade), (stored, expected) in sorted(drifted.items()):
+            changes = ", ".join(
+                f"{name} {stored[name]} != {expected[name]}"
+                for name in stats.TOTALS
+                if stored[name] != expected[name]
+            )
+            self.stdout.write(f"{labels.get(genre, genre)} {decade}s: {changes}")
+        if drifted:
+            raise CommandError(f"{len(drifted)} buckets drifted; run without --check to rebuild.")
+        self.stdout.write("Genre statistics are consistent.")
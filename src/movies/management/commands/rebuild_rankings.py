@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from movies import rankings
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the global mean rating, rescore every movie and rebuild the "
+        "overall, per-genre and per-decade top lists. Run it periodically."
+    )
+
+    def handle(self, *args, **options):
+        scopes = rankings.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt {len(scopes)} rankings with a prior mean of {rankings.prior_mean():.2f}."
+            )
+        )
@@ -0,0 +1,271 @@
+import random
+import time
+from datetime import datetime as dt
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from movies import autocomplete, rankings, stats
+from movies.cache import bump_catalog_version
+from movies.models import Movie
+from user.models import Bookmark, Rating
+
+ADJECTIVES = (
+    "Silent", "Broken", "Golden", "Last", "Hidden", "Crimson", "Distant", "Frozen",
+    "Burning", "Lost", "Savage", "Quiet", "Electric", "Midnight", "Endless", "Fallen",
+    "Secret", "Wild", "Hollow", "Iron", "Velvet", "Bitter", "Shining", "Dark",
+)
+NOUNS = (
+    "River", "Empire", "Garden", "Horizon", "Station", "Kingdom", "Signal", "Harbor",
+    "Mirror", "Frontier", "Island", "Machine", "Summer", "Winter", "Shadow", "Road",
+    "Promise", "Storm", "City", "Orchard", "Voyage", "Letter", "Engine", "Crown",
+)
+FIRST_NAMES = (
+    "Anna", "Ben", "Clara", "David", "Elena", "Felix", "Grace", "Hugo", "Ines", "Jonas",
+    "Kasia", "Leo", "Maya", "Nils", "Olga", "Pavel", "Rosa", "Sam", "Tara", "Viktor",
+)
+LAST_NAMES = (
+    "Novak", "Berg", "Costa", "Duval", "Eriksen", "Fischer", "Garcia", "Hale", "Ito",
+    "Jansen", "Kowalski", "Lindqvist", "Moreau", "Nakamura", "Okafor", "Petrov",
+)
+MOVIE_FIELDS = (
+    "id",
+    "title",
+    "genre",
+    "director",
+    "release_year",
+    "duration",
+    "rating_sum",
+    "rating_count",
+    "average_rating",
+    "bookmark_count",
+    "weighted_score",
+)
+# Relative share of each genre in the catalog.
+GENRE_SHARES = {
+    "ACTION": 12,
+    "COMEDY": 18,
+    "DRAMA": 24,
+    "FANTASY": 3,
+    "HORROR": 7,
+    "SCI_FI": 5,
+    "ROMANCE": 8,
+    "THRILLER": 10,
+    "DOCUMENTARY": 6,
+    "ANIMATION": 4,
+    "OTHER": 3,
+}
+
+
+def zipf_cum_weights(size, exponent):
+    """Cumulative weights of ranks 1..size under a Zipf law with ``exponent``."""
+    return list(accumulate(1 / rank**exponent for rank in range(1, size + 1)))
+
+
+def zipf_counts(total, size, exponent, cap):
+    """Split ``total`` over ``size`` ranks along a Zipf law, each count in [1, cap]."""
+    weights = zipf_cum_weights(size, exponent)
+    scale = total / weights[-1]
+    previous = 0.0
+    counts = []
+    for weight in weights:
+        counts.append(max(1, min(cap, round((weight - previous) * scale))))
+        previous = weight
+    return counts
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill an empty database with a reproducible synthetic catalog: movies "
+        "across every genre, users, and ratings and bookmarks whose movie "
+        "popularity and user activity follow Zipf laws. Rows are bulk inserted "
+        "and the rating totals, statistics and rankings are computed once at "
+        "the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--movies", type=int, default=1000)
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument(
+            "--ratings",
+            type=int,
+            help="Approximate total ratings (default: 5 per movie).",
+        )
+        parser.add_argument(
+            "--bookmarks",
+            type=int,
+            help="Approximate total bookmarks (default: 1 per movie).",
+        )
+        parser.add_argument(
+            "--zipf",
+            type=float,
+            default=1.0,
+            help="Zipf exponent of movie popularity and user activity.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--password",
+            default="synthetic",
+            help="Password of every generated user (hashed once).",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        movie_total, user_total = options["movies"], options["users"]
+        if movie_total < 1 or user_total < 1 or options["batch_size"] < 1:
+            raise CommandError("--movies, --users and --batch-size must be positive.")
+        if Movie.objects.exists():
+            raise CommandError(
+                "The catalog is not empty; seed a fresh database (see MOVIE_DB_NAME)."
+            )
+        ratings = options["ratings"] if options["ratings"] is not None else 5 * movie_total
+        bookmarks = options["bookmarks"] if options["bookmarks"] is not None else movie_total
+
+        self.rng = random.Random(options["seed"])
+        self.verbosity = options["verbosity"]
+        self.batch_size = options["batch_size"]
+        self.started = time.monotonic()
+        self.now = connection.ops.adapt_datetimefield_value(timezone.now())
+        first_user = (User.objects.order_by("-pk").values_list("pk", flat=True).first() or 0) + 1
+
+        # Movies go in last, once their totals are known; foreign keys are
+        # only checked at commit.
+        with transaction.atomic():
+            user_ids = self.create_users(first_user, user_total, options["password"])
+            popularity = list(range(1, movie_total + 1))
+            self.rng.shuffle(popularity)
+            cum_weights = zipf_cum_weights(movie_total, options["zipf"])
+            quality = [self.rng.gauss(3.4, 0.6) for _ in range(movie_total)]
+            rating_sum = [0.0] * movie_total
+            rating_count = [0] * movie_total
+            bookmark_count = [0] * movie_total
+
+            def rating_rows(user_id, movie_ids):
+                bias = self.rng.gauss(0, 0.4)
+                for movie_id in movie_ids:
+                    value = quality[movie_id - 1] + bias + self.rng.gauss(0, 0.7)
+                    value = min(5.0, max(0.5, round(value * 2) / 2))
+                    rating_sum[movie_id - 1] += value
+                    rating_count[movie_id - 1] += 1
+                    yield user_id, movie_id, value, self.now, self.now
+
+            def bookmark_rows(user_id, movie_ids):
+                for movie_id in movie_ids:
+                    bookmark_count[movie_id - 1] += 1
+                    yield user_id, movie_id, self.now
+
+            picks = (popularity, cum_weights, user_ids, options["zipf"])
+            self.insert(
+                Rating,
+                ("user", "movie", "rating", "created_at", "updated_at"),
+                self.per_user(ratings, rating_rows, *picks),
+            )
+            self.insert(
+                Bookmark,
+                ("user", "movie", "created_at"),
+                self.per_user(bookmarks, bookmark_rows, *picks),
+            )
+            self.insert(
+                Movie,
+                MOVIE_FIELDS,
+                self.movies(movie_total, rating_sum, rating_count, bookmark_count),
+            )
+
+        stats.rebuild()
+        rankings.rebuild()
+        autocomplete.invalidate()
+        bump_catalog_version()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeded {movie_total} movies, {user_total} users, {sum(rating_count)} "
+                f"ratings and {sum(bookmark_count)} bookmarks in "
+                f"{time.monotonic() - self.started:.1f}s."
+            )
+        )
+
+    def create_users(self, first_id, total, password):
+        hashed = make_password(password)
+        user_ids = list(range(first_id, first_id + total))
+        User.objects.bulk_create(
+            (
+                User(pk=user_id, username=f"synthetic{user_id}", password=hashed)
+                for user_id in user_ids
+            ),
+            batch_size=self.batch_size,
+        )
+        if self.verbosity:
+            self.report(User, total)
+        return user_ids
+
+    def per_user(self, total, rows, popularity, cum_weights, user_ids, exponent):
+        """Rows for ``total`` distinct (user, movie) pairs, Zipf on both sides."""
+        if not total:
+            return
+        active = user_ids[:]
+        self.rng.shuffle(active)
+        # A user touches at most a tenth of the catalog.
+        cap = max(1, len(popularity) // 10)
+        for user_id, count in zip(active, zipf_counts(total, len(active), exponent, cap)):
+            movie_ids = set()
+            while len(movie_ids) < count:
+                missing = count - len(movie_ids)
+                movie_ids.update(self.rng.choices(popularity, cum_weights=cum_weights, k=missing))
+            yield from rows(user_id, sorted(movie_ids))
+
+    def movies(self, total, rating_sum, rating_count, bookmark_count):
+        genres = [value for value, _ in Movie.GENRE_CHOICES]
+        genre_weights = list(accumulate(GENRE_SHARES.get(genre, 1) for genre in genres))
+        directors = [
+            f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}"
+            for _ in range(max(1, total // 20))
+        ]
+        this_year = dt.now().year
+        for index in range(total):
+            movie_id = index + 1
+            year = max(1900, this_year - int(self.rng.expovariate(1 / 15)))
+            yield (
+                movie_id,
+                f"{self.rng.choice(ADJECTIVES)} {self.rng.choice(NOUNS)} {movie_id}",
+                self.rng.choices(genres, cum_weights=genre_weights)[0],
+                self.rng.choice(directors),
+                year,
+                self.rng.randint(75, 180),
+                rating_sum[index],
+                rating_count[index],
+                Movie.compute_average(rating_sum[index], rating_count[index]),
+                bookmark_count[index],
+                0,  # rankings.rebuild() scores every movie afterwards
+            )
+
+    def insert(self, model, fields, rows):
+        """Insert value tuples for ``fields`` with plain executemany calls.
+
+        Preparing model instances costs far more than the INSERT itself at
+        millions of rows, and nothing here needs the model layer.
+        """
+        quote = connection.ops.quote_name
+        columns = ", ".join(quote(model._meta.get_field(name).column) for name in fields)
+        sql = (
+            f"INSERT INTO {quote(model._meta.db_table)} ({columns}) "
+            f"VALUES ({', '.join(['%s'] * len(fields))})"
+        )
+        inserted = 0
+        rows = iter(rows)
+        with connection.cursor() as cursor:
+            while batch := list(islice(rows, self.batch_size)):
+                cursor.executemany(sql, batch)
+                inserted += len(batch)
+                if self.verbosity > 1:
+                    self.report(model, inserted)
+        if self.verbosity == 1:
+            self.report(model, inserted)
+
+    def report(self, model, inserted):
+        self.stdout.write(
+            f"{inserted} {model._meta.verbose_name_plural} inserted "
+            f"({time.monotonic() - self.started:.1f}s)"
+        )
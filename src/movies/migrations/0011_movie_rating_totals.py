@@ -0,0 +1,38 @@
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_totals(apps, schema_editor):
+    Movie = apps.get_model("movies", "Movie")
+    movies = Movie.objects.annotate(
+        total=Sum("rated_by__rating"), count=Count("rated_by")
+    )
+    for movie in movies.iterator():
+        movie.rating_sum = movie.total or 0
+        movie.rating_count = movie.count
+        movie.average_rating = (
+            round(movie.rating_sum / movie.rating_count, 2) if movie.rating_count else 0
+        )
+        movie.save(update_fields=["rating_sum", "rating_count", "average_rating"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("movies", "0010_alter_movie_duration_alter_movie_title"),
+        ("user", "0002_rating"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="movie",
+            name="rating_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="movie",
+            name="rating_sum",
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rating_totals, migrations.RunPython.noop),
+    ]
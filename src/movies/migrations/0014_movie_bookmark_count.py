@@ -0,0 +1,27 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_bookmark_count(apps, schema_editor):
+    Movie = apps.get_model("movies", "Movie")
+    movies = Movie.objects.annotate(count=Count("bookmarked_by")).filter(count__gt=0)
+    for movie in movies.iterator():
+        movie.bookmark_count = movie.count
+        movie.save(update_fields=["bookmark_count"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("movies", "0013_movie_filter_indexes"),
+        ("user", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="movie",
+            name="bookmark_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_bookmark_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,97 @@
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count, ExpressionWrapper, F, IntegerField, Sum
+
+TOTALS = ("movie_count", "rating_count", "rating_sum", "bookmark_count")
+
+
+def _decade(prefix=""):
+    return ExpressionWrapper(F(f"{prefix}release_year") / 10 * 10, output_field=IntegerField())
+
+
+def build_stats(apps, schema_editor):
+    Movie = apps.get_model("movies", "Movie")
+    Rating = apps.get_model("user", "Rating")
+    Bookmark = apps.get_model("user", "Bookmark")
+    GenreDecadeStats = apps.get_model("movies", "GenreDecadeStats")
+
+    totals = defaultdict(lambda: dict.fromkeys(TOTALS, 0))
+    movies = Movie.objects.values("genre", bucket_decade=_decade())
+    for row in movies.annotate(count=Count("id")).order_by():
+        totals[row["genre"], row["bucket_decade"]]["movie_count"] = row["count"]
+    ratings = Rating.objects.values(
+        bucket_genre=F("movie__genre"), bucket_decade=_decade("movie__")
+    )
+    for row in ratings.annotate(count=Count("id"), total=Sum("rating")).order_by():
+        bucket = totals[row["bucket_genre"], row["bucket_decade"]]
+        bucket["rating_count"] = row["count"]
+        bucket["rating_sum"] = row["total"]
+    bookmarks = Bookmark.objects.values(
+        bucket_genre=F("movie__genre"), bucket_decade=_decade("movie__")
+    )
+    for row in bookmarks.annotate(count=Count("id")).order_by():
+        totals[row["bucket_genre"], row["bucket_decade"]]["bookmark_count"] = row["count"]
+
+    GenreDecadeStats.objects.bulk_create(
+        GenreDecadeStats(genre=genre, decade=decade, **bucket)
+        for (genre, decade), bucket in totals.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("movies", "0015_pendingratingrecompute"),
+        ("user", "0003_timestamps"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GenreDecadeStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "genre",
+                    models.CharField(
+                        choices=[
+                            ("ACTION", "Action"),
+                            ("COMEDY", "Comedy"),
+                            ("DRAMA", "Drama"),
+                            ("FANTASY", "Fantasy"),
+                            ("HORROR", "Horror"),
+                            ("SCI_FI", "Science Fiction"),
+                            ("ROMANCE", "Romance"),
+                            ("THRILLER", "Thriller"),
+                            ("DOCUMENTARY", "Documentary"),
+                            ("ANIMATION", "Animation"),
+                            ("OTHER", "Other"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("decade", models.IntegerField()),
+                ("movie_count", models.IntegerField(default=0)),
+                ("rating_count", models.IntegerField(default=0)),
+                ("rating_sum", models.FloatField(default=0)),
+                ("bookmark_count", models.IntegerField(default=0)),
+            ],
+            options={
+                "ordering": ["genre", "decade"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("genre", "decade"), name="genre_decade_stats_unique"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
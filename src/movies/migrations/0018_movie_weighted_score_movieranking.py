@@ -0,0 +1,116 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import ExpressionWrapper, F, FloatField, Q, Sum, Value
+
+# RANKING_MIN_VOTES, RANKING_SIZE and the empty-catalog prior at the time.
+MIN_VOTES = 10
+SIZE = 100
+DEFAULT_MEAN = 2.5
+
+
+def build_rankings(apps, schema_editor):
+    Movie = apps.get_model("movies", "Movie")
+    MovieRanking = apps.get_model("movies", "MovieRanking")
+    RankingPrior = apps.get_model("movies", "RankingPrior")
+
+    totals = Movie.objects.aggregate(total=Sum("rating_sum"), count=Sum("rating_count"))
+    mean = totals["total"] / totals["count"] if totals["count"] else DEFAULT_MEAN
+    RankingPrior.objects.update_or_create(pk=1, defaults={"mean": mean})
+    Movie.objects.update(
+        weighted_score=ExpressionWrapper(
+            (F("rating_sum") + Value(MIN_VOTES * mean))
+            / (F("rating_count") + Value(float(MIN_VOTES))),
+            output_field=FloatField(),
+        )
+    )
+
+    scopes = {"all": Q()}
+    for genre, year in Movie.objects.values_list("genre", "release_year").distinct():
+        decade = year // 10 * 10
+        scopes[f"genre:{genre}"] = Q(genre=genre)
+        scopes[f"decade:{decade}"] = Q(release_year__gte=decade, release_year__lt=decade + 10)
+    for scope, condition in sorted(scopes.items()):
+        ranked = (
+            Movie.objects.filter(condition, rating_count__gt=0)
+            .order_by("-weighted_score", "title")
+            .values_list("pk", "weighted_score")[:SIZE]
+        )
+        MovieRanking.objects.bulk_create(
+            MovieRanking(scope=scope, position=position, movie_id=movie_id, score=score)
+            for position, (movie_id, score) in enumerate(ranked, start=1)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("movies", "0017_movieneighbor_similarityrun"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="movie",
+            name="weighted_score",
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="movie",
+            index=models.Index(fields=["weighted_score"], name="movie_score_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="movie",
+            index=models.Index(
+                fields=["genre", "weighted_score"], name="movie_genre_score_idx"
+            ),
+        ),
+        migrations.CreateModel(
+            name="MovieRanking",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("scope", models.CharField(max_length=32)),
+                ("position", models.PositiveIntegerField()),
+                ("score", models.FloatField()),
+                (
+                    "movie",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rankings",
+                        to="movies.movie",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["scope", "position"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("scope", "position"), name="movie_ranking_position_unique"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="RankingPrior",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("mean", models.FloatField()),
+                ("computed_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(build_rankings, migrations.RunPython.noop),
+    ]
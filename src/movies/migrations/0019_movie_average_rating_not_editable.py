@@ -0,0 +1,26 @@
+# Generated by Django 5.1 on 2026-10-18 20:17
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("movies", "0018_movie_weighted_score_movieranking"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="movie",
+            name="average_rating",
+            field=models.FloatField(
+                default=0,
+                editable=False,
+                validators=[
+                    django.core.validators.MinValueValidator(0),
+                    django.core.validators.MaxValueValidator(5),
+                ],
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1 on 2026-10-18 20:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("movies", "0020_pendingsimilarityrefresh"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="movie",
+            name="decade",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=models.F("release_year") / 10 * 10,
+                output_field=models.IntegerField(),
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="movie",
+            index=models.Index(
+                fields=["decade", "weighted_score"], name="movie_decade_score_idx"
+            ),
+        ),
+    ]
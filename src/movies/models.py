@@ -1,7 +1,36 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 from datetime import datetime as dt
-from django.db.models import Avg
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Sum, Value
+from django.db.models.functions import Coalesce, Round, NullIf
+from .db import retry_on_busy
+from .signals import bookmarks_changed, ratings_changed
+
+
+class MovieQuerySet(models.QuerySet):
+    def recompute_ratings(self):
+        """Rebuild the rating totals of the selected movies with one grouped query."""
+        movies = list(
+            self.annotate(
+                new_sum=Coalesce(Sum("rated_by__rating"), Value(0.0)),
+                new_count=Count("rated_by"),
+            ).only("pk", "rating_sum", "rating_count")
+        )
+        deltas = {}
+        for movie in movies:
+            delta = (movie.new_sum - movie.rating_sum, movie.new_count - movie.rating_count)
+            if delta != (0, 0):
+                deltas[movie.pk] = delta
+            movie.rating_sum = movie.new_sum
+            movie.rating_count = movie.new_count
+            movie.average_rating = movie.compute_average(movie.new_sum, movie.new_count)
+        self.model.objects.bulk_update(
+            movies, ["rating_sum", "rating_count", "average_rating"], batch_size=500
+        )
+        if deltas:
+            ratings_changed.send(sender=self.model, deltas=deltas)
+        return movies
 
 
 class Movie(models.Model):
@@ -27,15 +56,257 @@ class Movie(models.Model):
     genre = models.CharField(max_length=20, choices=GENRE_CHOICES)
     duration = models.IntegerField(default=0, validators=[MinValueValidator(0)])
     director = models.CharField(max_length=100, null=True, default="Unknown")
-    average_rating = models.FloatField(default=0, validators=[MinValueValidator(0), MaxValueValidator(5)])
+    average_rating = models.FloatField(
+        default=0, editable=False, validators=[MinValueValidator(0), MaxValueValidator(5)]
+    )
+    # Running totals of all ratings; average_rating is derived from them.
+    rating_sum = models.FloatField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    bookmark_count = models.PositiveIntegerField(default=0, editable=False)
+    # Bayesian average that movies.rankings orders top lists by.
+    weighted_score = models.FloatField(default=0, editable=False)
+    # Stored so the per-decade top lists have an index to walk.
+    decade = models.GeneratedField(
+        expression=F("release_year") / 10 * 10,
+        output_field=models.IntegerField(),
+        db_persist=True,
+    )
+
+    objects = MovieQuerySet.as_manager()
+
+    # Maintained with F() updates; never written back by a plain save().
+    TOTAL_FIELDS = (
+        "average_rating",
+        "rating_sum",
+        "rating_count",
+        "bookmark_count",
+        "weighted_score",
+    )
 
     class Meta:
         managed = True
+        indexes = [
+            # MovieFilter access paths; the movie list pages in title order.
+            models.Index(fields=["genre", "title"], name="movie_genre_title_idx"),
+            models.Index(fields=["genre", "release_year", "title"], name="movie_genre_year_idx"),
+            models.Index(fields=["genre", "average_rating"], name="movie_genre_rating_idx"),
+            models.Index(fields=["release_year", "title"], name="movie_year_idx"),
+            # Home page ranking and the minimum-rating filter.
+            models.Index(fields=["average_rating"], name="movie_rating_idx"),
+            # Rebuilding the overall and per-genre top lists.
+            models.Index(fields=["weighted_score"], name="movie_score_idx"),
+            models.Index(fields=["genre", "weighted_score"], name="movie_genre_score_idx"),
+            models.Index(fields=["decade", "weighted_score"], name="movie_decade_score_idx"),
+        ]
+
+    @staticmethod
+    def compute_average(rating_sum, rating_count):
+        return round(rating_sum / rating_count, 2) if rating_count else 0
+
+    @classmethod
+    def apply_rating_delta(cls, movie_id, sum_delta, count_delta):
+        """Atomically shift the rating totals of one movie and re-derive its average.
+
+        All expressions in the UPDATE read the row values from before the
+        update, so concurrent writers never overwrite each other. With
+        RATING_WRITE_BEHIND the movie is queued for the worker instead.
+        """
+        if settings.RATING_WRITE_BEHIND:
+            PendingRatingRecompute.enqueue(movie_id)
+            return
+        new_sum = F("rating_sum") + sum_delta
+        new_count = F("rating_count") + count_delta
+        cls.objects.filter(pk=movie_id).update(
+            rating_sum=new_sum,
+            rating_count=new_count,
+            average_rating=Coalesce(
+                Round(
+                    ExpressionWrapper(
+                        new_sum / NullIf(new_count, 0), output_field=FloatField()
+                    ),
+                    2,
+                ),
+                Value(0.0),
+            ),
+        )
+        ratings_changed.send(sender=cls, deltas={movie_id: (sum_delta, count_delta)})
+
+    @classmethod
+    def apply_bookmark_delta(cls, movie_id, delta):
+        cls.objects.filter(pk=movie_id).update(bookmark_count=F("bookmark_count") + delta)
+        bookmarks_changed.send(sender=cls, deltas={movie_id: delta})
+
+    def save(self, *args, **kwargs):
+        # An instance loaded before a rating or bookmark arrived holds stale
+        # totals; updating it must not overwrite the maintained ones.
+        updating = not self._state.adding and not kwargs.get("force_insert")
+        if updating and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.TOTAL_FIELDS
+            ]
+        super().save(*args, **kwargs)
 
     def update_average_rating(self):
-        average = self.rated_by.aggregate(Avg("rating"))["rating__avg"]
-        self.average_rating = round(average, 2) if average else 0
-        self.save()
+        (movie,) = Movie.objects.filter(pk=self.pk).recompute_ratings()
+        self.rating_sum = movie.rating_sum
+        self.rating_count = movie.rating_count
+        self.average_rating = movie.average_rating
 
     def __str__(self) -> str:
         return self.title
+
+
+class GenreDecadeStats(models.Model):
+    """Movie and rating totals per genre and release decade.
+
+    Kept in step with Movie by the receivers in movies.stats, which can also
+    rebuild the table from scratch.
+    """
+
+    genre = models.CharField(max_length=20, choices=Movie.GENRE_CHOICES)
+    decade = models.IntegerField()
+    # Plain integers: drift must never make a rating or bookmark write fail.
+    movie_count = models.IntegerField(default=0)
+    rating_count = models.IntegerField(default=0)
+    rating_sum = models.FloatField(default=0)
+    bookmark_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ["genre", "decade"]
+        constraints = [
+            models.UniqueConstraint(fields=["genre", "decade"], name="genre_decade_stats_unique")
+        ]
+
+    @property
+    def average_rating(self):
+        return Movie.compute_average(self.rating_sum, self.rating_count)
+
+    def __str__(self) -> str:
+        return f"{self.get_genre_display()} {self.decade}s"
+
+
+class MovieNeighbor(models.Model):
+    """One of the most similar movies to ``movie``, written by build_similarity."""
+
+    # Looked up by the unique (movie, rank) index; no separate FK index.
+    movie = models.ForeignKey(
+        Movie, on_delete=models.CASCADE, related_name="neighbors", db_index=False
+    )
+    neighbor = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name="+")
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ["movie", "rank"]
+        constraints = [
+            models.UniqueConstraint(fields=["movie", "rank"], name="movie_neighbor_rank_unique")
+        ]
+
+
+class PendingSimilarityRefresh(models.Model):
+    """A movie that lost a rating since its neighbors were last built.
+
+    Deleted ratings leave no row with a recent updated_at, so the next
+    incremental build_similarity run finds these movies here instead.
+    """
+
+    movie = models.OneToOneField(
+        Movie, on_delete=models.CASCADE, primary_key=True, related_name="+"
+    )
+    queued_at = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    def enqueue(cls, movie_id):
+        # Move queued_at forward so a run already in progress keeps the row.
+        cls.objects.bulk_create(
+            [cls(movie_id=movie_id)],
+            update_conflicts=True,
+            unique_fields=["movie"],
+            update_fields=["queued_at"],
+        )
+
+
+class SimilarityRun(models.Model):
+    """A completed build_similarity run; the latest one bounds the next refresh."""
+
+    started_at = models.DateTimeField()
+    full = models.BooleanField()
+    movie_count = models.PositiveIntegerField()
+
+    class Meta:
+        get_latest_by = "started_at"
+
+
+class MovieRanking(models.Model):
+    """Position of a movie in one precomputed top list, kept by movies.rankings."""
+
+    scope = models.CharField(max_length=32)
+    position = models.PositiveIntegerField()
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name="rankings")
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ["scope", "position"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["scope", "position"], name="movie_ranking_position_unique"
+            )
+        ]
+
+
+class RankingPrior(models.Model):
+    """The global mean rating weighted scores are computed with (a single row).
+
+    Frozen between rankings rebuilds so incrementally rescored movies stay
+    comparable with the rest.
+    """
+
+    mean = models.FloatField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+
+class TitleIndexVersion(models.Model):
+    """How many title changes were committed (a single row).
+
+    Every process polls it to tell whether its autocomplete index is behind;
+    movies.autocomplete bumps it in the transaction that makes the change.
+    """
+
+    value = models.BigIntegerField(default=0)
+
+
+class PendingRatingRecompute(models.Model):
+    """A movie whose rating totals wait for the write-behind worker.
+
+    One row per movie however many ratings arrive, so a burst of ratings
+    costs the worker a single recompute.
+    """
+
+    movie = models.OneToOneField(
+        Movie, on_delete=models.CASCADE, primary_key=True, related_name="+"
+    )
+    queued_at = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    def enqueue(cls, movie_id):
+        cls.objects.bulk_create([cls(movie_id=movie_id)], ignore_conflicts=True)
+
+    @classmethod
+    @retry_on_busy
+    def drain(cls, limit=1000):
+        """Recompute up to ``limit`` queued movies; returns how many there were.
+
+        The rows are deleted before the recompute in the same transaction,
+        so a rating committed meanwhile either is counted or re-queues. A
+        pass that loses the write lock to rating writers is rerun whole.
+        """
+        with transaction.atomic():
+            ids = list(
+                cls.objects.order_by("queued_at").values_list("movie_id", flat=True)[:limit]
+            )
+            if ids:
+                cls.objects.filter(movie_id__in=ids).delete()
+                Movie.objects.filter(pk__in=ids).recompute_ratings()
+        return len(ids)
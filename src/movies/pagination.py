@@ -0,0 +1,128 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder truncates datetimes to milliseconds, which would make
+    # cursors skip or repeat rows that share a millisecond.
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """Seek pagination over a unique, index-backed ordering.
+
+    Each page is fetched with ``WHERE key > last_key ORDER BY key LIMIT n``,
+    so deep pages cost the same as the first one and no COUNT is issued.
+    ``ordering`` must identify rows uniquely, e.g. ``("title",)`` or
+    ``("-created_at", "-id")``. Cursors are opaque URL-safe strings.
+    """
+
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip("-") for name in self.ordering]
+
+    @property
+    def last_cursor(self):
+        return self.encode(None, reverse=True)
+
+    def encode(self, key, reverse=False):
+        payload = json.dumps({"k": key, "r": reverse}, cls=CursorEncoder)
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode(self, cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            key, reverse = payload["k"], bool(payload["r"])
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            return None, False
+        if key is not None and (not isinstance(key, list) or len(key) != len(self.fields)):
+            return None, False
+        return key, reverse
+
+    def key_of(self, obj):
+        if isinstance(obj, dict):
+            return [obj[field] for field in self.fields]
+        return [getattr(obj, field) for field in self.fields]
+
+    def seek(self, key, reverse):
+        """Rows strictly after ``key`` in the (optionally reversed) ordering."""
+        condition = Q()
+        for i, name in enumerate(self.ordering):
+            descending = name.startswith("-") != reverse
+            lookup = f"{self.fields[i]}__{'lt' if descending else 'gt'}"
+            step = Q(**{lookup: key[i]})
+            for j in range(i):
+                step &= Q(**{self.fields[j]: key[j]})
+            condition |= step
+        return condition
+
+    def page_queryset(self, cursor=None):
+        """The unevaluated query for one page plus one look-ahead row.
+
+        Returns ``(queryset, key, reverse)``; rows of a reversed (previous)
+        page come back in reversed order.
+        """
+        key, reverse = self.decode(cursor) if cursor else (None, False)
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(
+                name[1:] if name.startswith("-") else f"-{name}" for name in ordering
+            )
+        queryset = self.queryset.order_by(*ordering)
+        if key is not None:
+            queryset = queryset.filter(self.seek(key, reverse))
+        return queryset[: self.per_page + 1], key, reverse
+
+    def get_page(self, cursor=None):
+        queryset, key, reverse = self.page_queryset(cursor)
+        return self.build_page(list(queryset), key, reverse)
+
+    async def aget_page(self, cursor=None):
+        queryset, key, reverse = self.page_queryset(cursor)
+        return self.build_page([row async for row in queryset], key, reverse)
+
+    def build_page(self, rows, key, reverse):
+        more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if reverse:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if (more and not reverse) or (reverse and key is not None):
+                next_cursor = self.encode(self.key_of(rows[-1]))
+            if (more and reverse) or (not reverse and key is not None):
+                previous_cursor = self.encode(self.key_of(rows[0]), reverse=True)
+        return KeysetPage(rows, next_cursor, previous_cursor)
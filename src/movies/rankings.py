@@ -0,0 +1,255 @@
+"""Precomputed top lists ordered by a Bayesian weighted score.
+
+    weighted_score = (v * R + m * C) / (v + m) = (rating_sum + m * C) / (rating_count + m)
+
+where v and R are a movie's number of ratings and average, C is the mean
+of all ratings and m is RANKING_MIN_VOTES: a prior worth m votes at the
+global mean, so one 5-star vote barely moves a movie while thousands of
+4.8s keep it near 4.8.
+
+MovieRanking holds the first RANKING_SIZE rated movies of every scope --
+``all``, ``genre:<GENRE>`` and ``decade:<year>`` -- so reading a top list is
+a range read of the unique (scope, position) index. Once a rating
+transaction commits, the movies it changed are rescored in one pass and
+each list they are in or score high enough to enter is recomputed; only
+the rows whose movie or score changed are rewritten, so the rating
+transaction itself never touches the lists. C is frozen in RankingPrior so
+that incrementally rescored movies stay comparable with the rest; it drifts
+slowly, and ``rebuild`` (``manage.py rebuild_rankings``, run periodically)
+recomputes it and rescores every movie.
+"""
+
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import ExpressionWrapper, F, FloatField, Q, Sum, Value
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .db import retry_on_busy
+from .models import Movie, MovieRanking, RankingPrior
+from .signals import rankings_changed, ratings_changed
+from .stats import decade_of
+
+ALL = "all"
+# Prior mean before there are any ratings: the middle of the 0-5 scale.
+DEFAULT_MEAN = 2.5
+
+# Movies whose ratings changed in this thread's current transaction.
+_pending = threading.local()
+
+
+def scopes_of(genre, year):
+    return {ALL, f"genre:{genre}", f"decade:{decade_of(year)}"}
+
+
+def _parse(scope):
+    kind, _, value = scope.partition(":")
+    if scope == ALL:
+        return ALL, None
+    if kind == "genre" and value:
+        return kind, value
+    if kind == "decade" and value.isdigit() and int(value) % 10 == 0:
+        return kind, int(value)
+    raise ValueError(f"Unknown ranking scope: {scope!r}")
+
+
+def describe(scope):
+    """A heading for a scope; raises ValueError for unknown scopes."""
+    kind, value = _parse(scope)
+    if kind == "genre":
+        genres = dict(Movie.GENRE_CHOICES)
+        if value not in genres:
+            raise ValueError(f"Unknown genre: {value!r}")
+        return f"Top {genres[value]} movies"
+    if kind == "decade":
+        return f"Top movies of the {value}s"
+    return "Top movies"
+
+
+def _scope_filter(scope):
+    kind, value = _parse(scope)
+    if kind == "genre":
+        return Q(genre=value)
+    if kind == "decade":
+        return Q(decade=value)
+    return Q()
+
+
+def score_expression(mean):
+    prior = settings.RANKING_MIN_VOTES
+    return ExpressionWrapper(
+        (F("rating_sum") + Value(prior * mean)) / (F("rating_count") + Value(float(prior))),
+        output_field=FloatField(),
+    )
+
+
+def prior_mean():
+    prior = RankingPrior.objects.first()
+    return DEFAULT_MEAN if prior is None else prior.mean
+
+
+def top(scope, count=None):
+    """The first ``count`` rankings of a scope with their movies."""
+    count = count or settings.RANKING_SIZE
+    return list(
+        MovieRanking.objects.filter(scope=scope, position__lte=count)
+        .select_related("movie")
+        .only("position", "score", "movie__title", "movie__average_rating", "movie__rating_count")
+    )
+
+
+def _ranked(scope):
+    return list(
+        Movie.objects.filter(_scope_filter(scope), rating_count__gt=0)
+        .order_by("-weighted_score", "title")
+        .values_list("pk", "weighted_score")[: settings.RANKING_SIZE]
+    )
+
+
+def _may_change(listed, scores):
+    """Whether rescored movies can alter a list without recomputing it."""
+    if len(listed) < settings.RANKING_SIZE:
+        return True
+    if {movie_id for movie_id, _ in listed} & scores.keys():
+        return True
+    lowest = listed[-1][1]
+    return any(score >= lowest for score in scores.values())
+
+
+def refresh(scopes, scores=None):
+    """Recompute the lists of ``scopes`` and rewrite the rows that changed.
+
+    With ``scores`` (movie id -> new score) scopes that those movies cannot
+    affect are skipped without running their ranking query. Returns the
+    first changed position of each changed scope.
+    """
+    listed = defaultdict(dict)
+    row_ids = {}
+    rows = MovieRanking.objects.filter(scope__in=scopes)
+    for row_id, scope, position, movie_id, score in rows.values_list(
+        "pk", "scope", "position", "movie_id", "score"
+    ):
+        listed[scope][position] = (movie_id, score)
+        row_ids[scope, position] = row_id
+
+    changes = {}
+    moved, added, removed = [], [], []
+    for scope in sorted(scopes):
+        old = listed[scope]
+        if scores is not None and not _may_change(
+            [old[position] for position in sorted(old)], scores
+        ):
+            continue
+        new = dict(enumerate(_ranked(scope), start=1))
+        # Cascaded deletes can leave gaps, so compare position by position.
+        changed = [p for p in old.keys() | new.keys() if old.get(p) != new.get(p)]
+        if not changed:
+            continue
+        for position in changed:
+            if position not in new:
+                removed.append(row_ids[scope, position])
+                continue
+            movie_id, score = new[position]
+            if position in old:
+                moved.append(
+                    MovieRanking(pk=row_ids[scope, position], movie_id=movie_id, score=score)
+                )
+            else:
+                added.append(
+                    MovieRanking(scope=scope, position=position, movie_id=movie_id, score=score)
+                )
+        changes[scope] = min(changed)
+    if removed:
+        MovieRanking.objects.filter(pk__in=removed).delete()
+    if moved:
+        MovieRanking.objects.bulk_update(moved, ["movie", "score"])
+    if added:
+        MovieRanking.objects.bulk_create(added)
+    if changes:
+        rankings_changed.send(sender=MovieRanking, changes=changes)
+    return changes
+
+
+def rebuild():
+    """Rescore every movie against the current mean and rebuild all lists."""
+    totals = Movie.objects.aggregate(
+        total=Sum("rating_sum"), count=Sum("rating_count")
+    )
+    mean = DEFAULT_MEAN
+    if totals["count"]:
+        mean = totals["total"] / totals["count"]
+    scopes = {ALL}
+    for genre, year in Movie.objects.values_list("genre", "release_year").distinct():
+        scopes |= scopes_of(genre, year)
+
+    with transaction.atomic():
+        RankingPrior.objects.update_or_create(pk=1, defaults={"mean": mean})
+        Movie.objects.update(weighted_score=score_expression(mean))
+        MovieRanking.objects.all().delete()
+        for scope in sorted(scopes):
+            MovieRanking.objects.bulk_create(
+                MovieRanking(scope=scope, position=position, movie_id=movie_id, score=score)
+                for position, (movie_id, score) in enumerate(_ranked(scope), start=1)
+            )
+    return scopes
+
+
+@retry_on_busy
+def rescore(movie_ids):
+    """Rescore movies against the frozen prior and refresh the lists they affect."""
+    with transaction.atomic():
+        movies = Movie.objects.filter(pk__in=movie_ids)
+        movies.update(weighted_score=score_expression(prior_mean()))
+        scopes, scores = set(), {}
+        for movie_id, genre, year, score in movies.values_list(
+            "pk", "genre", "release_year", "weighted_score"
+        ):
+            scopes |= scopes_of(genre, year)
+            scores[movie_id] = score
+        if scores:
+            refresh(scopes, scores)
+
+
+def _rescore_pending():
+    movie_ids, _pending.movie_ids = getattr(_pending, "movie_ids", set()), set()
+    if movie_ids:
+        rescore(movie_ids)
+
+
+@receiver(ratings_changed)
+def rescore_on_ratings_changed(sender, deltas, **kwargs):
+    # The first callback after commit rescores every movie the transaction
+    # changed; the rest find nothing left. Ids of a rolled back transaction
+    # only cost the next pass a redundant rescore. If the pass fails the
+    # ratings stand and the lists catch up on the next change or rebuild.
+    if not hasattr(_pending, "movie_ids"):
+        _pending.movie_ids = set()
+    _pending.movie_ids.update(deltas)
+    transaction.on_commit(_rescore_pending, robust=True)
+
+
+def _listed_scopes(movie_id):
+    return set(
+        MovieRanking.objects.filter(movie_id=movie_id).values_list("scope", flat=True).order_by()
+    )
+
+
+@receiver(post_save, sender=Movie)
+def refresh_on_movie_save(sender, instance, created, **kwargs):
+    # New movies have no ratings yet; edits may move a movie between scopes.
+    if not created:
+        refresh(scopes_of(instance.genre, instance.release_year) | _listed_scopes(instance.pk))
+
+
+@receiver(pre_delete, sender=Movie)
+def remember_scopes(sender, instance, **kwargs):
+    instance._ranking_scopes = _listed_scopes(instance.pk)
+
+
+@receiver(post_delete, sender=Movie)
+def refresh_on_movie_delete(sender, instance, **kwargs):
+    if getattr(instance, "_ranking_scopes", None):
+        refresh(instance._ranking_scopes)
@@ -0,0 +1,131 @@
+"""Full-text search over movie titles and directors.
+
+On SQLite the ``movies_movie_fts`` FTS5 table mirrors ``Movie.title`` and
+``Movie.director`` through triggers, so every insert, update and delete
+(including bulk upserts that bypass ``save()``) keeps it in sync. Other
+database backends fall back to ``icontains`` lookups.
+"""
+
+import re
+
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = "movies_movie_fts"
+TOKEN = re.compile(r"[^\W_]+")
+
+TRIGGERS = {
+    f"{FTS_TABLE}_ai": f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON movies_movie BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, title, director)
+            VALUES (new.id, new.title, new.director);
+        END
+    """,
+    f"{FTS_TABLE}_ad": f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON movies_movie BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, director)
+            VALUES ('delete', old.id, old.title, old.director);
+        END
+    """,
+    f"{FTS_TABLE}_au": f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+        AFTER UPDATE OF title, director ON movies_movie BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, director)
+            VALUES ('delete', old.id, old.title, old.director);
+            INSERT INTO {FTS_TABLE}(rowid, title, director)
+            VALUES (new.id, new.title, new.director);
+        END
+    """,
+}
+
+
+def is_supported(connection):
+    return connection.vendor == "sqlite"
+
+
+def install(connection):
+    """Create the FTS table and its sync triggers if they are missing.
+
+    SQLite drops triggers when a migration rebuilds ``movies_movie``, so this
+    also runs after every ``migrate`` and rebuilds the index when it had to
+    re-create any trigger.
+    """
+    if not is_supported(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'movies_movie'"
+        )
+        if cursor.fetchone() is None:
+            return
+        cursor.execute(
+            f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+                title, director,
+                content='movies_movie', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )
+            """
+        )
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'movies_movie'"
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in TRIGGERS if name not in existing]
+        for name in missing:
+            cursor.execute(TRIGGERS[name])
+        if missing:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def uninstall(connection):
+    if not is_supported(connection):
+        return
+    with connection.cursor() as cursor:
+        for name in TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def match_expression(text, column=None):
+    """Turn user input into an FTS5 query where every word is a prefix term."""
+    terms = " ".join(f'"{token}"*' for token in TOKEN.findall(text.lower()))
+    if not terms:
+        return None
+    return f"{column} : ({terms})" if column else terms
+
+
+def _match(queryset, expression):
+    return queryset.filter(
+        pk__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (expression,)
+        )
+    )
+
+
+def filter_queryset(queryset, column, text):
+    """Restrict ``queryset`` to movies whose ``column`` matches ``text``."""
+    if not is_supported(connections[queryset.db]):
+        return queryset.filter(**{f"{column}__icontains": text})
+    expression = match_expression(text, column)
+    if expression is None:
+        return queryset
+    return _match(queryset, expression)
+
+
+def ranked(queryset, text):
+    """Matches for ``text`` in either column, best BM25 score first.
+
+    Title hits weigh ten times more than director hits.
+    """
+    if not is_supported(connections[queryset.db]):
+        return queryset.filter(title__icontains=text).order_by("-average_rating")
+    expression = match_expression(text)
+    if expression is None:
+        return queryset.none()
+    rank = RawSQL(
+        f"SELECT bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} "
+        f"WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = movies_movie.id",
+        (expression,),
+    )
+    return _match(queryset, expression).annotate(search_rank=rank).order_by("search_rank")
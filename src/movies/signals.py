@@ -0,0 +1,13 @@
+from django.dispatch import Signal
+
+# Sent with ``deltas``, a dict mapping movie ids to a (rating_sum delta,
+# rating_count delta) pair, whenever the rating totals of movies change.
+ratings_changed = Signal()
+
+# Sent with ``deltas``, a dict mapping movie ids to their bookmark_count
+# delta, whenever movies gain or lose bookmarks.
+bookmarks_changed = Signal()
+
+# Sent with ``changes``, a dict mapping ranking scopes to the first position
+# whose movie or score changed, whenever precomputed top lists are rewritten.
+rankings_changed = Signal()
@@ -0,0 +1,144 @@
+"""Item-item cosine similarity over the ratings matrix.
+
+Ratings are streamed from the database in movie order, in chunks, into
+three flat NumPy arrays (movie, user, rating) preallocated from the rating
+count, 12 bytes per rating with 32-bit ids. The user and rating arrays then
+become the sparse movie x user CSR matrix as they are, with no COO copy,
+and its rows are scaled to unit length. Similarities are
+then computed for ``block_size`` movies at a time, so the dense scratch
+space is ``block_size x movies`` floats no matter how many movies there are.
+
+Needs numpy and scipy; only the build_similarity command imports this
+module, so the site itself runs without them.
+"""
+
+from itertools import islice
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Max
+from scipy import sparse
+
+from user.models import Rating
+from .models import MovieNeighbor
+
+
+def rating_matrix(chunk_size):
+    """The raw movie x user rating matrix plus the movie and user id of each row/column."""
+    totals = Rating.objects.aggregate(
+        count=Count("id"), movie=Max("movie_id"), user=Max("user_id")
+    )
+    if not totals["count"]:
+        empty = np.empty(0, dtype=np.int64)
+        return sparse.csr_matrix((0, 0), dtype=np.float32), empty, empty
+    largest = max(totals["count"], totals["movie"], totals["user"])
+    index_dtype = np.int32 if largest < 2**31 - 1 else np.int64
+
+    capacity = totals["count"]
+    movies = np.empty(capacity, dtype=index_dtype)
+    users = np.empty(capacity, dtype=index_dtype)
+    values = np.empty(capacity, dtype=np.float32)
+    rows = (
+        Rating.objects.order_by("movie_id")
+        .values_list("movie_id", "user_id", "rating")
+        .iterator(chunk_size=chunk_size)
+    )
+    filled = 0
+    while chunk := list(islice(rows, chunk_size)):
+        end = filled + len(chunk)
+        if end > capacity:
+            # Ratings added since the count.
+            capacity = max(end, capacity + capacity // 8)
+            for array in (movies, users, values):
+                array.resize(capacity, refcheck=False)
+        for column, array in enumerate((movies, users, values)):
+            array[filled:end] = np.fromiter(
+                (row[column] for row in chunk), dtype=array.dtype, count=len(chunk)
+            )
+        filled = end
+    movies, users, values = movies[:filled], users[:filled], values[:filled]
+
+    # Rows arrive grouped by movie: each new movie id starts a CSR row.
+    starts = np.flatnonzero(np.concatenate(([True], movies[1:] != movies[:-1])))
+    movie_ids = movies[starts]
+    indptr = np.append(starts, filled).astype(index_dtype)
+    del movies
+    user_ids = np.unique(users)
+    # Turn user ids into column numbers in place, a chunk at a time.
+    for start in range(0, filled, chunk_size):
+        users[start : start + chunk_size] = np.searchsorted(
+            user_ids, users[start : start + chunk_size]
+        )
+    matrix = sparse.csr_matrix(
+        (values, users, indptr), shape=(len(movie_ids), len(user_ids)), copy=False
+    )
+    matrix.sort_indices()
+    return matrix, movie_ids, user_ids
+
+
+def load_matrix(chunk_size):
+    """The normalized movie x user matrix and the movie id of each row."""
+    matrix, movie_ids, _ = rating_matrix(chunk_size)
+    if not matrix.nnz:
+        return matrix, movie_ids
+    # Every row holds at least one rating, so reduceat sees no empty rows.
+    norms = np.sqrt(np.add.reduceat(np.square(matrix.data), matrix.indptr[:-1]))
+    scale = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    matrix.data *= np.repeat(scale, np.diff(matrix.indptr))
+    return matrix, movie_ids
+
+
+def top_neighbors(matrix, rows, top_k, block_size):
+    """Yield ``(row, neighbor_rows, scores)`` for each of ``rows``, best first."""
+    transposed = matrix.T.tocsc()
+    k = min(top_k, matrix.shape[0] - 1)
+    for start in range(0, len(rows), block_size):
+        block = rows[start : start + block_size]
+        scores = (matrix[block] @ transposed).toarray()
+        scores[np.arange(len(block)), block] = 0
+        if k < 1:
+            for row in block:
+                yield row, block[:0], scores[0, :0]
+            continue
+        best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        for i, row in enumerate(block):
+            picked = scores[i, best[i]]
+            order = np.argsort(-picked, kind="stable")
+            keep = picked[order] > 0
+            yield row, best[i][order][keep], picked[order][keep]
+
+
+def build(movie_ids=None, top_k=20, chunk_size=50_000, block_size=256):
+    """Rewrite the neighbor lists of ``movie_ids`` (all rated movies if None).
+
+    Each block of movies is replaced in its own transaction, so readers see
+    either the old or the new list of a movie. Returns the number of movies
+    whose lists were rewritten.
+    """
+    matrix, ids = load_matrix(chunk_size)
+    if movie_ids is None:
+        rows = np.arange(len(ids))
+    else:
+        rows = np.flatnonzero(np.isin(ids, np.fromiter(movie_ids, dtype=np.int64)))
+
+    written = 0
+    neighbors = top_neighbors(matrix, rows, top_k, block_size)
+    while block := list(islice(neighbors, block_size)):
+        block_ids = [int(ids[row]) for row, _, _ in block]
+        with transaction.atomic():
+            MovieNeighbor.objects.filter(movie_id__in=block_ids).delete()
+            MovieNeighbor.objects.bulk_create(
+                MovieNeighbor(
+                    movie_id=movie_id,
+                    neighbor_id=int(ids[neighbor]),
+                    rank=rank,
+                    score=float(score),
+                )
+                for movie_id, (_, found, scores) in zip(block_ids, block)
+                for rank, (neighbor, score) in enumerate(zip(found, scores), start=1)
+            )
+        written += len(block_ids)
+
+    # Movies that lost all their ratings no longer have neighbors.
+    MovieNeighbor.objects.filter(movie__rating_count=0).delete()
+    return written
@@ -0,0 +1,75 @@
+// Queues bookmark and rating operations and sends them to the batch
+// endpoint in one request once clicks stop for a moment.
+const MovieBatch = (function () {
+  const DELAY = 400
+  let config = null
+  let pending = []
+  let timer = null
+
+  function take () {
+    clearTimeout(timer)
+    timer = null
+    const batch = pending
+    pending = []
+    return batch
+  }
+
+  function flush () {
+    const batch = take()
+    if (!batch.length) return
+    $.ajax({
+      url: config.url,
+      type: 'POST',
+      contentType: 'application/json',
+      headers: { 'X-CSRFToken': config.csrfToken },
+      data: JSON.stringify({ operations: batch.map(item => item.operation) }),
+      success: function (response) {
+        batch.forEach((item, i) => item.done(response.results[i]))
+      },
+      error: function (xhr, status, error) {
+        console.error('Error sending operations:', error)
+        batch.forEach(item => item.done({ status: 'error' }))
+      }
+    })
+  }
+
+  // Leaving the page must not drop queued clicks.
+  function flushOnUnload () {
+    const batch = take()
+    if (!batch.length) return
+    const data = new FormData()
+    data.append('csrfmiddlewaretoken', config.csrfToken)
+    data.append('operations', JSON.stringify(batch.map(item => item.operation)))
+    navigator.sendBeacon(config.url, data)
+  }
+
+  return {
+    init: function (options) {
+      config = options
+      window.addEventListener('pagehide', flushOnUnload)
+    },
+    queue: function (operation, done) {
+      pending.push({ operation: operation, done: done || function () {} })
+      clearTimeout(timer)
+      timer = setTimeout(flush, DELAY)
+    }
+  }
+})()
+
+// Flips a bookmark button at once and queues the matching operation;
+// the button flips back if the server rejects it.
+function toggleBookmarkButton (button, onChange) {
+  const added = !button.hasClass('bookmarked')
+  const render = function (bookmarked) {
+    button.toggleClass('bookmarked', bookmarked)
+    button.html(bookmarked ? '<i class="fas fa-bookmark"></i>' : '<i class="far fa-bookmark"></i>')
+    if (onChange) onChange(bookmarked)
+  }
+  render(added)
+  MovieBatch.queue(
+    { type: 'bookmark', movie_id: button.data('movie-id'), action: added ? 'add' : 'remove' },
+    function (result) {
+      if (!['added', 'exists', 'removed'].includes(result.status)) render(!added)
+    }
+  )
+}
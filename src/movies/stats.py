@@ -0,0 +1,216 @@
+"""Upkeep of the GenreDecadeStats table.
+
+Movie saves and deletes, ratings_changed and bookmarks_changed shift the
+totals of the affected (genre, decade) buckets with F() updates, so the
+stats move in the same transaction as the data they summarize. ``rebuild``
+and ``drift`` recompute everything from Movie, Rating and Bookmark with
+one grouped query per table.
+"""
+
+import math
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, ExpressionWrapper, F, IntegerField, Sum
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import GenreDecadeStats, Movie
+from .signals import bookmarks_changed, ratings_changed
+
+TOTALS = ("movie_count", "rating_count", "rating_sum", "bookmark_count")
+
+
+def decade_of(year):
+    return year // 10 * 10
+
+
+def _decade(prefix=""):
+    return ExpressionWrapper(F(f"{prefix}release_year") / 10 * 10, output_field=IntegerField())
+
+
+def compute():
+    """Totals per (genre, decade) bucket computed from the source tables."""
+    from user.models import Bookmark, Rating
+
+    totals = defaultdict(lambda: dict.fromkeys(TOTALS, 0))
+    movies = Movie.objects.values("genre", bucket_decade=_decade())
+    for row in movies.annotate(count=Count("id")).order_by():
+        totals[row["genre"], row["bucket_decade"]]["movie_count"] = row["count"]
+    ratings = Rating.objects.values(
+        bucket_genre=F("movie__genre"), bucket_decade=_decade("movie__")
+    )
+    for row in ratings.annotate(count=Count("id"), total=Sum("rating")).order_by():
+        bucket = totals[row["bucket_genre"], row["bucket_decade"]]
+        bucket["rating_count"] = row["count"]
+        bucket["rating_sum"] = row["total"]
+    bookmarks = Bookmark.objects.values(
+        bucket_genre=F("movie__genre"), bucket_decade=_decade("movie__")
+    )
+    for row in bookmarks.annotate(count=Count("id")).order_by():
+        totals[row["bucket_genre"], row["bucket_decade"]]["bookmark_count"] = row["count"]
+    return dict(totals)
+
+
+def rebuild():
+    """Replace the table with totals recomputed from scratch."""
+    with transaction.atomic():
+        GenreDecadeStats.objects.all().delete()
+        GenreDecadeStats.objects.bulk_create(
+            GenreDecadeStats(genre=genre, decade=decade, **totals)
+            for (genre, decade), totals in compute().items()
+        )
+
+
+def drift():
+    """Buckets whose stored totals differ from a fresh computation.
+
+    Returns ``{(genre, decade): (stored, expected)}``; buckets missing on
+    one side compare as all zeros.
+    """
+    expected = compute()
+    stored = {
+        (row.pop("genre"), row.pop("decade")): row
+        for row in GenreDecadeStats.objects.values("genre", "decade", *TOTALS)
+    }
+    zeros = dict.fromkeys(TOTALS, 0)
+    result = {}
+    for bucket in expected.keys() | stored.keys():
+        have, want = stored.get(bucket, zeros), expected.get(bucket, zeros)
+        if any(not math.isclose(have[name], want[name], abs_tol=1e-6) for name in TOTALS):
+            result[bucket] = (have, want)
+    return result
+
+
+def genre_totals():
+    """Totals per genre over all decades, for the movie list sidebar."""
+    labels = dict(Movie.GENRE_CHOICES)
+    rows = (
+        GenreDecadeStats.objects.values("genre")
+        .annotate(
+            movies=Sum("movie_count"),
+            ratings=Sum("rating_count"),
+            total=Sum("rating_sum"),
+        )
+        .filter(movies__gt=0)
+        .order_by("genre")
+    )
+    return [
+        {
+            "genre": row["genre"],
+            "label": labels.get(row["genre"], row["genre"]),
+            "movie_count": row["movies"],
+            "average_rating": Movie.compute_average(row["total"], row["ratings"]),
+        }
+        for row in rows
+    ]
+
+
+def shift(changes):
+    """Add ``{(genre, decade): {field: delta}}`` to the stored buckets."""
+    changes = {
+        bucket: {name: delta for name, delta in fields.items() if delta}
+        for bucket, fields in changes.items()
+    }
+    changes = {bucket: fields for bucket, fields in changes.items() if fields}
+    if not changes:
+        return
+    GenreDecadeStats.objects.bulk_create(
+        [GenreDecadeStats(genre=genre, decade=decade) for genre, decade in changes],
+        ignore_conflicts=True,
+    )
+    for (genre, decade), fields in changes.items():
+        GenreDecadeStats.objects.filter(genre=genre, decade=decade).update(
+            **{name: F(name) + delta for name, delta in fields.items()}
+        )
+
+
+def _movie_totals(sign, rating_sum, rating_count, bookmark_count):
+    return {
+        "movie_count": sign,
+        "rating_sum": sign * rating_sum,
+        "rating_count": sign * rating_count,
+        "bookmark_count": sign * bookmark_count,
+    }
+
+
+def _buckets_of(movie_ids):
+    rows = Movie.objects.filter(pk__in=movie_ids).values_list("pk", "genre", "release_year")
+    return {pk: (genre, decade_of(year)) for pk, genre, year in rows}
+
+
+def _stored(movie_id):
+    """The stored bucket fields and totals of a movie, fresher than any instance."""
+    return (
+        Movie.objects.filter(pk=movie_id)
+        .values_list("genre", "release_year", "rating_sum", "rating_count", "bookmark_count")
+        .first()
+    )
+
+
+@receiver(pre_save, sender=Movie)
+def remember_bucket(sender, instance, update_fields=None, **kwargs):
+    # The stored genre and year, needed to move the movie between buckets.
+    instance._stats_previous = None
+    if instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not {"genre", "release_year"} & set(update_fields):
+        return
+    instance._stats_previous = _stored(instance.pk)
+
+
+@receiver(pre_delete, sender=Movie)
+def remember_totals(sender, instance, **kwargs):
+    instance._stats_previous = _stored(instance.pk)
+
+
+@receiver(post_save, sender=Movie)
+def update_on_movie_save(sender, instance, created, **kwargs):
+    bucket = (instance.genre, decade_of(instance.release_year))
+    if created:
+        shift(
+            {
+                bucket: _movie_totals(
+                    1, instance.rating_sum, instance.rating_count, instance.bookmark_count
+                )
+            }
+        )
+        return
+    previous = getattr(instance, "_stats_previous", None)
+    if previous is None:
+        return
+    genre, year, *totals = previous
+    if (genre, decade_of(year)) != bucket:
+        shift(
+            {
+                (genre, decade_of(year)): _movie_totals(-1, *totals),
+                bucket: _movie_totals(1, *totals),
+            }
+        )
+
+
+@receiver(post_delete, sender=Movie)
+def update_on_movie_delete(sender, instance, **kwargs):
+    previous = getattr(instance, "_stats_previous", None)
+    if previous is None:
+        return
+    genre, year, *totals = previous
+    shift({(genre, decade_of(year)): _movie_totals(-1, *totals)})
+
+
+@receiver(ratings_changed)
+def update_on_ratings_changed(sender, deltas, **kwargs):
+    changes = defaultdict(lambda: {"rating_sum": 0, "rating_count": 0})
+    for movie_id, bucket in _buckets_of(deltas).items():
+        sum_delta, count_delta = deltas[movie_id]
+        changes[bucket]["rating_sum"] += sum_delta
+        changes[bucket]["rating_count"] += count_delta
+    shift(changes)
+
+
+@receiver(bookmarks_changed)
+def update_on_bookmarks_changed(sender, deltas, **kwargs):
+    changes = defaultdict(lambda: {"bookmark_count": 0})
+    for movie_id, bucket in _buckets_of(deltas).items():
+        changes[bucket]["bookmark_count"] += deltas[movie_id]
+    shift(changes)
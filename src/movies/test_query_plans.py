@@ -0,0 +1,110 @@
+"""EXPLAIN QUERY PLAN checks for the movie list, home page and ranking queries.
+
+Every combination of MovieFilter parameters is planned for the first page
+and for a cursor page of the movie list. A filtered query must SEARCH an
+index; a SCAN of movies_movie (a table scan, or a walk over a whole index)
+fails the test, so dropping or altering an index in a migration cannot
+silently turn a filter into a full scan. Only unfiltered queries may walk
+an index in sort order, because their LIMIT stops the walk early.
+"""
+
+import re
+from itertools import combinations
+
+from django.db import connection
+from django.test import TestCase
+
+from . import rankings
+from .filters import MovieFilter
+from .models import Movie, MovieRanking
+from .pagination import KeysetPaginator
+
+FILTER_VALUES = {
+    "title": "incep",
+    "genre": "SCI_FI",
+    "director": "nolan",
+    "year": 2010,
+    "rating": 4,
+}
+TABLE_SCAN = re.compile(r"^SCAN movies_movie$")
+INDEX_WALK = re.compile(r"^SCAN movies_movie USING (COVERING )?INDEX")
+# Sorting every row; sorting ties on the last ORDER BY columns is fine.
+FULL_SORT = "USE TEMP B-TREE FOR ORDER BY"
+
+
+def query_plan(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+class MovieFilterQueryPlanTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Movie.objects.create(
+            title="Inception",
+            genre="SCI_FI",
+            duration=148,
+            director="Christopher Nolan",
+            release_year=2010,
+            average_rating=4.8,
+        )
+
+    def assertIndexed(self, queryset, label, ordered_walk=False):
+        plan = query_plan(queryset)
+        scans = [
+            line
+            for line in plan
+            if TABLE_SCAN.match(line) or (INDEX_WALK.match(line) and not ordered_walk)
+        ]
+        self.assertFalse(scans, f"{label} falls back to a full scan:\n" + "\n".join(plan))
+
+    def test_movie_list_filters_use_indexes(self):
+        """Test that no MovieFilter combination scans the whole movie table."""
+        if connection.vendor != "sqlite":
+            self.skipTest("Query plans are checked on SQLite only.")
+        for size in range(len(FILTER_VALUES) + 1):
+            for names in combinations(FILTER_VALUES, size):
+                data = {name: FILTER_VALUES[name] for name in names}
+                queryset = MovieFilter(data, queryset=Movie.objects.all()).qs
+                paginator = KeysetPaginator(queryset, 10, ordering=("title",))
+                with self.subTest(filters=names):
+                    self.assertIndexed(
+                        queryset.order_by("title")[:11],
+                        f"first page of {names}",
+                        ordered_walk=not names,
+                    )
+                    self.assertIndexed(
+                        queryset.order_by("title").filter(paginator.seek(["M"], False))[:11],
+                        f"cursor page of {names}",
+                    )
+
+    def test_home_ranking_uses_index(self):
+        """Test that the top-rated ordering walks the rating index."""
+        if connection.vendor != "sqlite":
+            self.skipTest("Query plans are checked on SQLite only.")
+        self.assertIndexed(
+            Movie.objects.order_by("-average_rating")[:5], "home ranking", ordered_walk=True
+        )
+
+    def test_ranking_queries_use_indexes(self):
+        """Test that every top list reads its scope in score order from an index."""
+        if connection.vendor != "sqlite":
+            self.skipTest("Query plans are checked on SQLite only.")
+        for scope in (rankings.ALL, "genre:SCI_FI", "decade:2010"):
+            with self.subTest(scope=scope):
+                queryset = (
+                    Movie.objects.filter(rankings._scope_filter(scope), rating_count__gt=0)
+                    .order_by("-weighted_score", "title")
+                    .values_list("pk", "weighted_score")[:100]
+                )
+                self.assertIndexed(queryset, f"{scope} ranking", ordered_walk=scope == rankings.ALL)
+                self.assertNotIn(FULL_SORT, query_plan(queryset))
+        for queryset in (
+            MovieRanking.objects.filter(scope__in=[rankings.ALL, "decade:2010"]),
+            MovieRanking.objects.filter(movie_id=1).values_list("scope").order_by(),
+        ):
+            plan = query_plan(queryset)
+            self.assertTrue(all(line.startswith("SEARCH") for line in plan), "\n".join(plan))
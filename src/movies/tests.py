@@ -1,5 +1,28 @@
-from django.test import TestCase
-from .models import Movie
+import asyncio
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from importlib.util import find_spec
+from unittest import mock, skipUnless
+from io import StringIO
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from .models import (
+    GenreDecadeStats,
+    Movie,
+    MovieNeighbor,
+    MovieQuerySet,
+    MovieRanking,
+    PendingRatingRecompute,
+)
 from django.core.exceptions import ValidationError
 from datetime import datetime as dt
 from django.contrib.auth import get_user_model
@@ -8,6 +31,8 @@ from django.urls import reverse
 from django.contrib.auth.models import Group
 from .forms import MovieForm
 from .filters import MovieFilter
+from . import api, autocomplete, rankings, search, stats
+from .db import is_busy, retry_on_busy
 
 
 
@@ -71,6 +96,119 @@ class MovieModelTest(TestCase):
         )
         self.assertEqual(new_movie.average_rating, 0)
 
+    def test_rating_totals_follow_rating_changes(self):
+        """Test that rating inserts, updates and deletes keep the running totals correct"""
+        user1 = User.objects.create_user(username="user1", password="test123")
+        user2 = User.objects.create_user(username="user2", password="test123")
+        rating1 = Rating.objects.create(movie=self.movie, user=user1, rating=4)
+        Rating.objects.create(movie=self.movie, user=user2, rating=3)
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.rating_sum, self.movie.rating_count), (7, 2))
+        self.assertEqual(self.movie.average_rating, 3.5)
+
+        rating1.rating = 5
+        rating1.save()
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.rating_sum, self.movie.rating_count), (8, 2))
+        self.assertEqual(self.movie.average_rating, 4)
+
+        rating1.delete()
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.rating_sum, self.movie.rating_count), (3, 1))
+        self.assertEqual(self.movie.average_rating, 3)
+
+        Rating.objects.filter(movie=self.movie).delete()
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.rating_sum, self.movie.rating_count), (0, 0))
+        self.assertEqual(self.movie.average_rating, 0)
+
+    def test_recompute_ratings(self):
+        """Test that recompute_ratings rebuilds drifted totals from the ratings table"""
+        user1 = User.objects.create_user(username="user1", password="test123")
+        Rating.objects.create(movie=self.movie, user=user1, rating=2.5)
+        Movie.objects.filter(pk=self.movie.pk).update(
+            rating_sum=100, rating_count=7, average_rating=1
+        )
+
+        Movie.objects.filter(pk=self.movie.pk).recompute_ratings()
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.rating_sum, self.movie.rating_count), (2.5, 1))
+        self.assertEqual(self.movie.average_rating, 2.5)
+
+    def test_stale_instance_save_keeps_totals(self):
+        """Test that saving an instance loaded before a rating leaves the totals alone"""
+        stale = Movie.objects.get(pk=self.movie.pk)
+        user1 = User.objects.create_user(username="user1", password="test123")
+        Rating.objects.create(movie=self.movie, user=user1, rating=4)
+
+        stale.duration = 150
+        stale.save()
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.duration, 150)
+        self.assertEqual((self.movie.rating_sum, self.movie.rating_count), (4, 1))
+        self.assertEqual(self.movie.average_rating, 4)
+
+
+@override_settings(RATING_WRITE_BEHIND=True)
+class WriteBehindRatingTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(username=f"user{i}") for i in range(3)]
+        cls.movie = Movie.objects.create(title="Premiere", genre="DRAMA", release_year=2024)
+
+    def drain(self):
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("drain_rating_queue", "--once", stdout=out)
+        return out.getvalue()
+
+    def test_ratings_queue_one_recompute(self):
+        """Test that a burst of ratings queues the movie once and the worker applies it."""
+        for user, value in zip(self.users, (5, 4, 3)):
+            Rating.objects.create(user=user, movie=self.movie, rating=value)
+        Rating.objects.filter(user=self.users[0]).get().delete()
+
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.rating_count, self.movie.average_rating), (0, 0))
+        self.assertEqual(PendingRatingRecompute.objects.count(), 1)
+
+        self.assertIn("Recomputed ratings of 1 movies.", self.drain())
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.rating_count, self.movie.average_rating), (2, 3.5))
+        self.assertFalse(PendingRatingRecompute.objects.exists())
+        self.assertIn("Recomputed ratings of 0 movies.", self.drain())
+
+    def test_busy_pass_is_logged_and_retried(self):
+        """Test that the worker survives a locked database and drains on the next pass."""
+        drain = mock.patch.object(
+            PendingRatingRecompute, "drain",
+            side_effect=[OperationalError("database is locked"), 1, 0],
+        )
+        # The second sleep stops the loop the way Ctrl-C does.
+        sleep = mock.patch("time.sleep", side_effect=[None, KeyboardInterrupt])
+        out, err = StringIO(), StringIO()
+        with drain, sleep:
+            call_command("drain_rating_queue", interval=0, stdout=out, stderr=err)
+        self.assertIn("Database busy", err.getvalue())
+        self.assertEqual(out.getvalue().strip(), "Recomputed ratings of 1 movies.")
+
+        with mock.patch.object(
+            PendingRatingRecompute, "drain", side_effect=OperationalError("database is locked")
+        ), self.assertRaisesMessage(CommandError, "queue not drained"):
+            call_command("drain_rating_queue", "--once", stdout=out, stderr=err)
+
+    def test_deleted_movie_leaves_queue(self):
+        """Test that deleting a queued movie removes its queue entry."""
+        Rating.objects.create(user=self.users[0], movie=self.movie, rating=4)
+        self.movie.delete()
+        self.assertFalse(PendingRatingRecompute.objects.exists())
+
+        other = Movie.objects.create(title="Sequel", genre="DRAMA", release_year=2025)
+        Rating.objects.create(user=self.users[0], movie=other, rating=4)
+        Movie.objects.filter(pk=other.pk).delete()
+        self.assertFalse(PendingRatingRecompute.objects.exists())
+
 
 class MovieViewsTest(TestCase):
 
@@ -185,6 +323,226 @@ class MovieViewsTest(TestCase):
             Rating.objects.filter(user=self.user, movie=self.movie, rating=5).exists()
         )
 
+class AsyncViewsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="testpass")
+        cls.movie = Movie.objects.create(title="Inception", genre="SCI_FI", release_year=2010)
+
+    def setUp(self):
+        self.async_client.force_login(self.user)
+
+    async def test_movie_info(self):
+        """Test that movie_info renders under the async client."""
+        await Rating.objects.acreate(user=self.user, movie=self.movie, rating=4)
+        response = await self.async_client.get(reverse("movie_info", args=[self.movie.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["user_rating"].rating, 4)
+        self.assertContains(response, "Logout")
+        response = await self.async_client.get(reverse("movie_info", args=[999999]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_write_paths(self):
+        """Test that the bookmark and rating views write through the async ORM."""
+        with self.captureOnCommitCallbacks(execute=True):
+            response = await self.async_client.post(
+                reverse("toggle_bookmark"), {"movie_id": self.movie.pk, "action": "add"}
+            )
+            self.assertEqual(response.json()["status"], "added")
+            response = await self.async_client.post(
+                reverse("submit_movie_rating"), {"movie_id": self.movie.pk, "rating": 5}
+            )
+            self.assertTrue(response.json()["success"])
+        movie = await Movie.objects.aget(pk=self.movie.pk)
+        self.assertEqual((movie.bookmark_count, movie.average_rating), (1, 5.0))
+        self.assertEqual(await Rating.objects.filter(user=self.user).acount(), 1)
+
+
+class MovieInfoQueryBudgetTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="viewer", password="testpass")
+        cls.movie = Movie.objects.create(
+            title="Inception", release_year=2010, genre="SCI_FI", director="Christopher Nolan"
+        )
+
+    def setUp(self):
+        self.client.login(username="viewer", password="testpass")
+
+    def add_audience(self, size, offset):
+        for i in range(offset, offset + size):
+            user = User.objects.create_user(username=f"user{i}", password="testpass")
+            Rating.objects.create(user=user, movie=self.movie, rating=i % 6)
+            Bookmark.objects.create(user=user, movie=self.movie)
+
+    def test_movie_info_query_count_is_constant(self):
+        """Test that the detail page query count does not grow with ratings or bookmarks."""
+        url = reverse("movie_info", args=[self.movie.pk])
+        # Session, user, movie, ratings, neighbors, viewer rating, viewer bookmark.
+        for size, offset in ((1, 0), (20, 1)):
+            self.add_audience(size, offset)
+            with self.assertNumQueries(7):
+                response = self.client.get(url)
+        self.assertContains(response, "user20")
+        self.assertNotContains(response, "user0<")
+        self.assertEqual(response.context["movie"].bookmark_count, 21)
+        self.assertFalse(response.context["is_bookmarked"])
+
+    def test_movie_ratings_endpoint_pages_with_cursor(self):
+        """Test that the ratings endpoint returns newest-first chunks until exhausted."""
+        self.add_audience(25, 0)
+        response = self.client.get(reverse("movie_info", args=[self.movie.pk]))
+        self.assertEqual(len(response.context["ratings"]), 20)
+
+        url = reverse("movie_ratings", args=[self.movie.pk])
+        with self.assertNumQueries(1):
+            data = self.client.get(url, {"cursor": response.context["ratings_cursor"]}).json()
+        self.assertEqual(
+            [rating["user"] for rating in data["ratings"]], [f"user{i}" for i in range(4, -1, -1)]
+        )
+        self.assertEqual(data["ratings"][-1]["rating"], 0)
+        self.assertIsNone(data["next"])
+
+    def test_bookmark_count_follows_bookmarks(self):
+        """Test that the denormalized bookmark count is kept in sync."""
+        bookmark = Bookmark.objects.create(user=self.user, movie=self.movie)
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.bookmark_count, 1)
+        response = self.client.get(reverse("movie_info", args=[self.movie.pk]))
+        self.assertTrue(response.context["is_bookmarked"])
+        bookmark.delete()
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.bookmark_count, 0)
+
+
+class MovieListPaginationTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="testpass")
+        Movie.objects.bulk_create(
+            Movie(title=f"Movie {i:02d}", genre="DRAMA", release_year=2000 + i % 5)
+            for i in range(25)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username="testuser", password="testpass")
+
+    def titles(self, response):
+        return [movie.title for movie in response.context["page_obj"]]
+
+    def test_cursor_pagination_walks_forward_and_back(self):
+        """Test that next and previous cursors return stable, title-ordered pages."""
+        first = self.client.get(reverse("movies"))
+        self.assertEqual(self.titles(first), [f"Movie {i:02d}" for i in range(10)])
+        self.assertFalse(first.context["page_obj"].has_previous)
+        self.assertEqual(first.context["total"], 25)
+
+        second = self.client.get(
+            reverse("movies"), {"cursor": first.context["page_obj"].next_cursor}
+        )
+        self.assertEqual(self.titles(second), [f"Movie {i:02d}" for i in range(10, 20)])
+
+        back = self.client.get(
+            reverse("movies"), {"cursor": second.context["page_obj"].previous_cursor}
+        )
+        self.assertEqual(self.titles(back), self.titles(first))
+        self.assertFalse(back.context["page_obj"].has_previous)
+
+        last = self.client.get(reverse("movies"), {"cursor": first.context["last_cursor"]})
+        self.assertEqual(self.titles(last), [f"Movie {i:02d}" for i in range(15, 25)])
+        self.assertFalse(last.context["page_obj"].has_next)
+
+    def test_cursor_keeps_filters(self):
+        """Test that cursor links keep the filter parameters."""
+        response = self.client.get(reverse("movies"), {"year": 2001})
+        self.assertEqual(response.context["total"], 5)
+        self.assertEqual(len(response.context["page_obj"]), 5)
+        self.assertNotContains(response, "next</a>")
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        """Test that a malformed cursor shows the first page."""
+        response = self.client.get(reverse("movies"), {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.titles(response)[0], "Movie 00")
+
+    def test_pages_cached_per_normalized_filter(self):
+        """Test that equivalent querystrings share one cached page until a movie changes."""
+        first = self.client.get(reverse("movies"), {"title": "movie", "year": 2001})
+        self.assertEqual(first["X-Cache"], "MISS")
+        with self.assertNumQueries(2):  # session and user
+            again = self.client.get(
+                reverse("movies"), {"year": "2001.0", "title": "  MOVIE ", "utm": "x"}
+            )
+        self.assertEqual(again["X-Cache"], "HIT")
+        self.assertEqual(self.titles(again), self.titles(first))
+        self.assertEqual(
+            self.client.get(reverse("movies"), {"year": 2002})["X-Cache"], "MISS"
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Movie.objects.create(title="Movie 99", genre="DRAMA", release_year=2001)
+        response = self.client.get(reverse("movies"), {"title": "movie", "year": 2001})
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertIn("Movie 99", self.titles(response))
+        # The total and the sidebar are retired with the pages.
+        self.assertEqual(response.context["total"], first.context["total"] + 1)
+        self.assertEqual(
+            sum(row["movie_count"] for row in response.context["genre_stats"]),
+            sum(row["movie_count"] for row in first.context["genre_stats"]) + 1,
+        )
+
+        out = StringIO()
+        call_command("cache_stats", "--reset", stdout=out)
+        self.assertIn("1 hits, 3 misses, hit ratio 25.0%", out.getvalue())
+        call_command("cache_stats", stdout=out)
+        self.assertIn("0 hits, 0 misses, hit ratio n/a", out.getvalue())
+
+    def test_cache_is_shared_with_other_processes(self):
+        """Test that a version bump and a lookup count from another process reach this one."""
+        self.client.get(reverse("movies"))
+        self.assertEqual(self.client.get(reverse("movies"))["X-Cache"], "HIT")
+
+        # What import_movies run next to the server does after its upserts.
+        subprocess.run(
+            [
+                sys.executable, "manage.py", "shell", "-c",
+                "from movies import cache; cache._bump(); cache.count_list_lookup(hit=True)",
+            ],
+            cwd=settings.BASE_DIR,
+            check=True,
+            capture_output=True,
+            timeout=60,
+        )
+        self.assertEqual(self.client.get(reverse("movies"))["X-Cache"], "MISS")
+        out = StringIO()
+        call_command("cache_stats", stdout=out)
+        self.assertIn("2 hits, 2 misses", out.getvalue())
+
+    def test_bookmarks_are_not_cached_with_the_page(self):
+        """Test that a cached page still shows each user's own bookmarks."""
+        self.client.get(reverse("movies"))
+        with self.captureOnCommitCallbacks(execute=True):
+            Bookmark.objects.create(user=self.user, movie=Movie.objects.get(title="Movie 00"))
+        response = self.client.get(reverse("movies"))
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertContains(response, "bookmark-btn bookmarked", count=1)
+        self.client.logout()
+        self.assertNotContains(self.client.get(reverse("movies")), "bookmark-btn bookmarked")
+
+    def test_deep_page_issues_no_offset_or_count(self):
+        """Test that a cursor page seeks on the title instead of using OFFSET."""
+        first = self.client.get(reverse("movies"))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("movies"), {"cursor": first.context["page_obj"].next_cursor})
+        sql = " ".join(query["sql"] for query in queries)
+        self.assertNotIn("OFFSET", sql)
+        self.assertNotIn("COUNT(", sql)
+
+
 class MovieFormTest(TestCase):
 
     def test_valid_form(self):
@@ -309,4 +667,883 @@ class MovieFilterTest(TestCase):
     def test_filter_by_average_rating(self):
         """Test filtering by average rating."""
         filterset = MovieFilter({"rating": 4.7}, queryset=Movie.objects.all())
-        self.assertEqual(len(filterset.qs), 2)
\ No newline at end of file
+        self.assertEqual(len(filterset.qs), 2)
+
+    def test_filter_by_title_prefix(self):
+        """Test that text filters match word prefixes in any order."""
+        filterset = MovieFilter({"title": "dark kni"}, queryset=Movie.objects.all())
+        self.assertEqual(list(filterset.qs), [self.movie2])
+        filterset = MovieFilter({"director": "nolan"}, queryset=Movie.objects.all())
+        self.assertEqual(len(filterset.qs), 3)
+        filterset = MovieFilter({"title": "nolan"}, queryset=Movie.objects.all())
+        self.assertEqual(len(filterset.qs), 0)
+
+
+class MovieSearchTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alien = Movie.objects.create(
+            title="Alien", genre="HORROR", release_year=1979, director="Ridley Scott"
+        )
+        cls.aliens = Movie.objects.create(
+            title="Aliens", genre="ACTION", release_year=1986, director="James Cameron"
+        )
+        cls.paul = Movie.objects.create(
+            title="Paul", genre="COMEDY", release_year=2011, director="Greg Mottola"
+        )
+
+    def test_match_expression(self):
+        """Test that user input becomes quoted prefix terms."""
+        self.assertEqual(search.match_expression('Star "Wars"'), '"star"* "wars"*')
+        self.assertEqual(search.match_expression("Nolan", "director"), 'director : ("nolan"*)')
+        self.assertIsNone(search.match_expression("  - "))
+
+    def test_index_follows_updates_and_deletes(self):
+        """Test that the search index stays in sync with the movie table."""
+        queryset = Movie.objects.all()
+        self.paul.title = "Paul Blart"
+        self.paul.save()
+        self.assertEqual(list(search.filter_queryset(queryset, "title", "blart")), [self.paul])
+        self.aliens.delete()
+        self.assertEqual(list(search.filter_queryset(queryset, "title", "alien")), [self.alien])
+        Movie.objects.bulk_create(
+            [Movie(title="Alien: Covenant", genre="HORROR", release_year=2017, director="Ridley Scott")]
+        )
+        self.assertEqual(search.filter_queryset(queryset, "director", "ridley").count(), 2)
+
+    def test_ranked_prefers_title_matches(self):
+        """Test that BM25 ranking puts title hits before director hits."""
+        Movie.objects.create(
+            title="Cameron's Story", genre="DOCUMENTARY", release_year=2000, director="Someone"
+        )
+        ranked = list(search.ranked(Movie.objects.all(), "cameron"))
+        self.assertEqual(ranked[0].title, "Cameron's Story")
+        self.assertEqual(ranked[1], self.aliens)
+
+
+class ImportMoviesCommandTest(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w") as handle:
+            handle.write(content)
+        return path
+
+    def test_import_csv_upserts_on_title(self):
+        """Test that existing titles are updated and invalid rows are rejected"""
+        Movie.objects.create(title="Inception", release_year=2009, genre="DRAMA")
+        path = self.write(
+            "movies.csv",
+            "title,genre,duration,director,release_year\n"
+            "Inception,SCI_FI,148,Christopher Nolan,2010\n"
+            "Interstellar,SCI_FI,169,Christopher Nolan,2014\n"
+            "Future Movie,SCI_FI,100,Nobody,3000\n"
+            "Bad Genre,UNKNOWN,100,Nobody,2000\n",
+        )
+        out = StringIO()
+        call_command("import_movies", path, batch_size=2, stdout=out)
+
+        self.assertIn("Inserted 1, updated 1, rejected 2 movies.", out.getvalue())
+        inception = Movie.objects.get(title="Inception")
+        self.assertEqual((inception.genre, inception.release_year), ("SCI_FI", 2010))
+        self.assertTrue(Movie.objects.filter(title="Interstellar", duration=169).exists())
+        self.assertEqual(Movie.objects.count(), 2)
+
+    def test_import_movielens(self):
+        """Test that MovieLens titles and genres are mapped onto Movie fields"""
+        path = self.write(
+            "movies.csv",
+            "movieId,title,genres\n"
+            "1,Toy Story (1995),Adventure|Animation|Children|Comedy|Fantasy\n"
+            "2,\"City of Lost Children, The (1995)\",Adventure|Drama|Fantasy|Mystery|Sci-Fi\n"
+            "3,Untitled,(no genres listed)\n",
+        )
+        call_command("import_movies", path, stdout=StringIO())
+
+        toy_story = Movie.objects.get(title="Toy Story")
+        self.assertEqual((toy_story.genre, toy_story.release_year), ("ANIMATION", 1995))
+        self.assertEqual(Movie.objects.get(title="City of Lost Children, The").genre, "DRAMA")
+        self.assertFalse(Movie.objects.filter(title="Untitled").exists())
+
+    def test_import_movielens_keeps_remakes_apart(self):
+        """Test that same-titled MovieLens films from different years are not merged"""
+        Movie.objects.create(title="Solaris", release_year=1972, genre="SCI_FI")
+        path = self.write(
+            "movies.csv",
+            "movieId,title,genres\n"
+            "1,Hamlet (1990),Drama\n"
+            "2,Hamlet (1996),Crime|Drama|Romance\n"
+            "3,Solaris (2002),Drama|Romance|Sci-Fi\n"
+            "4,Solaris (1972),Drama|Mystery|Sci-Fi\n",
+        )
+        for batch_size in (1000, 1):
+            call_command("import_movies", path, batch_size=batch_size, stdout=StringIO())
+
+            self.assertEqual(
+                sorted(Movie.objects.values_list("title", "release_year")),
+                [("Hamlet", 1990), ("Hamlet (1996)", 1996), ("Solaris", 1972),
+                 ("Solaris (2002)", 2002)],
+            )
+
+    def test_malformed_jsonl_lines_are_rejected(self):
+        """Test that an unparseable line is rejected without losing the rest of its batch"""
+        path = self.write(
+            "movies.jsonl",
+            json.dumps(
+                {"title": "Alien", "genre": "HORROR", "duration": 117, "director": "Ridley Scott",
+                 "release_year": 1979}
+            ) + "\n"
+            + "{not json\n"
+            + "[1, 2]\n"
+            + json.dumps(
+                {"title": "Heat", "genre": "THRILLER", "duration": 170, "director": "Michael Mann",
+                 "release_year": 1995}
+            ) + "\n",
+        )
+        out = StringIO()
+        call_command("import_movies", path, stdout=out)
+
+        self.assertIn("Inserted 2, updated 0, rejected 2 movies.", out.getvalue())
+        self.assertEqual(set(Movie.objects.values_list("title", flat=True)), {"Alien", "Heat"})
+
+
+class SeedSyntheticCommandTest(TestCase):
+
+    def seed(self, **options):
+        call_command(
+            "seed_synthetic", movies=60, users=12, ratings=300, bookmarks=50, seed=7,
+            stdout=StringIO(), **options,
+        )
+        return sorted(Rating.objects.values_list("movie__title", "rating"))
+
+    def test_seeds_consistent_skewed_data(self):
+        """Test that the seeded totals, stats and rankings match the inserted rows."""
+        self.seed()
+        self.assertEqual(Movie.objects.count(), 60)
+        self.assertEqual(User.objects.filter(username__startswith="synthetic").count(), 12)
+        self.assertTrue(
+            set(Movie.objects.values_list("genre", flat=True))
+            <= {value for value, _ in Movie.GENRE_CHOICES}
+        )
+
+        stored = list(
+            Movie.objects.order_by("pk").values_list("rating_sum", "rating_count", "average_rating")
+        )
+        recomputed = [
+            (movie.rating_sum, movie.rating_count, movie.average_rating)
+            for movie in Movie.objects.order_by("pk").recompute_ratings()
+        ]
+        self.assertEqual(stored, recomputed)
+        bookmarked = dict(
+            Bookmark.objects.values("movie").annotate(n=Count("id")).values_list("movie", "n")
+        )
+        for movie in Movie.objects.all():
+            self.assertEqual(movie.bookmark_count, bookmarked.get(movie.pk, 0))
+        self.assertEqual(stats.drift(), {})
+        self.assertTrue(MovieRanking.objects.exists())
+
+        # Popularity is skewed: the busiest movie gets far more than the average.
+        counts = sorted(Movie.objects.values_list("rating_count", flat=True), reverse=True)
+        self.assertGreater(counts[0], 3 * sum(counts) / len(counts))
+
+    def test_reproducible_and_refuses_existing_catalog(self):
+        first = self.seed()
+        with self.assertRaisesMessage(CommandError, "The catalog is not empty"):
+            self.seed()
+        Movie.objects.all().delete()
+        self.assertEqual(self.seed(), first)
+
+
+class CatalogApiTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.movies = Movie.objects.bulk_create(
+            Movie(
+                title=f"Movie {i:02d}",
+                genre="SCI_FI" if i % 2 else "DRAMA",
+                release_year=2000 + i,
+                director="Christopher Nolan",
+            )
+            for i in range(5)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_json(self, response):
+        return json.loads(b"".join(response.streaming_content))
+
+    def test_list_filters_and_pages(self):
+        """Test that the list endpoint applies MovieFilter and pages with cursors."""
+        response = self.client.get(reverse("api_movie_list"), {"genre": "DRAMA", "limit": 2})
+        data = self.get_json(response)
+        self.assertEqual([movie["title"] for movie in data["results"]], ["Movie 00", "Movie 02"])
+        self.assertEqual(set(data["results"][0]), set(api.API_FIELDS))
+
+        response = self.client.get(
+            reverse("api_movie_list"), {"genre": "DRAMA", "limit": 2, "cursor": data["next"]}
+        )
+        data = self.get_json(response)
+        self.assertEqual([movie["title"] for movie in data["results"]], ["Movie 04"])
+        self.assertIsNone(data["next"])
+
+    def test_detail_and_batch(self):
+        """Test the detail and batch lookup endpoints."""
+        movie = self.movies[1]
+        response = self.client.get(reverse("api_movie_detail", args=[movie.pk]))
+        self.assertEqual(response.json()["title"], "Movie 01")
+        self.assertEqual(
+            self.client.get(reverse("api_movie_detail", args=[999999])).status_code, 404
+        )
+
+        ids = f"{self.movies[3].pk}, {movie.pk},999999,"
+        response = self.client.get(reverse("api_movie_batch"), {"ids": ids})
+        self.assertEqual(
+            [row["id"] for row in self.get_json(response)["results"]],
+            [movie.pk, self.movies[3].pk],
+        )
+
+    def test_batch_rejects_invalid_ids(self):
+        """Test that an id that is not a plain ASCII number is a 400, not a 500."""
+        for value in ("abc", "²", "-1", "1.5"):
+            with self.subTest(value=value):
+                response = self.client.get(
+                    reverse("api_movie_batch"), {"ids": f"{self.movies[0].pk},{value}"}
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(value, response.json()["error"])
+
+    def test_search_orders_by_relevance(self):
+        """Test that the search endpoint ranks title hits above director hits."""
+        Movie.objects.create(
+            title="Nolan's Shortcut", genre="DRAMA", release_year=2020, director="Someone"
+        )
+        response = self.client.get(reverse("api_movie_search"), {"q": "nolan", "limit": 3})
+        titles = [movie["title"] for movie in self.get_json(response)["results"]]
+        self.assertEqual(len(titles), 3)
+        self.assertEqual(titles[0], "Nolan's Shortcut")
+
+        response = self.client.get(reverse("api_movie_search"), {"q": "nolan", "genre": "SCI_FI"})
+        self.assertCountEqual(
+            [movie["title"] for movie in self.get_json(response)["results"]], ["Movie 01", "Movie 03"]
+        )
+        response = self.client.get(reverse("api_movie_search"), {"q": " "})
+        self.assertEqual(self.get_json(response), {"results": [], "next": None})
+
+    def test_conditional_get(self):
+        """Test that an unchanged catalog answers 304 and a change issues a new ETag."""
+        url = reverse("api_movie_list")
+        etag = self.client.get(url, {"year": 2001, "genre": "SCI_FI"})["ETag"]
+        response = self.client.get(
+            url, {"genre": "SCI_FI", "year": 2001}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Movie.objects.create(title="Movie 99", genre="DRAMA", release_year=2010)
+        response = self.client.get(url, {"year": 2001, "genre": "SCI_FI"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class BatchOperationsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password")
+        cls.other = User.objects.create_user(username="other", password="password")
+        cls.first, cls.second = Movie.objects.bulk_create(
+            Movie(title=title, genre="DRAMA", release_year=2000) for title in ("First", "Second")
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username="testuser", password="password")
+
+    def post(self, operations):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                reverse("batch_operations"),
+                json.dumps({"operations": operations}),
+                content_type="application/json",
+            )
+
+    def test_mixed_operations(self):
+        """Test that one call applies bookmarks and ratings and reports each operation."""
+        Rating.objects.create(user=self.other, movie=self.first, rating=2)
+        Rating.objects.create(user=self.user, movie=self.first, rating=1)
+        response = self.post(
+            [
+                {"type": "bookmark", "movie_id": self.first.pk, "action": "add"},
+                {"type": "rating", "movie_id": self.first.pk, "rating": 3},
+                {"type": "rating", "movie_id": self.first.pk, "rating": 4},
+                {"type": "rating", "movie_id": self.second.pk, "rating": 5},
+                {"type": "bookmark", "movie_id": self.second.pk, "action": "add"},
+                {"type": "bookmark", "movie_id": self.second.pk, "action": "remove"},
+                {"type": "bookmark", "movie_id": 999999, "action": "add"},
+                {"type": "rating", "movie_id": self.first.pk, "rating": 9},
+            ]
+        )
+        self.assertEqual(
+            [result["status"] for result in response.json()["results"]],
+            ["added", "rated", "rated", "rated", "added", "removed", "error", "invalid"],
+        )
+        self.assertEqual(
+            list(Bookmark.objects.filter(user=self.user).values_list("movie_id", flat=True)),
+            [self.first.pk],
+        )
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.rating_count, self.first.average_rating), (2, 3.0))
+        self.assertEqual((self.second.rating_count, self.second.average_rating), (1, 5.0))
+        self.assertEqual((self.first.bookmark_count, self.second.bookmark_count), (1, 0))
+
+    def test_removal_updates_counts_and_cache(self):
+        """Test that removing bookmarks keeps the counter and cached ids in step."""
+        Bookmark.objects.create(user=self.user, movie=self.first)
+        self.client.get(reverse("movies"))
+        self.post([{"type": "bookmark", "movie_id": self.first.pk, "action": "remove"}])
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.bookmark_count, 0)
+        response = self.client.get(reverse("movies"))
+        self.assertEqual(response.context["bookmarks"], frozenset())
+
+    def test_fixed_query_count(self):
+        """Test that the number of queries does not grow with the batch size."""
+        operations = [
+            {"type": "rating", "movie_id": movie.pk, "rating": 4}
+            for movie in (self.first, self.second)
+        ]
+        with CaptureQueriesContext(connection) as small:
+            self.post(operations[:1])
+        with CaptureQueriesContext(connection) as large:
+            self.post(operations * 10)
+        self.assertLessEqual(len(large) - len(small), 1)
+
+    def test_form_encoded_beacon(self):
+        """Test that operations posted as a form field are accepted."""
+        response = self.client.post(
+            reverse("batch_operations"),
+            {"operations": json.dumps([{"type": "rating", "movie_id": self.first.pk, "rating": 2}])},
+        )
+        self.assertEqual(response.json()["results"][0]["status"], "rated")
+
+    def test_rejects_malformed_body(self):
+        """Test that malformed payloads get a 400 and change nothing."""
+        url = reverse("batch_operations")
+        self.assertEqual(
+            self.client.post(url, "not json", content_type="application/json").status_code, 400
+        )
+        self.assertEqual(self.post({"type": "rating"}).status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.assertFalse(Rating.objects.exists())
+
+
+class GenreDecadeStatsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password")
+        cls.other = User.objects.create_user(username="other", password="password")
+
+    def bucket(self, genre, decade):
+        return GenreDecadeStats.objects.filter(genre=genre, decade=decade).values(*stats.TOTALS).get()
+
+    def test_incremental_upkeep(self):
+        """Test that saves, ratings, bookmarks and deletes keep the buckets exact."""
+        pulp = Movie.objects.create(title="Pulp Fiction", genre="DRAMA", release_year=1994)
+        Movie.objects.create(title="Fight Club", genre="DRAMA", release_year=1999)
+        Rating.objects.create(user=self.user, movie=pulp, rating=5)
+        rating = Rating.objects.create(user=self.other, movie=pulp, rating=3)
+        Bookmark.objects.create(user=self.user, movie=pulp)
+        self.assertEqual(
+            self.bucket("DRAMA", 1990),
+            {"movie_count": 2, "rating_count": 2, "rating_sum": 8, "bookmark_count": 1},
+        )
+
+        rating.rating = 4
+        rating.save()
+        pulp.genre = "THRILLER"
+        pulp.release_year = 2001
+        pulp.save()
+        self.assertEqual(
+            self.bucket("THRILLER", 2000),
+            {"movie_count": 1, "rating_count": 2, "rating_sum": 9, "bookmark_count": 1},
+        )
+        self.assertEqual(self.bucket("DRAMA", 1990)["movie_count"], 1)
+        self.assertEqual(stats.drift(), {})
+
+        Movie.objects.get(pk=pulp.pk).delete()
+        self.assertEqual(
+            self.bucket("THRILLER", 2000),
+            {"movie_count": 0, "rating_count": 0, "rating_sum": 0, "bookmark_count": 0},
+        )
+        self.assertEqual(stats.drift(), {})
+
+    def test_command_checks_and_rebuilds(self):
+        """Test that --check reports drift and a rebuild repairs it."""
+        Movie.objects.bulk_create([Movie(title="Alien", genre="HORROR", release_year=1979)])
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command("rebuild_genre_stats", "--check", stdout=out)
+        self.assertIn("Horror 1970s: movie_count 0 != 1", out.getvalue())
+
+        call_command("rebuild_genre_stats", stdout=StringIO())
+        self.assertEqual(self.bucket("HORROR", 1970)["movie_count"], 1)
+        out = StringIO()
+        call_command("rebuild_genre_stats", "--check", stdout=out)
+        self.assertIn("consistent", out.getvalue())
+
+    def test_stats_page_and_sidebar(self):
+        """Test that the stats page and the movie list sidebar show the totals."""
+        alien = Movie.objects.create(title="Alien", genre="HORROR", release_year=1979)
+        Rating.objects.create(user=self.user, movie=alien, rating=4)
+
+        response = self.client.get(reverse("genre_stats"))
+        self.assertContains(response, "1970s")
+        self.assertEqual(
+            response.context["genres"],
+            [{"genre": "HORROR", "label": "Horror", "movie_count": 1, "average_rating": 4.0}],
+        )
+        response = self.client.get(reverse("movies"))
+        self.assertEqual(response.context["genre_stats"][0]["label"], "Horror")
+        self.assertContains(response, "?genre=HORROR")
+
+
+@skipUnless(find_spec("numpy") and find_spec("scipy"), "needs numpy and scipy")
+class BuildSimilarityTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(username=f"user{i}") for i in range(3)]
+        cls.movies = Movie.objects.bulk_create(
+            Movie(title=title, genre="DRAMA", release_year=2000)
+            for title in ("Alien", "Aliens", "Amelie", "Unrated")
+        )
+
+    def rate(self, user, movie, value):
+        Rating.objects.update_or_create(
+            user=self.users[user], movie=self.movies[movie], defaults={"rating": value}
+        )
+
+    def build(self, *args):
+        out = StringIO()
+        call_command("build_similarity", *args, stdout=out)
+        return out.getvalue()
+
+    def neighbors(self, movie):
+        return list(
+            MovieNeighbor.objects.filter(movie=self.movies[movie]).values_list(
+                "neighbor__title", flat=True
+            )
+        )
+
+    def test_full_then_incremental_build(self):
+        """Test top-K cosine neighbors and refreshing only re-rated movies."""
+        for user, movie, value in ((0, 0, 5), (0, 1, 5), (1, 0, 4), (1, 1, 4), (1, 2, 1), (2, 2, 5)):
+            self.rate(user, movie, value)
+
+        self.assertIn("Refreshed neighbors of 3 movies", self.build("--top-k", "1", "--block-size", "2"))
+        self.assertEqual(self.neighbors(0), ["Aliens"])
+        self.assertEqual(len(self.neighbors(2)), 1)
+        self.assertEqual(self.neighbors(3), [])
+        score = MovieNeighbor.objects.get(movie=self.movies[0]).score
+        self.assertAlmostEqual(score, 1.0, places=5)
+
+        self.assertIn("Refreshed neighbors of 0 movies", self.build())
+        self.rate(2, 0, 5)
+        self.assertIn("Refreshed neighbors of 1 movies", self.build())
+        self.assertEqual(self.neighbors(0), ["Aliens", "Amelie"])
+
+    def test_incremental_build_picks_up_deleted_ratings(self):
+        """Test that a deleted rating refreshes its movie without --full."""
+        for user, movie, value in ((0, 0, 5), (0, 2, 5), (1, 0, 4), (1, 1, 4), (1, 2, 1)):
+            self.rate(user, movie, value)
+        self.build("--top-k", "1")
+        self.assertEqual(self.neighbors(2), ["Alien"])
+
+        Rating.objects.filter(user=self.users[0], movie=self.movies[2]).delete()
+        self.assertIn("Refreshed neighbors of 1 movies", self.build("--top-k", "1"))
+        self.assertEqual(self.neighbors(2), ["Aliens"])
+        self.assertIn("Refreshed neighbors of 0 movies", self.build("--top-k", "1"))
+
+    def test_movie_info_lists_neighbors(self):
+        """Test that the detail page shows the precomputed neighbors."""
+        MovieNeighbor.objects.create(movie=self.movies[0], neighbor=self.movies[1], rank=1, score=0.9)
+        response = self.client.get(reverse("movie_info", args=[self.movies[0].pk]))
+        self.assertEqual([n.neighbor.title for n in response.context["similar_movies"]], ["Aliens"])
+        self.assertContains(response, "Similar movies")
+
+
+@override_settings(RANKING_MIN_VOTES=10, RANKING_SIZE=3)
+class RankingsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(username=f"user{i}") for i in range(12)]
+        cls.one_vote, cls.classic, cls.solid, cls.weak = (
+            Movie.objects.create(title=title, genre=genre, release_year=year)
+            for title, genre, year in (
+                ("One Vote", "DRAMA", 2020),
+                ("Classic", "DRAMA", 1972),
+                ("Solid", "COMEDY", 1975),
+                ("Weak", "COMEDY", 2021),
+            )
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def rate(self, movie, values):
+        with self.captureOnCommitCallbacks(execute=True):
+            for user, value in zip(self.users, values):
+                Rating.objects.update_or_create(user=user, movie=movie, defaults={"rating": value})
+
+    def listed(self, scope):
+        return [ranking.movie.title for ranking in rankings.top(scope)]
+
+    def test_weighted_score_beats_single_vote(self):
+        """Test that many high ratings outrank one perfect vote, overall and per scope."""
+        self.rate(self.one_vote, [5])
+        self.rate(self.classic, [5, 4] * 6)
+        self.rate(self.solid, [4] * 12)
+
+        prior = rankings.prior_mean()
+        self.classic.refresh_from_db()
+        self.assertAlmostEqual(self.classic.weighted_score, (54 + 10 * prior) / 22)
+        self.assertEqual(self.listed(rankings.ALL), ["Classic", "Solid", "One Vote"])
+        self.assertEqual(self.listed("genre:DRAMA"), ["Classic", "One Vote"])
+        self.assertEqual(self.listed("decade:1970"), ["Classic", "Solid"])
+        positions = MovieRanking.objects.filter(scope=rankings.ALL).values_list("position", flat=True)
+        self.assertEqual(list(positions), [1, 2, 3])
+
+    def test_changes_below_a_full_list_skip_it(self):
+        """Test that a movie that cannot enter a full list leaves it untouched."""
+        self.rate(self.one_vote, [5])
+        self.rate(self.classic, [5] * 12)
+        self.rate(self.solid, [4] * 12)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse("home"))
+        self.assertEqual(rankings.refresh({rankings.ALL}, {self.weak.pk: 0.1}), {})
+
+        self.rate(self.weak, [5] * 12)
+        self.assertEqual(self.listed(rankings.ALL), ["Classic", "Weak", "Solid"])
+
+    def test_lists_wait_for_commit_and_rewrite_only_moved_rows(self):
+        """Test that a rating leaves the lists to after commit, which updates only moved rows."""
+        self.rate(self.one_vote, [5])
+        self.rate(self.classic, [5] * 12)
+        self.rate(self.solid, [4] * 12)
+        self.assertEqual(self.listed(rankings.ALL), ["Classic", "Solid", "One Vote"])
+
+        with (
+            self.captureOnCommitCallbacks() as callbacks,
+            CaptureQueriesContext(connection) as in_transaction,
+            transaction.atomic(),
+        ):
+            for user in self.users[1:6]:
+                Rating.objects.create(user=user, movie=self.one_vote, rating=5)
+        self.assertNotIn("movies_movieranking", " ".join(q["sql"] for q in in_transaction))
+
+        with CaptureQueriesContext(connection) as after_commit:
+            for callback in callbacks:
+                callback()
+        # One Vote overtakes Solid: two rows of the overall list swap movies.
+        self.assertEqual(self.listed(rankings.ALL), ["Classic", "One Vote", "Solid"])
+        writes = [
+            q["sql"] for q in after_commit
+            if "movies_movieranking" in q["sql"] and not q["sql"].startswith("SELECT")
+        ]
+        self.assertEqual(len(writes), 1)
+        self.assertTrue(writes[0].startswith("UPDATE"))
+
+    def test_delete_and_rebuild(self):
+        """Test that deleting a listed movie closes the gap and a rebuild reproduces the lists."""
+        self.rate(self.one_vote, [5])
+        self.rate(self.classic, [5] * 12)
+        self.rate(self.solid, [4] * 12)
+        self.rate(self.weak, [1] * 12)
+        self.classic.delete()
+        self.assertEqual(self.listed(rankings.ALL), ["Solid", "One Vote", "Weak"])
+
+        out = StringIO()
+        call_command("rebuild_rankings", stdout=out)
+        self.assertIn("prior mean of 2.60", out.getvalue())
+        self.assertEqual(self.listed(rankings.ALL), ["Solid", "One Vote", "Weak"])
+        self.assertEqual(self.listed("genre:COMEDY"), ["Solid", "Weak"])
+
+    def test_top_pages(self):
+        """Test the overall, genre and decade top pages read one ranking range."""
+        self.rate(self.solid, [4] * 3)
+        with self.assertNumQueries(1):
+            rankings.top("genre:COMEDY")
+        response = self.client.get(reverse("top_genre", args=["COMEDY"]))
+        self.assertContains(response, "Top Comedy movies")
+        self.assertContains(response, "Solid")
+        response = self.client.get(reverse("top_decade", args=[1970]))
+        self.assertContains(response, "Top movies of the 1970s")
+        self.assertEqual(self.client.get(reverse("top_genre", args=["NOIR"])).status_code, 404)
+        self.assertEqual(self.client.get(reverse("top_decade", args=[1975])).status_code, 404)
+
+
+class TitleAutocompleteTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="rater")
+        for title, rating in (
+            ("Alien", 4.5),
+            ("Aliens", 4.8),
+            ("Álien Nation", 2.0),
+            ("Amélie", 4.0),
+            ("Heat", 3.0),
+        ):
+            Movie.objects.create(title=title, genre="DRAMA", release_year=1990, average_rating=rating)
+
+    def setUp(self):
+        cache.clear()
+        previous = autocomplete.index
+        autocomplete.index = autocomplete.TitleIndex()
+        self.addCleanup(setattr, autocomplete, "index", previous)
+
+    def titles(self, text):
+        return [title for _, title, _ in autocomplete.index.search(text)]
+
+    def test_prefix_matches_ranked_by_rating(self):
+        """Test that short and long prefixes match normalized titles, best rated first."""
+        self.assertFalse(autocomplete.index.ready)
+        self.assertEqual(self.titles("ALI"), ["Aliens", "Alien", "Álien Nation"])
+        self.assertTrue(autocomplete.index.ready)
+        self.assertEqual(self.titles("alien "), ["Alien", "Álien Nation"])
+        self.assertEqual(self.titles("  ame"), ["Amélie"])
+        self.assertEqual(self.titles("a")[:2], ["Aliens", "Alien"])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.titles("aliens"), ["Aliens"])
+            self.assertEqual(self.titles("zz"), [])
+            self.assertEqual(self.titles(""), [])
+
+    def test_trailing_space_matches_the_exact_title(self):
+        """Test that a finished word finds the title that ends with it, short or long."""
+        Movie.objects.create(title="Alien 3", genre="HORROR", release_year=1992, average_rating=3.0)
+        Movie.objects.create(title="Upgrade", genre="ACTION", release_year=2018, average_rating=4.6)
+        self.assertEqual(self.titles("alien "), ["Alien", "Alien 3", "Álien Nation"])
+        # Titles added to a built index land in the precomputed short prefixes too.
+        with self.captureOnCommitCallbacks(execute=True):
+            Movie.objects.create(title="Up", genre="ANIMATION", release_year=2009)
+        self.assertEqual(self.titles("up "), ["Up"])
+        self.assertEqual(self.titles("up"), ["Upgrade", "Up"])
+
+    def test_updates_after_commit(self):
+        """Test that saves, renames, deletes and ratings update a built index in place."""
+        self.titles("a")
+        with self.captureOnCommitCallbacks(execute=True):
+            added = Movie.objects.create(title="Alien Covenant", genre="HORROR", release_year=2017)
+        with self.captureOnCommitCallbacks(execute=True):
+            Movie.objects.filter(title="Aliens").get().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            heat = Movie.objects.get(title="Heat")
+            heat.title = "Alien Heat"
+            heat.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.titles("ali"), ["Alien", "Alien Heat", "Álien Nation", "Alien Covenant"]
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            Rating.objects.create(user=self.user, movie=added, rating=5)
+        self.assertEqual(self.titles("alien")[0], "Alien Covenant")
+        self.assertEqual(self.titles("h"), [])
+
+    def test_own_changes_need_no_rebuild(self):
+        """Test that a process applying its own change adopts the version it bumped."""
+        self.titles("a")
+        with self.captureOnCommitCallbacks(execute=True):
+            Movie.objects.create(title="Amadeus", genre="DRAMA", release_year=1984)
+        autocomplete.index._checked = 0
+        self.assertEqual(self.titles("am"), ["Amélie", "Amadeus"])
+        self.assertIsNone(autocomplete.index._rebuild)
+
+    def test_endpoint(self):
+        response = self.client.get(reverse("title_autocomplete"), {"q": "ali", "limit": 2})
+        self.assertEqual(
+            response.json()["results"],
+            [
+                {"id": Movie.objects.get(title="Aliens").pk, "title": "Aliens", "average_rating": 4.8},
+                {"id": Movie.objects.get(title="Alien").pk, "title": "Alien", "average_rating": 4.5},
+            ],
+        )
+        response = self.client.get(reverse("title_autocomplete"), {"q": "ali", "limit": "x"})
+        self.assertEqual(len(response.json()["results"]), 3)
+
+
+class TitleIndexRebuildTest(TransactionTestCase):
+    # Not a TestCase: the rebuild thread reads through its own connection.
+
+    def setUp(self):
+        previous = autocomplete.index
+        autocomplete.index = autocomplete.TitleIndex()
+        self.addCleanup(setattr, autocomplete, "index", previous)
+
+    def titles(self, text):
+        return [title for _, title, _ in autocomplete.index.search(text)]
+
+    def test_changes_from_other_processes_rebuild_in_the_background(self):
+        """Test that a foreign bump is served stale at once and picked up by a background rebuild."""
+        Movie.objects.create(title="Amélie", genre="DRAMA", release_year=2001, average_rating=4)
+        self.assertEqual(self.titles("am"), ["Amélie"])
+
+        # What another process does: the titles change and the version moves,
+        # but this process never applies the change itself.
+        Movie.objects.bulk_create(
+            [Movie(title="Amadeus", genre="DRAMA", release_year=1984, average_rating=5)]
+        )
+        autocomplete.invalidate()
+        autocomplete.index._checked = 0
+        self.assertEqual(self.titles("am"), ["Amélie"])
+        rebuild = autocomplete.index._rebuild
+        if rebuild is not None:
+            rebuild.join(timeout=30)
+        self.assertEqual(self.titles("am"), ["Amadeus", "Amélie"])
+
+
+class DrainRetryTest(TransactionTestCase):
+    # Not a TestCase: retry_on_busy does not retry inside its transaction.
+
+    def test_locked_drain_is_rerun(self):
+        """Test that a drain losing the write lock rolls back and runs again."""
+        movie = Movie.objects.create(title="Premiere", genre="DRAMA", release_year=2024)
+        user = User.objects.create_user(username="user")
+        Rating.objects.create(user=user, movie=movie, rating=4)
+        Movie.objects.filter(pk=movie.pk).update(rating_sum=0, rating_count=0, average_rating=0)
+        PendingRatingRecompute.enqueue(movie.pk)
+
+        recompute = MovieQuerySet.recompute_ratings
+        calls = []
+
+        def locked_once(queryset):
+            calls.append(1)
+            if len(calls) == 1:
+                raise OperationalError("database is locked")
+            return recompute(queryset)
+
+        with mock.patch.object(MovieQuerySet, "recompute_ratings", locked_once):
+            self.assertEqual(PendingRatingRecompute.drain(), 1)
+        self.assertEqual(len(calls), 2)
+        movie.refresh_from_db()
+        self.assertEqual((movie.rating_count, movie.average_rating), (1, 4))
+        self.assertFalse(PendingRatingRecompute.objects.exists())
+
+
+class RetryOnBusyTest(SimpleTestCase):
+    # Not a TestCase: its per-test transaction would turn retries off.
+    databases = {"default"}
+
+    def flaky(self, failures, error=None):
+        calls = []
+
+        def write():
+            calls.append(1)
+            if len(calls) <= failures:
+                raise error or OperationalError("database is locked")
+            return "written"
+
+        return write, calls
+
+    def test_is_busy(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "busy.sqlite3")
+            holder = sqlite3.connect(path, isolation_level=None)
+            waiter = sqlite3.connect(path, isolation_level=None, timeout=0)
+            try:
+                holder.execute("BEGIN IMMEDIATE")
+                with self.assertRaises(sqlite3.OperationalError) as raised:
+                    waiter.execute("BEGIN IMMEDIATE")
+            finally:
+                holder.close()
+                waiter.close()
+        try:
+            raise OperationalError(*raised.exception.args) from raised.exception
+        except OperationalError as error:
+            self.assertTrue(is_busy(error))
+        self.assertFalse(is_busy(OperationalError("no such table: movies_movie")))
+
+    def test_retries_until_the_write_succeeds(self):
+        write, calls = self.flaky(failures=2)
+        self.assertEqual(retry_on_busy(base_delay=0)(write)(), "written")
+        self.assertEqual(len(calls), 3)
+
+    def test_gives_up_after_the_last_attempt(self):
+        write, calls = self.flaky(failures=5)
+        with self.assertRaises(OperationalError):
+            retry_on_busy(attempts=3, base_delay=0)(write)()
+        self.assertEqual(len(calls), 3)
+
+    def test_other_errors_are_not_retried(self):
+        write, calls = self.flaky(failures=1, error=OperationalError("disk I/O error"))
+        with self.assertRaises(OperationalError):
+            retry_on_busy(base_delay=0)(write)()
+        self.assertEqual(len(calls), 1)
+
+    def test_no_retry_inside_an_outer_transaction(self):
+        write, calls = self.flaky(failures=1)
+        with self.assertRaises(OperationalError), transaction.atomic():
+            retry_on_busy(base_delay=0)(write)()
+        self.assertEqual(len(calls), 1)
+
+    async def test_async(self):
+        calls = []
+
+        @retry_on_busy(base_delay=0)
+        async def write():
+            calls.append(1)
+            if len(calls) == 1:
+                raise OperationalError("database is locked")
+            return "written"
+
+        self.assertEqual(await write(), "written")
+        self.assertEqual(len(calls), 2)
+
+    async def test_async_writes_take_turns(self):
+        running = []
+        overlapped = False
+
+        @retry_on_busy
+        async def write():
+            nonlocal overlapped
+            overlapped = overlapped or bool(running)
+            running.append(1)
+            await asyncio.sleep(0)
+            running.pop()
+
+        await asyncio.gather(*(write() for _ in range(5)))
+        self.assertFalse(overlapped)
+
+
+@skipUnless(os.environ.get("MOVIE_DB_STRESS"), "set MOVIE_DB_STRESS=1 to run")
+class SQLiteStressTest(SimpleTestCase):
+    """Concurrent writers against a file database with the production profile."""
+
+    def test_production_profile_loses_no_writes(self):
+        script = os.path.join(settings.BASE_DIR, "benchmarks", "sqlite_stress.py")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            env = {
+                **os.environ,
+                "MOVIE_DB_PROFILE": "production",
+                "MOVIE_DB_NAME": os.path.join(tmpdir, "stress.sqlite3"),
+            }
+            child = subprocess.run(
+                [sys.executable, script, "--stress", "--threads", "8", "--writes", "40"],
+                env=env,
+                capture_output=True,
+                text=True,
+                timeout=300,
+            )
+        self.assertEqual(child.returncode, 0, child.stderr)
+        result = json.loads(child.stdout)
+        self.assertEqual(result["lock_errors"], 0)
+        self.assertEqual(result["committed"], result["attempted"])
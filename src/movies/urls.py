@@ -1,10 +1,21 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path("", views.movie_list, name="movies"),
     path("toggle-bookmark/", views.toggle_bookmark, name="toggle_bookmark"),
+    path("autocomplete/", views.title_autocomplete, name="title_autocomplete"),
+    path("stats/", views.genre_stats, name="genre_stats"),
+    path("top/", views.top_movies, name="top_movies"),
+    path("top/genre/<str:genre>/", views.top_movies, name="top_genre"),
+    path("top/decade/<int:decade>/", views.top_movies, name="top_decade"),
     path("movie/<int:pk>/", views.movie_info, name="movie_info"),
+    path("movie/<int:pk>/ratings/", views.movie_ratings, name="movie_ratings"),
     path("submit_movie_rating", views.submit_movie_rating, name="submit_movie_rating"),
-    path("add_movie", views.add_movie, name="add_movie")
+    path("batch/", views.batch_operations, name="batch_operations"),
+    path("add_movie", views.add_movie, name="add_movie"),
+    path("api/movies/", api.movie_list, name="api_movie_list"),
+    path("api/movies/batch/", api.movie_batch, name="api_movie_batch"),
+    path("api/movies/search/", api.movie_search, name="api_movie_search"),
+    path("api/movies/<int:pk>/", api.movie_detail, name="api_movie_detail"),
 ]
@@ -1,62 +1,171 @@
-from django.shortcuts import render, get_object_or_404, redirect
-from .models import Movie
+from django.shortcuts import render, aget_object_or_404, redirect
+from .models import GenreDecadeStats, Movie, MovieNeighbor
 from .filters import MovieFilter
 from user.models import Bookmark, Rating
-from django.http import JsonResponse
+from user.cache import bookmarked_movie_ids
+from django.http import Http404, JsonResponse
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.db.models import Avg
-from django.core.paginator import Paginator
+from django.views.decorators.http import require_POST
+from django.conf import settings
+from django.core.cache import cache
+import json
 from .forms import MovieForm
+from .pagination import KeysetPaginator
+from .batch import apply_operations
+from .cache import count_list_lookup, filter_digest, movie_list_key, movie_list_total_key
+from .db import retry_on_busy
+from . import autocomplete, rankings, stats
 
-def movie_list(request):
-    movies = Movie.objects.all()
-    myFilter = MovieFilter(request.GET, queryset=movies)
-    movies = myFilter.qs
 
-    user = request.user
-    bookmarks = Bookmark.objects.filter(user=user).values_list("movie_id", flat=True)
+def cached_total(queryset, digest):
+    """Row count of a filtered list, cached per filter so pages skip the COUNT."""
+    timeout = settings.MOVIE_LIST_TOTAL_TIMEOUT
+    if timeout is None:
+        return None
+    return cache.get_or_set(movie_list_total_key(digest), queryset.count, timeout)
 
-    paginator = Paginator(movies, 10)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
 
-    return render(
+def movie_list(request):
+    myFilter = MovieFilter(request.GET, queryset=Movie.objects.all())
+    cursor = request.GET.get("cursor")
+
+    # Pages and the genre sidebar are shared by everyone; only the bookmark
+    # markers are per user.
+    timeout = settings.MOVIE_LIST_CACHE_TIMEOUT
+    key = movie_list_key(myFilter, cursor) if timeout else None
+    listing = cache.get(key) if key else None
+    if key:
+        count_list_lookup(hit=listing is not None)
+    if listing is None:
+        movies = myFilter.qs
+        paginator = KeysetPaginator(movies, 10, ordering=("title",))
+        listing = {
+            "page_obj": paginator.get_page(cursor),
+            "last_cursor": paginator.last_cursor,
+            "total": cached_total(movies, filter_digest(myFilter)),
+            "genre_stats": stats.genre_totals(),
+        }
+        if key:
+            cache.set(key, listing, timeout)
+        status = "MISS"
+    else:
+        status = "HIT"
+
+    response = render(
         request,
         "movies.html",
         {
-            "movies": movies,
+            **listing,
+            "movies": listing["page_obj"].object_list,
             "filter": myFilter,
-            "bookmarks": bookmarks,
-            "page_obj": page_obj,
+            "bookmarks": bookmarked_movie_ids(request.user),
         },
     )
+    if key:
+        response["X-Cache"] = status
+    return response
+
+
+def title_autocomplete(request):
+    limit = autocomplete.MAX_RESULTS
+    try:
+        limit = max(1, min(int(request.GET.get("limit", limit)), limit))
+    except ValueError:
+        pass
+    matches = autocomplete.index.search(request.GET.get("q", ""), limit)
+    return JsonResponse(
+        {
+            "results": [
+                {"id": movie_id, "title": title, "average_rating": rating}
+                for movie_id, title, rating in matches
+            ]
+        }
+    )
 
 
-def movie_info(request, pk):
-    movie = get_object_or_404(Movie, pk=pk)
-    bookmarks = Bookmark.objects.filter(movie=movie)
-    ratings = Rating.objects.filter(movie=movie)
-    avg_rating = ratings.aggregate(Avg("rating"))["rating__avg"]
-    if avg_rating is not None:
-        avg_rating = round(avg_rating, 2)
-    else:
-        avg_rating = 0
+RATINGS_PAGE_SIZE = 20
+
+
+def genre_stats(request):
+    rows = GenreDecadeStats.objects.filter(movie_count__gt=0)
+    return render(
+        request,
+        "genre_stats.html",
+        {"stats": rows, "genres": stats.genre_totals()},
+    )
+
+
+def top_movies(request, genre=None, decade=None):
+    scope = rankings.ALL
+    if genre is not None:
+        scope = f"genre:{genre}"
+    elif decade is not None:
+        scope = f"decade:{decade}"
+    try:
+        heading = rankings.describe(scope)
+    except ValueError:
+        raise Http404("No such ranking.")
+    return render(
+        request,
+        "top_movies.html",
+        {"heading": heading, "rankings": rankings.top(scope)},
+    )
+
+
+def ratings_paginator(movie_id):
+    ratings = Rating.objects.filter(movie_id=movie_id).values("id", "rating", "user__username")
+    return KeysetPaginator(ratings, RATINGS_PAGE_SIZE, ordering=("-id",))
+
+
+async def movie_info(request, pk):
+    movie = await aget_object_or_404(Movie, pk=pk)
+    ratings = await ratings_paginator(movie.pk).aget_page()
+    similar_movies = [
+        neighbor
+        async for neighbor in MovieNeighbor.objects.filter(movie=movie)
+        .select_related("neighbor")
+        .only("score", "neighbor__title", "neighbor__average_rating")
+    ]
+
+    # Resolve the user up front: the template's auth context would otherwise
+    # load it lazily, which is a sync query inside this coroutine.
+    request.user = user = await request.auser()
+    user_rating = None
+    is_bookmarked = False
+    if user.is_authenticated:
+        user_rating = await Rating.objects.filter(user=user, movie=movie).afirst()
+        is_bookmarked = await Bookmark.objects.filter(user=user, movie=movie).aexists()
 
-    user_rating = Rating.objects.filter(user=request.user, movie=movie).first()
     star_range = range(5)
     return render(
         request,
         "movie_info.html",
         {
             "movie": movie,
-            "bookmarks": bookmarks,
             "ratings": ratings,
-            "avg_rating": avg_rating,
+            "ratings_cursor": ratings.next_cursor,
+            "avg_rating": movie.average_rating,
             "star_range": star_range,
             "user_rating": user_rating,
+            "is_bookmarked": is_bookmarked,
+            "similar_movies": similar_movies,
         },
     )
 
+
+def movie_ratings(request, pk):
+    page = ratings_paginator(pk).get_page(request.GET.get("cursor"))
+    return JsonResponse(
+        {
+            "ratings": [
+                {"user": rating["user__username"], "rating": rating["rating"]}
+                for rating in page
+            ],
+            "next": page.next_cursor,
+        }
+    )
+
+
 def is_movie_editor(user):
     return user.groups.filter(name="MovieEditor").exists()
 
@@ -73,15 +182,17 @@ def add_movie(request):
         return render(request, "add_movie.html", {"movie_form":form})
 
 @login_required
-def toggle_bookmark(request):
+@retry_on_busy
+async def toggle_bookmark(request):
     if request.method == "POST":
         movie_id = request.POST.get("movie_id")
         action = request.POST.get("action")
+        user = await request.auser()
 
         try:
-            movie = Movie.objects.get(id=movie_id)
-            bookmark, created = Bookmark.objects.get_or_create(
-                user=request.user, movie=movie
+            movie = await Movie.objects.aget(id=movie_id)
+            bookmark, created = await Bookmark.objects.aget_or_create(
+                user=user, movie=movie
             )
 
             if action == "add":
@@ -94,7 +205,7 @@ def toggle_bookmark(request):
                         {"status": "exists", "message": "Already bookmarked."}
                     )
             elif action == "remove":
-                bookmark.delete()
+                await bookmark.adelete()
                 return JsonResponse(
                     {"status": "removed", "message": "Bookmark removed."}
                 )
@@ -105,16 +216,35 @@ def toggle_bookmark(request):
 
 
 @login_required
-def submit_movie_rating(request):
+@retry_on_busy
+async def submit_movie_rating(request):
     movie_id = request.POST.get("movie_id")
     rating_value = request.POST.get("rating")
 
-    movie = Movie.objects.get(id=movie_id)
+    movie = await Movie.objects.aget(id=movie_id)
 
-    Rating.objects.update_or_create(
-        user=request.user, movie=movie, defaults={"rating": rating_value}
+    await Rating.objects.aupdate_or_create(
+        user=await request.auser(), movie=movie, defaults={"rating": rating_value}
     )
-    print(movie_id)
-    print(rating_value)
 
     return JsonResponse({"success": True})
+
+
+@login_required
+@require_POST
+@retry_on_busy
+def batch_operations(request):
+    """Apply queued bookmark and rating operations in one request.
+
+    Accepts a JSON body ``{"operations": [...]}`` or, for beacons sent while
+    the page unloads, the same list JSON-encoded in an ``operations`` field.
+    """
+    try:
+        if request.content_type == "application/json":
+            operations = json.loads(request.body).get("operations")
+        else:
+            operations = json.loads(request.POST.get("operations", ""))
+        results = apply_operations(request.user, operations)
+    except (ValueError, AttributeError) as exc:
+        return JsonResponse({"status": "invalid", "message": str(exc)}, status=400)
+    return JsonResponse({"results": results})
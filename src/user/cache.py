@@ -0,0 +1,53 @@
+"""Per-user set of bookmarked movie ids, cached across requests.
+
+List templates test ``movie.id in bookmarks`` for every row, so they get a
+frozenset (O(1) membership) instead of a queryset. Bookmark changes drop
+the user's entry after commit; only a shared cache carries that to the
+other workers, so a per-process one keeps entries for seconds.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from movies.cache import is_shared
+
+from .models import Bookmark
+
+# How stale another worker's copy may get when its deletes cannot reach it.
+PROCESS_LOCAL_TIMEOUT = 10
+
+
+def _bookmarks_key(user_id):
+    return f"user:{user_id}:bookmarks"
+
+
+def bookmark_ids_timeout():
+    if is_shared():
+        return settings.BOOKMARK_IDS_TIMEOUT
+    return min(settings.BOOKMARK_IDS_TIMEOUT, PROCESS_LOCAL_TIMEOUT)
+
+
+def bookmarked_movie_ids(user):
+    if not user.is_authenticated:
+        return frozenset()
+    key = _bookmarks_key(user.pk)
+    movie_ids = cache.get(key)
+    if movie_ids is None:
+        movie_ids = frozenset(
+            Bookmark.objects.filter(user=user).values_list("movie_id", flat=True)
+        )
+        cache.set(key, movie_ids, bookmark_ids_timeout())
+    return movie_ids
+
+
+def invalidate_bookmarks(user_id):
+    transaction.on_commit(lambda: cache.delete(_bookmarks_key(user_id)))
+
+
+@receiver(post_save, sender=Bookmark)
+@receiver(post_delete, sender=Bookmark)
+def refresh_on_bookmark_change(sender, instance, **kwargs):
+    invalidate_bookmarks(instance.user_id)
@@ -0,0 +1,158 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from movies.models import Movie
+from user.models import Rating
+
+USER_KEYS = ("user_id", "userId", "user")
+MOVIE_KEYS = ("movie_id", "movieId", "movie")
+
+
+def _pick(record, keys):
+    for key in keys:
+        if key in record:
+            return record[key]
+    return None
+
+
+def read_records(path, fmt):
+    with open(path, newline="", encoding="utf-8") as handle:
+        if fmt == "csv":
+            yield from csv.DictReader(handle)
+        else:
+            for line in handle:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        # Still one record, so checkpoints stay aligned; skipped.
+                        yield None
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream ratings from a CSV or JSONL file and upsert them in chunks. "
+        "Progress is checkpointed after every chunk so an interrupted run "
+        "resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "jsonl"])
+        parser.add_argument("--chunk-size", type=int, default=5000)
+        parser.add_argument(
+            "--checkpoint",
+            help="Checkpoint file (default: <path>.checkpoint).",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore an existing checkpoint and start from the first record.",
+        )
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options["path"])
+        if not os.path.exists(path):
+            raise CommandError(f"File not found: {path}")
+        fmt = options["format"] or ("jsonl" if path.endswith((".jsonl", ".json")) else "csv")
+        chunk_size = options["chunk_size"]
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be positive.")
+        checkpoint = options["checkpoint"] or f"{path}.checkpoint"
+
+        done = 0 if options["restart"] else self.load_checkpoint(checkpoint, path)
+        if done:
+            self.stdout.write(f"Resuming after {done} records.")
+
+        records = islice(read_records(path, fmt), done, None)
+        processed = imported = skipped = 0
+        started = time.monotonic()
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+            written = self.import_chunk(chunk)
+            processed += len(chunk)
+            imported += written
+            skipped += len(chunk) - written
+            self.save_checkpoint(checkpoint, path, done + processed)
+
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"{done + processed} records read, {imported} upserted, "
+                f"{skipped} skipped ({processed / elapsed:.0f} records/s)"
+            )
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {imported} ratings, skipped {skipped} invalid records."
+            )
+        )
+
+    def import_chunk(self, chunk):
+        ratings = {}
+        for record in chunk:
+            if not isinstance(record, dict):
+                continue
+            try:
+                user_id = int(_pick(record, USER_KEYS))
+                movie_id = int(_pick(record, MOVIE_KEYS))
+                value = float(record["rating"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if 0 <= value <= 5:
+                # A later record for the same pair wins, as it would row by row.
+                ratings[user_id, movie_id] = value
+
+        user_ids = set(
+            User.objects.filter(pk__in={u for u, _ in ratings}).values_list("pk", flat=True)
+        )
+        movie_ids = set(
+            Movie.objects.filter(pk__in={m for _, m in ratings}).values_list("pk", flat=True)
+        )
+        objs = [
+            Rating(user_id=user_id, movie_id=movie_id, rating=value)
+            for (user_id, movie_id), value in ratings.items()
+            if user_id in user_ids and movie_id in movie_ids
+        ]
+        if not objs:
+            return 0
+
+        with transaction.atomic():
+            Rating.objects.bulk_create(
+                objs,
+                update_conflicts=True,
+                unique_fields=["user", "movie"],
+                update_fields=["rating", "updated_at"],
+            )
+            Movie.objects.filter(
+                pk__in={obj.movie_id for obj in objs}
+            ).recompute_ratings()
+        return len(objs)
+
+    def load_checkpoint(self, checkpoint, path):
+        if not os.path.exists(checkpoint):
+            return 0
+        with open(checkpoint, encoding="utf-8") as handle:
+            state = json.load(handle)
+        if state.get("source") != path:
+            raise CommandError(
+                f"Checkpoint {checkpoint} belongs to {state.get('source')}; "
+                "pass --restart or another --checkpoint."
+            )
+        return state["records"]
+
+    def save_checkpoint(self, checkpoint, path, records):
+        tmp = f"{checkpoint}.tmp"
+        with open(tmp, "w", encoding="utf-8") as handle:
+            json.dump({"source": path, "records": records}, handle)
+        os.replace(tmp, checkpoint)
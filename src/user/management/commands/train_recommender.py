@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Factorize the rating matrix with alternating least squares and "
+        "publish the factors for profile recommendations."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--factors", type=int, default=32)
+        parser.add_argument("--iterations", type=int, default=10)
+        parser.add_argument("--regularization", type=float, default=0.1)
+        parser.add_argument(
+            "--chunk-size", type=int, default=50_000, help="Ratings read per query."
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            import scipy  # noqa: F401
+            from user import recommender
+        except ImportError as error:
+            raise CommandError(f"train_recommender needs numpy and scipy: {error}")
+        if recommender.np is None:
+            raise CommandError("train_recommender needs numpy and scipy.")
+        for name in ("factors", "iterations", "chunk_size"):
+            if options[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be positive.")
+
+        clock = time.monotonic()
+        user_ids, movie_ids, user_factors, movie_factors = recommender.train(
+            options["factors"],
+            options["iterations"],
+            options["regularization"],
+            options["chunk_size"],
+            seed=options["seed"],
+        )
+        if not len(user_ids):
+            raise CommandError("There are no ratings to train on.")
+        path = recommender.save(user_ids, movie_ids, user_factors, movie_factors)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Trained {options['factors']} factors for {len(user_ids)} users and "
+                f"{len(movie_ids)} movies in {time.monotonic() - clock:.1f}s; saved to {path}."
+            )
+        )
@@ -1,17 +1,22 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.contrib.auth.models import User
-from movies.models import Movie
+from movies.models import Movie, PendingSimilarityRefresh
 from django.core.validators import MinValueValidator, MaxValueValidator
-from movies.models import Movie
 
 class Bookmark(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="bookmarks")
     movie = models.ForeignKey(
         Movie, on_delete=models.CASCADE, related_name="bookmarked_by"
     )
+    created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = ("user", "movie")
+        indexes = [
+            models.Index(fields=["user", "-created_at", "-id"], name="bookmark_user_recent_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"Bookmark for {self.movie.title} by {self.user.username}"
@@ -21,13 +26,63 @@ class Rating(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="rates")
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name="rated_by")
     rating = models.FloatField(validators=[MinValueValidator(0), MaxValueValidator(5)])
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ("user", "movie")
+        indexes = [
+            models.Index(fields=["user", "-updated_at", "-id"], name="rating_user_recent_idx"),
+        ]
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        self.movie.update_average_rating()
+        self.rating = float(self.rating)
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = (
+                    Rating.objects.filter(pk=self.pk)
+                    .values_list("movie_id", "rating")
+                    .first()
+                )
+            super().save(*args, **kwargs)
+            if previous is None:
+                Movie.apply_rating_delta(self.movie_id, self.rating, 1)
+            elif previous[0] != self.movie_id:
+                Movie.apply_rating_delta(previous[0], -previous[1], -1)
+                Movie.apply_rating_delta(self.movie_id, self.rating, 1)
+            elif previous[1] != self.rating:
+                Movie.apply_rating_delta(self.movie_id, self.rating - previous[1], 0)
 
     def __str__(self) -> str:
         return f"Rating for {self.movie.title} by {self.user.username}"
+
+
+def deleting_movie(origin):
+    """Whether a delete cascaded from a Movie instance or queryset."""
+    if isinstance(origin, models.QuerySet):
+        return origin.model is Movie
+    return isinstance(origin, Movie)
+
+
+@receiver(post_delete, sender=Rating)
+def remove_rating_from_movie(sender, instance, origin=None, **kwargs):
+    # Runs for Rating.delete(), queryset deletes and cascades alike; a
+    # cascade from the movie itself leaves no totals to maintain.
+    if deleting_movie(origin):
+        return
+    Movie.apply_rating_delta(instance.movie_id, -instance.rating, -1)
+    PendingSimilarityRefresh.enqueue(instance.movie_id)
+
+
+@receiver(post_save, sender=Bookmark)
+def add_bookmark_to_movie(sender, instance, created, **kwargs):
+    if created:
+        Movie.apply_bookmark_delta(instance.movie_id, 1)
+
+
+@receiver(post_delete, sender=Bookmark)
+def remove_bookmark_from_movie(sender, instance, origin=None, **kwargs):
+    if deleting_movie(origin):
+        return
+    Movie.apply_bookmark_delta(instance.movie_id, -1)
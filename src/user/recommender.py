@@ -0,0 +1,165 @@
+"""Matrix factorization recommendations.
+
+``train`` factorizes the user x movie rating matrix with alternating least
+squares and ``save`` writes the factors as float32 ``.npy`` files, plus the
+sorted user and movie ids of their rows, to a fresh directory under
+RECOMMENDER_DIR. It then points the ``CURRENT`` file at that directory.
+Serving memory-maps the current files once per process, so scoring a user
+is one (movies x factors) @ (factors,) product and never reads Rating.
+
+Training needs numpy and scipy; serving needs numpy and returns no
+recommendations without it or before the first training run.
+"""
+
+import os
+import shutil
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+FILES = ("user_ids", "movie_ids", "user_factors", "movie_factors")
+
+_model = None
+
+
+def _solve(matrix, fixed, regularization, max_block):
+    """Regularized least-squares factors for every row of a CSR ``matrix``.
+
+    Rows are solved in blocks of at most ``max_block`` ratings: each block
+    gathers the fixed factors of its ratings, sums their outer products per
+    row with ``reduceat`` and solves all the small systems in one call.
+    """
+    rows, rank = matrix.shape[0], fixed.shape[1]
+    indptr = matrix.indptr
+    result = np.empty((rows, rank), dtype=np.float32)
+    eye = np.eye(rank)
+    start = 0
+    while start < rows:
+        end = int(np.searchsorted(indptr, indptr[start] + max_block, side="right")) - 1
+        end = min(max(end, start + 1), rows)
+        low, high = indptr[start], indptr[end]
+        gathered = fixed[matrix.indices[low:high]].astype(np.float64)
+        offsets = indptr[start:end] - low
+        gram = np.add.reduceat(gathered[:, :, None] * gathered[:, None, :], offsets)
+        rhs = np.add.reduceat(gathered * matrix.data[low:high, None], offsets)
+        counts = np.diff(indptr[start : end + 1])
+        gram += regularization * counts[:, None, None] * eye
+        result[start:end] = np.linalg.solve(gram, rhs[..., None])[..., 0]
+        start = end
+    return result
+
+
+def train(factors, iterations, regularization, chunk_size, seed=0):
+    """Returns ``(user_ids, movie_ids, user_factors, movie_factors)``."""
+    from movies.similarity import rating_matrix
+
+    by_movie, movie_ids, user_ids = rating_matrix(chunk_size)
+    by_user = by_movie.T.tocsr()
+    # Keep each block's outer products around 64 MB.
+    max_block = max(1, 2**24 // (factors * factors))
+    rng = np.random.default_rng(seed)
+    movie_factors = rng.normal(scale=0.1, size=(len(movie_ids), factors)).astype(np.float32)
+    user_factors = np.zeros((len(user_ids), factors), dtype=np.float32)
+    for _ in range(iterations):
+        user_factors = _solve(by_user, movie_factors, regularization, max_block)
+        movie_factors = _solve(by_movie, user_factors, regularization, max_block)
+    return user_ids, movie_ids, user_factors, movie_factors
+
+
+def save(user_ids, movie_ids, user_factors, movie_factors, directory=None):
+    """Write a new model version and make it current; older ones but one are removed."""
+    root = Path(directory or settings.RECOMMENDER_DIR)
+    version = timezone.now().strftime("%Y%m%d%H%M%S%f")
+    target = root / version
+    target.mkdir(parents=True)
+    arrays = dict(zip(FILES, (user_ids, movie_ids, user_factors, movie_factors)))
+    for name, array in arrays.items():
+        np.save(target / f"{name}.npy", array)
+    pointer = root / "CURRENT.tmp"
+    pointer.write_text(version)
+    previous = _current_version(root)
+    os.replace(pointer, root / "CURRENT")
+    # Processes still mapping the previous version keep it until they reload.
+    for path in root.iterdir():
+        if path.is_dir() and path.name not in (version, previous):
+            shutil.rmtree(path)
+    return target
+
+
+def _current_version(root):
+    try:
+        return (root / "CURRENT").read_text().strip()
+    except FileNotFoundError:
+        return None
+
+
+def load_model():
+    """The current model as a dict of memory-mapped arrays, or None."""
+    global _model
+    if np is None:
+        return None
+    root = Path(settings.RECOMMENDER_DIR)
+    version = _current_version(root)
+    if version is None:
+        return None
+    if _model is None or _model["root"] != root or _model["version"] != version:
+        _model = {
+            "root": root,
+            "version": version,
+            **{name: np.load(root / version / f"{name}.npy", mmap_mode="r") for name in FILES},
+        }
+    return _model
+
+
+def _positions(ids, wanted):
+    """Row positions of the ``wanted`` ids that are present in sorted ``ids``."""
+    wanted = np.fromiter(wanted, dtype=np.int64)
+    positions = np.searchsorted(ids, wanted)
+    found = positions < len(ids)
+    found[found] = ids[positions[found]] == wanted[found]
+    return positions[found]
+
+
+def recommend(user_id, exclude, count):
+    """Ids of the ``count`` best scoring movies for a user, minus ``exclude``.
+
+    Returns an empty list without a model or for users trained without
+    ratings; callers decide how to fill the gap.
+    """
+    model = load_model()
+    if model is None:
+        return []
+    row = _positions(model["user_ids"], [user_id])
+    if not len(row):
+        return []
+    scores = model["movie_factors"] @ model["user_factors"][row[0]]
+    scores[_positions(model["movie_ids"], exclude)] = -np.inf
+    count = min(count, len(scores))
+    if count < 1:
+        return []
+    best = np.argpartition(-scores, count - 1)[:count]
+    best = best[np.argsort(-scores[best], kind="stable")]
+    best = best[np.isfinite(scores[best])]
+    return [int(movie_id) for movie_id in model["movie_ids"][best]]
+
+
+def recommended_movies(user, bookmarks, count):
+    """Movie rows recommended to ``user``, skipping what they rated or bookmarked.
+
+    Costs two indexed queries when a model exists and none otherwise.
+    """
+    from movies.models import Movie
+    from .models import Rating
+
+    if not count or load_model() is None:
+        return []
+    rated = Rating.objects.filter(user=user).values_list("movie_id", flat=True)
+    ids = recommend(user.pk, {*rated, *bookmarks}, count)
+    movies = Movie.objects.only("title", "average_rating").in_bulk(ids)
+    return [movies[movie_id] for movie_id in ids if movie_id in movies]
@@ -1,7 +1,18 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from importlib.util import find_spec
+from unittest import skipUnless
+from io import StringIO
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.contrib.auth.models import User
 from .models import Bookmark, Rating
+from .cache import PROCESS_LOCAL_TIMEOUT, bookmark_ids_timeout, bookmarked_movie_ids
+from . import recommender
 from movies.models import Movie
 
 
@@ -106,4 +117,232 @@ class BookmarkRatingTest(TestCase):
         Rating.objects.create(user=self.user, movie=self.movie, rating=4.5)
         with self.assertRaises(Exception):
             Rating.objects.create(user=self.user, movie=self.movie, rating=3.0)
-            
\ No newline at end of file
+
+
+class BookmarkCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123")
+        cls.movies = [
+            Movie.objects.create(title=f"Movie {i}", genre="DRAMA", release_year=2020)
+            for i in range(3)
+        ]
+        Bookmark.objects.create(user=cls.user, movie=cls.movies[0])
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username="testuser", password="password123")
+
+    def test_bookmark_ids_are_cached_set(self):
+        """Test that bookmarked ids come back as a set and are cached"""
+        self.assertEqual(bookmarked_movie_ids(self.user), {self.movies[0].pk})
+        with self.assertNumQueries(0):
+            movie_ids = bookmarked_movie_ids(self.user)
+        self.assertIsInstance(movie_ids, frozenset)
+
+    def test_toggle_bookmark_invalidates_cache(self):
+        """Test that toggling a bookmark refreshes the cached set"""
+        bookmarked_movie_ids(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("toggle_bookmark"), {"movie_id": self.movies[1].pk, "action": "add"}
+            )
+        self.assertEqual(
+            bookmarked_movie_ids(self.user), {self.movies[0].pk, self.movies[1].pk}
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("toggle_bookmark"), {"movie_id": self.movies[0].pk, "action": "remove"}
+            )
+        self.assertEqual(bookmarked_movie_ids(self.user), {self.movies[1].pk})
+
+    def test_long_timeout_needs_a_shared_cache(self):
+        """Test that a per-process cache, which other workers cannot invalidate, keeps ids briefly"""
+        self.assertEqual(bookmark_ids_timeout(), settings.BOOKMARK_IDS_TIMEOUT)
+        local = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        with self.settings(CACHES=local):
+            self.assertEqual(bookmark_ids_timeout(), PROCESS_LOCAL_TIMEOUT)
+
+    def test_movie_list_marks_bookmarks(self):
+        """Test that the movie list renders bookmark markers from the set"""
+        response = self.client.get(reverse("movies"))
+        self.assertEqual(response.context["bookmarks"], {self.movies[0].pk})
+        self.assertContains(response, "bookmark-btn bookmarked", count=1)
+
+
+class ProfileViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="password123")
+        cls.movies = Movie.objects.bulk_create(
+            Movie(title=f"Movie {i:02d}", genre="DRAMA", release_year=2020) for i in range(15)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username="testuser", password="password123")
+
+    def test_profile_requires_login(self):
+        """Test that anonymous visitors are sent to the login page"""
+        self.client.logout()
+        response = self.client.get(reverse("profile"))
+        self.assertRedirects(response, f"{reverse('login')}?next={reverse('profile')}")
+
+    def test_profile_lists_bookmarks_without_ratings(self):
+        """Test that bookmarked movies show up even when they are not rated"""
+        Bookmark.objects.create(user=self.user, movie=self.movies[0])
+        response = self.client.get(reverse("profile"))
+        self.assertEqual(len(response.context["ratings"]), 0)
+        self.assertEqual(
+            [bookmark.movie for bookmark in response.context["bookmarked"]], [self.movies[0]]
+        )
+        self.assertContains(response, "Movie 00")
+
+    def test_profile_pages_by_recency_with_constant_queries(self):
+        """Test that both lists are newest first and cost the same queries at any size"""
+        # Session, user, bookmark ids, ratings page, bookmarks page.
+        for movies in (self.movies[:2], self.movies[2:]):
+            for movie in movies:
+                Rating.objects.create(user=self.user, movie=movie, rating=3)
+                Bookmark.objects.create(user=self.user, movie=movie)
+            cache.clear()
+            with self.assertNumQueries(5):
+                response = self.client.get(reverse("profile"))
+
+        ratings = response.context["ratings"]
+        self.assertEqual(
+            [rating.movie.title for rating in ratings],
+            [f"Movie {i:02d}" for i in range(14, 4, -1)],
+        )
+        older = self.client.get(reverse("profile"), {"ratings_cursor": ratings.next_cursor})
+        self.assertEqual(
+            [rating.movie.title for rating in older.context["ratings"]],
+            [f"Movie {i:02d}" for i in range(4, -1, -1)],
+        )
+        self.assertEqual(len(older.context["bookmarked"]), 10)
+
+
+class ImportRatingsCommandTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user1 = User.objects.create_user(username="user1", password="password123")
+        cls.user2 = User.objects.create_user(username="user2", password="password123")
+        cls.movie1 = Movie.objects.create(title="Movie 1", genre="DRAMA", release_year=2020)
+        cls.movie2 = Movie.objects.create(title="Movie 2", genre="DRAMA", release_year=2021)
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w") as handle:
+            handle.write(content)
+        return path
+
+    def test_import_csv_upserts_and_recomputes(self):
+        """Test that a CSV import upserts ratings and updates the averages"""
+        Rating.objects.create(user=self.user1, movie=self.movie1, rating=1)
+        path = self.write(
+            "ratings.csv",
+            "user_id,movie_id,rating\n"
+            f"{self.user1.pk},{self.movie1.pk},5\n"
+            f"{self.user2.pk},{self.movie1.pk},4\n"
+            f"{self.user2.pk},{self.movie2.pk},3\n"
+            f"{self.user2.pk},999999,3\n"
+            f"{self.user1.pk},{self.movie2.pk},9\n",
+        )
+        call_command("import_ratings", path, chunk_size=2, stdout=StringIO())
+
+        self.assertEqual(Rating.objects.count(), 3)
+        self.movie1.refresh_from_db()
+        self.movie2.refresh_from_db()
+        self.assertEqual((self.movie1.rating_count, self.movie1.average_rating), (2, 4.5))
+        self.assertEqual((self.movie2.rating_count, self.movie2.average_rating), (1, 3))
+        self.assertFalse(os.path.exists(path + ".checkpoint"))
+
+    def test_import_resumes_from_checkpoint(self):
+        """Test that records before the checkpoint are not read again"""
+        path = self.write(
+            "ratings.jsonl",
+            json.dumps({"userId": self.user1.pk, "movieId": self.movie1.pk, "rating": 2}) + "\n"
+            + json.dumps({"userId": self.user2.pk, "movieId": self.movie2.pk, "rating": 4}) + "\n",
+        )
+        with open(path + ".checkpoint", "w") as handle:
+            json.dump({"source": os.path.abspath(path), "records": 1}, handle)
+
+        call_command("import_ratings", path, stdout=StringIO())
+
+        self.assertFalse(Rating.objects.filter(movie=self.movie1).exists())
+        self.assertTrue(Rating.objects.filter(movie=self.movie2, rating=4).exists())
+
+    def test_malformed_jsonl_lines_are_skipped(self):
+        """Test that unparseable lines count as skipped and do not stop the import"""
+        path = self.write(
+            "ratings.jsonl",
+            json.dumps({"userId": self.user1.pk, "movieId": self.movie1.pk, "rating": 2}) + "\n"
+            + '{"userId": 1, "movieId":\n'
+            + json.dumps({"userId": self.user2.pk, "movieId": self.movie2.pk, "rating": 4}) + "\n",
+        )
+        out = StringIO()
+        call_command("import_ratings", path, chunk_size=1, stdout=out)
+
+        self.assertIn("Imported 2 ratings, skipped 1 invalid records.", out.getvalue())
+        self.assertTrue(Rating.objects.filter(movie=self.movie2, rating=4).exists())
+        self.assertFalse(os.path.exists(path + ".checkpoint"))
+
+
+@skipUnless(find_spec("numpy") and find_spec("scipy"), "needs numpy and scipy")
+class RecommenderTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = User.objects.create_user(username="viewer", password="password123")
+        cls.fans = [User.objects.create_user(username=f"fan{i}") for i in range(4)]
+        cls.movies = Movie.objects.bulk_create(
+            Movie(title=title, genre="SCI_FI", release_year=1980)
+            for title in ("Alien", "Aliens", "Blade Runner", "Solaris", "Stalker")
+        )
+        for fan in cls.fans:
+            for movie, value in zip(cls.movies, (5, 5, 4, 1, 1)):
+                Rating.objects.create(user=fan, movie=movie, rating=value)
+        Rating.objects.create(user=cls.viewer, movie=cls.movies[0], rating=5)
+        Bookmark.objects.create(user=cls.viewer, movie=cls.movies[1])
+
+    def setUp(self):
+        cache.clear()
+        self.directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(RECOMMENDER_DIR=self.directory))
+        self.client.login(username="viewer", password="password123")
+
+    def train(self):
+        call_command(
+            "train_recommender", "--factors", "3", "--iterations", "8", stdout=StringIO()
+        )
+
+    def test_profile_without_model(self):
+        """Test that the profile works and skips the queries before any training run"""
+        self.assertIsNone(recommender.load_model())
+        response = self.client.get(reverse("profile"))
+        self.assertEqual(response.context["recommendations"], [])
+
+    def test_profile_recommends_unseen_movies(self):
+        """Test that recommendations rank unseen movies and skip rated and bookmarked ones"""
+        self.train()
+        model = recommender.load_model()
+        self.assertEqual(model["movie_factors"].dtype, "float32")
+        self.assertEqual(model["movie_factors"].shape, (5, 3))
+
+        with self.assertNumQueries(7):
+            response = self.client.get(reverse("profile"))
+        titles = [movie.title for movie in response.context["recommendations"]]
+        self.assertEqual(titles[0], "Blade Runner")
+        self.assertEqual(set(titles), {"Blade Runner", "Solaris", "Stalker"})
+        self.assertContains(response, "Recommended for you")
+
+    def test_retraining_replaces_the_current_model(self):
+        """Test that a new run becomes current and only one older version is kept"""
+        for _ in range(3):
+            self.train()
+        versions = sorted(path for path in os.listdir(self.directory) if path != "CURRENT")
+        self.assertEqual(len(versions), 2)
+        self.assertEqual(recommender.load_model()["version"], versions[-1])
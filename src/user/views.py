@@ -5,7 +5,12 @@ from .forms import RegistrationForm
 from django.urls import reverse_lazy
 from django.contrib.auth.views import PasswordResetView, PasswordResetConfirmView
 from django.contrib.messages.views import SuccessMessageMixin
+from django.contrib.auth.decorators import login_required
+from movies.pagination import KeysetPaginator
 from .models import Bookmark, Rating
+from .cache import bookmarked_movie_ids
+from .recommender import recommended_movies
+from django.conf import settings
 
 
 def login_user(request):
@@ -44,10 +49,31 @@ def register_user(request):
     return render(request, "authenticate/register.html", {"form": form})
 
 
+PROFILE_PAGE_SIZE = 10
+
+
+@login_required
 def profile(request):
-    bookmarks = Bookmark.objects.filter(user=request.user).values_list("movie_id", flat=True)
-    ratings = Rating.objects.filter(user=request.user)
-    
+    bookmarks = bookmarked_movie_ids(request.user)
+    ratings = KeysetPaginator(
+        Rating.objects.filter(user=request.user)
+        .select_related("movie")
+        .only("rating", "updated_at", "movie__title"),
+        PROFILE_PAGE_SIZE,
+        ordering=("-updated_at", "-id"),
+    ).get_page(request.GET.get("ratings_cursor"))
+    bookmarked = KeysetPaginator(
+        Bookmark.objects.filter(user=request.user)
+        .select_related("movie")
+        .only("created_at", "movie__title", "movie__average_rating"),
+        PROFILE_PAGE_SIZE,
+        ordering=("-created_at", "-id"),
+    ).get_page(request.GET.get("bookmarks_cursor"))
+
+    recommendations = recommended_movies(
+        request.user, bookmarks, settings.PROFILE_RECOMMENDATIONS
+    )
+
     star_range = range(5)
     return render(
         request,
@@ -56,6 +82,8 @@ def profile(request):
             "user": request.user,
             "bookmarks": bookmarks,
             "ratings": ratings,
+            "bookmarked": bookmarked,
+            "recommendations": recommendations,
             "star_range": star_range,
         },
     )